@@ -1,16 +1,22 @@
 # pragma version 0.4.1
+# pragma evm-version cancun
 """
 @title Twocrypto
 @author Curve.Fi
 @license Copyright (c) Curve.Fi, 2025 - all rights reserved
 @notice A Curve AMM pool for 2 unpegged assets (e.g. WETH, USD).
 @dev All prices in the AMM are with respect to the first token in the pool.
+     Targets cancun: the reentrancy lock lives in transient storage
+     (EIP-1153). Setting and clearing it is a TSTORE and reading it a
+     TLOAD, at 100 gas each, with no cold access and no refund to
+     account for, and it is wiped at the end of the transaction.
 """
 
 from interfaces import ITwocrypto
 from interfaces import ITwocryptoMath
 from interfaces import ITwocryptoFactory
 from interfaces import ITwocryptoView
+from interfaces import ITwocryptoCallback
 
 implements: ITwocrypto
 
@@ -81,21 +87,31 @@ WAD: constant(uint256) = c.WAD
 PRECISIONS: immutable(uint256[N_COINS])
 _MATH: immutable(ITwocryptoMath)
 coins: public(immutable(address[N_COINS]))
+# Both coins transfer exactly the amount asked for (no fee on transfer, no
+# rebasing), as vetted by the factory admin: `_transfer_in` trusts them.
+# It cannot be revoked: should a coin start taking a fee, the pool would
+# credit more than it receives. Pools are not flagged unless both of their
+# coins are listed by the factory admin (see `set_standard_token`).
+STANDARD_ERC20: immutable(bool)
 
 cached_price_scale: uint256  # <------------------------ Internal price scale.
-cached_price_oracle: uint256  # <------- Price target given by moving average.
 
-last_prices: public(uint256)
-last_timestamp: public(uint256)    # idx 0 is for prices, idx 1 is for xcp.
+# The state `tweak_price` reads and writes on every trade is packed two
+# values per slot (`utils.pack_2`), grouped by how often it is written, so
+# that a trade writes two slots, and three on the first trade of a block.
+# All values fit in 128 bits: prices are bound by the price scale limits of
+# the factory, D by the math contract, profits and timestamps by far, and
+# `utils.pack_2` reverts rather than let one spill into its neighbour.
+# Public getters for each value are further below.
+packed_price_oracle_timestamp: uint256  # <--- price_oracle | last_timestamp.
+#                                                      Written once per block.
+packed_last_prices_xcp_profit: uint256  # <-------- last_prices | xcp_profit.
+packed_D_virtual_price: uint256  # <--------------------- D | virtual_price.
+#                          The cached `virtual_price` is also used internally.
 
 balances: public(uint256[N_COINS])
-D: public(uint256)
-xcp_profit: public(uint256)
 xcp_profit_a: public(uint256)  # <--- Full profit at last claim of admin fees.
 
-virtual_price: public(uint256)  # <------ Cached (fast to read) virtual price.
-#                          The cached `virtual_price` is also used internally.
-
 # TODO admin fee shouldn't be hardcoded
 ADMIN_FEE: public(constant(uint256)) = 5 * 10**9  # 50% of the fee
 
@@ -106,6 +122,9 @@ admin_lp_virtual_balance: uint256
 
 MIN_ADMIN_FEE_CLAIM_INTERVAL: constant(uint256) = 86400
 
+MAX_EXCHANGE_LEGS: constant(uint256) = 16  # <----------- Per exchange_many.
+MAX_CALLBACK_DATA: constant(uint256) = 1024  # <-- exchange_with_callback data.
+
 
 version: public(constant(String[8])) = "v2.1.0"
 
@@ -123,9 +142,12 @@ def __init__(
     packed_fee_params: uint256,
     packed_rebalancing_params: uint256,
     initial_price: uint256,
+    standard_erc20: bool,  # not passed by factories before v2.1.0, which
+    #                          can't deploy this blueprint.
 ):
 
     _MATH = ITwocryptoMath(_math)
+    STANDARD_ERC20 = standard_erc20
 
     params.__init__(
         msg.sender,
@@ -142,9 +164,8 @@ def __init__(
     # ------------------------------------------------------------------------
 
     self.cached_price_scale = initial_price
-    self.cached_price_oracle = initial_price
-    self.last_prices = initial_price
-    self.last_timestamp = block.timestamp
+    self.packed_price_oracle_timestamp = utils.pack_2(initial_price, block.timestamp)
+    self.packed_last_prices_xcp_profit = utils.pack_2(initial_price, 0)
     self.xcp_profit_a = 10**18
 
     log IERC20.Transfer(sender=empty(address), receiver=self, value=0)  # <------- Fire empty transfer from
@@ -171,8 +192,7 @@ def _transfer_in(
             This is only enabled for exchange_received.
     @return The amount of tokens received.
     """
-    coin_balance: uint256 = staticcall IERC20(coins[_coin_idx]).balanceOf(self)
-
+    dx: uint256 = _dx
     if expect_optimistic_transfer:  # Only enabled in exchange_received:
         # it expects the caller of exchange_received to have sent tokens to
         # the pool before calling this method.
@@ -183,27 +203,45 @@ def _transfer_in(
         # accounts for coin balances of the contract) is atleast dx.
         # If we checked for received_amounts == dx, an extra transfer without a
         # call to exchange_received will break the method.
-        dx: uint256 = coin_balance - self.balances[_coin_idx]
+        dx = self._balance_of(_coin_idx) - self.balances[_coin_idx]
         assert dx >= _dx, "user didn't give us coins"
 
-        # Adjust balances
-        self.balances[_coin_idx] += dx
+    else:
+        # ------------------------------------------- ERC20 transferFrom flow.
+
+        # Standard coins transfer exactly `_dx`, the others (e.g. with a
+        # fee on transfer) are measured by the balance they left.
+        coin_balance: uint256 = 0
+        if not STANDARD_ERC20:
+            coin_balance = self._balance_of(_coin_idx)
 
-        return dx
+        self._transfer_from(_coin_idx, _dx, sender, self)
 
-    # ----------------------------------------------- ERC20 transferFrom flow.
+        if not STANDARD_ERC20:
+            dx = self._balance_of(_coin_idx) - coin_balance
 
+    # Adjust balances
+    self.balances[_coin_idx] += dx
+    return dx
+
+
+@internal
+def _transfer_from(
+    _coin_idx: uint256, _amount: uint256, sender: address, receiver: address
+):
     # EXTERNAL CALL
     assert extcall IERC20(coins[_coin_idx]).transferFrom(
         sender,
-        self,
-        _dx,
+        receiver,
+        _amount,
         default_return_value=True
     ), "transferFrom failed"
 
-    dx: uint256 = staticcall IERC20(coins[_coin_idx]).balanceOf(self) - coin_balance
-    self.balances[_coin_idx] += dx
-    return dx
+
+@internal
+@view
+def _balance_of(_coin_idx: uint256) -> uint256:
+    return staticcall IERC20(coins[_coin_idx]).balanceOf(self)
 
 
 @internal
@@ -247,30 +285,7 @@ def exchange(
     @param receiver Address to send the output coin to. Default is msg.sender
     @return uint256 Amount of tokens at index j received by the `receiver
     """
-    # _transfer_in updates self.balances here:
-    dx_received: uint256 = self._transfer_in(
-        i,
-        dx,
-        msg.sender,
-        False
-    )
-
-    # No ERC20 token transfers occur here:
-    out: uint256[3] = self._exchange(
-        i,
-        j,
-        dx_received,
-        min_dy,
-    )
-
-    # _transfer_out updates self.balances here. Update to state occurs before
-    # external calls:
-    self._transfer_out(j, out[0], receiver)
-
-    # log:
-    log ITwocrypto.TokenExchange(buyer=msg.sender, sold_id=i, tokens_sold=dx_received, bought_id=j, tokens_bought=out[0], fee=out[1], price_scale=out[2])
-
-    return out[0]
+    return self._exchange_and_send(i, j, dx, min_dy, receiver, False)
 
 
 @external
@@ -296,32 +311,140 @@ def exchange_received(
     @param receiver Address to send the output coin to
     @return uint256 Amount of tokens at index j received by the `receiver`
     """
-    # _transfer_in updates self.balances here:
-    dx_received: uint256 = self._transfer_in(
+    return self._exchange_and_send(
         i,
+        j,
         dx,
-        msg.sender,
+        min_dy,
+        receiver,
         True  # <---- expect_optimistic_transfer is set to True here.
     )
 
+
+@external
+@nonreentrant
+def exchange_with_callback(
+    i: uint256,
+    j: uint256,
+    dx: uint256,
+    min_dy: uint256,
+    receiver: address,
+    data: Bytes[MAX_CALLBACK_DATA],
+) -> uint256:
+    """
+    @notice Exchange: but the pool sends the output coin first and the user
+            pays `dx` of coins[i] to the pool in a callback.
+    @dev Use-case is for routers to chain exchanges without holding the
+         input of each one: the output of an exchange pays for the one
+         before it. The pool calls `twocrypto_callback(i, j, dx, dy, data)`
+         on msg.sender after sending `dy` to `receiver`, and then checks like
+         exchange_received that its surplus of coins[i] is at least `dx`.
+         The exchange is priced and accounted for exactly `dx`: any surplus
+         above it is left out of the balances, like a donation.
+         The pool stays locked during the callback, but views without the
+         lock (`balances`, `D`, `virtual_price`, `get_dy` and the other
+         calc_ views) already count `dx` then, before it is paid.
+    @param i Index value for the input coin
+    @param j Index value for the output coin
+    @param dx Amount of input coin being swapped in
+    @param min_dy Minimum amount of output coin to receive
+    @param receiver Address to send the output coin to
+    @param data Passed on to the callback
+    @return uint256 Amount of tokens at index j received by the `receiver`
+    """
+    # The pool is priced as if `dx` had arrived, which the callback settles:
+    self.balances[i] += dx
+
     # No ERC20 token transfers occur here:
-    out: uint256[3] = self._exchange(
-        i,
-        j,
-        dx_received,
-        min_dy,
-    )
+    out: uint256[3] = self._exchange(i, j, dx, min_dy)
 
-    # _transfer_out updates self.balances here. Update to state occurs before
-    # external calls:
     self._transfer_out(j, out[0], receiver)
 
-    # log:
-    log ITwocrypto.TokenExchange(buyer=msg.sender, sold_id=i, tokens_sold=dx_received, bought_id=j, tokens_bought=out[0], fee=out[1], price_scale=out[2])
+    # EXTERNAL CALL
+    extcall ITwocryptoCallback(msg.sender).twocrypto_callback(i, j, dx, out[0], data)
+
+    # Settled like exchange_received, except that only `dx` is credited: the
+    # balances already count it, so the pool must hold at least as much.
+    assert self._balance_of(i) >= self.balances[i], "user didn't give us coins"
+
+    log ITwocrypto.TokenExchange(buyer=msg.sender, sold_id=i, tokens_sold=dx, bought_id=j, tokens_bought=out[0], fee=out[1], price_scale=out[2])
 
     return out[0]
 
 
+@external
+@nonreentrant
+def exchange_many(
+    legs: DynArray[ITwocrypto.ExchangeLeg, MAX_EXCHANGE_LEGS],
+    receiver: address = msg.sender
+) -> DynArray[uint256, MAX_EXCHANGE_LEGS]:
+    """
+    @notice Exchange several legs, in either direction, in one call
+    @dev The two directions are netted: what the legs selling coins[0] and
+         those selling coins[1] give is valued at the spot price after the
+         last trade (`last_prices`), and only the part of the larger flow
+         that the other does not match is exchanged with the pool, in a
+         single trade (one `tweak_price`, one TokenExchange). The matched
+         coins go from the caller to `receiver` directly, at that price and
+         without fee, and never enter the pool.
+         (A coin that charges a fee on transfer charges it there too.)
+         The legs selling the net coin share the opposite coins and the
+         output of the trade, the others share the rest of the net coin.
+         Each side is split pro rata to the `dx` of its legs, the last leg
+         of a side taking the rounding remainder. Each leg must get at least
+         its `min_dy`, and logs an ExchangeLegFilled.
+    @param legs Index of the input coin, amount in and minimum amount out of
+           every leg. The output coin is the other one.
+    @param receiver Address to send the output coins to. Default is msg.sender
+    @return DynArray[uint256, MAX_EXCHANGE_LEGS] Amounts received per leg
+    """
+    dx_total: uint256[N_COINS] = empty(uint256[N_COINS])
+    for leg: ITwocrypto.ExchangeLeg in legs:
+        assert leg.dx > 0, "zero dx"
+        dx_total[leg.i] += leg.dx
+
+    # ---------------------------------- Net the directions at the spot price.
+
+    value: uint256[N_COINS] = self._xp(  # <------------------ In coins[0].
+        dx_total, utils.unpack_2(self.packed_last_prices_xcp_profit)[0]
+    )
+    i: uint256 = 0  # <--------------------------------- Coin sold on net.
+    if value[1] > value[0]:
+        i = 1
+    # The part of it that the other direction does not match:
+    dx: uint256 = dx_total[i] * (value[i] - value[1 - i]) // value[i]
+
+    # The coins matched between the directions:
+    dy_total: uint256[N_COINS] = [dx_total[1], dx_total[0]]
+    dy_total[1 - i] -= dx
+    for k: uint256 in range(N_COINS):
+        if dy_total[1 - k] > 0:
+            self._transfer_from(k, dy_total[1 - k], msg.sender, receiver)
+
+    # -------------------------------------------------- Trade the residual.
+
+    if dx > 0:
+        # Slippage is checked per leg:
+        dy_total[i] += self._exchange_and_send(i, 1 - i, dx, 0, receiver, False)
+
+    # ---------------------------------------------- Split between the legs.
+
+    dy: DynArray[uint256, MAX_EXCHANGE_LEGS] = []
+    for leg: ITwocrypto.ExchangeLeg in legs:
+        k: uint256 = leg.i
+        # Each leg takes its share of what is left of its side, so the last
+        # one gets the remainder:
+        leg_dy: uint256 = dy_total[k] * leg.dx // dx_total[k]
+        dx_total[k] -= leg.dx
+        dy_total[k] -= leg_dy
+        self._check_slippage(leg_dy, leg.min_dy)
+        dy.append(leg_dy)
+
+        log ITwocrypto.ExchangeLegFilled(buyer=msg.sender, sold_id=k, tokens_sold=leg.dx, bought_id=1 - k, tokens_bought=leg_dy)
+
+    return dy
+
+
 @external
 @nonreentrant
 def add_liquidity(
@@ -336,8 +459,46 @@ def add_liquidity(
     @param receiver Address to send the LP tokens to. Default is msg.sender
     @return uint256 Amount of LP tokens received by the `receiver
     """
+    return self._add_liquidity(amounts, min_mint_amount, receiver, False)
 
 
+@external
+@nonreentrant
+def add_liquidity_received(
+    amounts: uint256[N_COINS],
+    min_mint_amount: uint256,
+    receiver: address = msg.sender
+) -> uint256:
+    """
+    @notice Adds liquidity into the pool: but user must transfer `amounts` of
+            coins to pool first. Pool will not call transferFrom and will only
+            check if a surplus of each coin is greater than or equal to its
+            amount.
+    @dev Use-case is to reduce the number of redundant ERC20 token
+         transfers in zaps. Like in exchange_received, the whole surplus of a
+         coin is deposited. Note for users: please transfer +
+         add_liquidity_received in 1 tx.
+    @param amounts Amounts of each coin to add.
+    @param min_mint_amount Minimum amount of LP to mint.
+    @param receiver Address to send the LP tokens to. Default is msg.sender
+    @return uint256 Amount of LP tokens received by the `receiver`
+    """
+    return self._add_liquidity(
+        amounts,
+        min_mint_amount,
+        receiver,
+        True  # <---- expect_optimistic_transfer is set to True here.
+    )
+
+
+@internal
+def _add_liquidity(
+    amounts: uint256[N_COINS],
+    min_mint_amount: uint256,
+    receiver: address,
+    expect_optimistic_transfer: bool,
+) -> uint256:
+
     assert amounts[0] + amounts[1] > 0, "no coins to add"
 
     # --------------------- Get prices, balances -----------------------------
@@ -356,7 +517,7 @@ def add_liquidity(
                 i,
                 amounts[i],
                 msg.sender,
-                False,  # <--------------------- Disable optimistic transfers.
+                expect_optimistic_transfer,
             )
             balances[i] += amounts_received[i]
 
@@ -373,15 +534,17 @@ def add_liquidity(
 
     A_gamma: uint256[2] = params._A_gamma()
 
-    old_D: uint256 = 0
+    old_D: uint256 = utils.unpack_2(self.packed_D_virtual_price)[0]
     if params._is_ramping():
         # Recalculate D if A and/or gamma are ramping because the shape of
         # the bonding curve is changing.
-        old_D = staticcall _MATH.newton_D(A_gamma[0], A_gamma[1], old_xp, 0)
-    else:
-        old_D = self.D
+        old_D = self._ramped_D(A_gamma, old_xp, old_D)
 
-    D: uint256 = staticcall _MATH.newton_D(A_gamma[0], A_gamma[1], xp, 0)
+    # D and the spot price at the new balances, for tweak_price.
+    D_p: uint256[2] = staticcall _MATH.newton_D_and_p(
+        A_gamma[0], A_gamma[1], xp, self._K0(old_xp, old_D)
+    )
+    D: uint256 = D_p[0]
 
     token_supply: uint256 = erc20.totalSupply
     d_token: uint256 = 0
@@ -404,20 +567,21 @@ def add_liquidity(
         erc20._mint(receiver, d_token)
         self.admin_lp_virtual_balance += unsafe_div(ADMIN_FEE * d_token_fee, 10**10)
 
-        price_scale = self.tweak_price(A_gamma, xp, D)
+        price_scale = self.tweak_price(A_gamma, xp, D, D_p[1])
 
     else:
 
         # (re)instatiating an empty pool:
 
-        self.D = D
-        self.virtual_price = 10**18
-        self.xcp_profit = 10**18
+        self.packed_D_virtual_price = utils.pack_2(D, 10**18)
+        self.packed_last_prices_xcp_profit = utils.pack_2(
+            utils.unpack_2(self.packed_last_prices_xcp_profit)[0], 10**18
+        )
         self.xcp_profit_a = 10**18
 
         erc20._mint(receiver, d_token)
 
-    assert d_token >= min_mint_amount, "slippage"
+    self._check_slippage(d_token, min_mint_amount)
 
     # ---------------------------------------------- Log and claim admin fees.
 
@@ -479,13 +643,16 @@ def remove_liquidity(
 
         for i: uint256 in range(N_COINS):
             withdraw_amounts[i] = self.balances[i] * adjusted_amount // total_supply
-            assert withdraw_amounts[i] >= min_amounts[i], "slippage"
+            self._check_slippage(withdraw_amounts[i], min_amounts[i])
 
-    D: uint256 = self.D
+    D_vprice: uint256[2] = utils.unpack_2(self.packed_D_virtual_price)
+    D: uint256 = D_vprice[0]
     # Reduce D proportionally to the amount of tokens leaving. Since withdrawals
     # are balanced, this is a simple subtraction. If amount == total_supply,
     # D will be 0.
-    self.D = D - unsafe_div(D * adjusted_amount, total_supply)
+    self.packed_D_virtual_price = utils.pack_2(
+        D - unsafe_div(D * adjusted_amount, total_supply), D_vprice[1]
+    )
 
     # ---------------------------------- Transfers ---------------------------
 
@@ -582,13 +749,15 @@ def _remove_liquidity_fixed_out(
         amount_i,
     )
 
-    assert dy >= min_amount_j, "slippage"
+    self._check_slippage(dy, min_amount_j)
 
     # ---------------------------- State Updates -----------------------------
 
     erc20._burn(msg.sender, token_amount)
 
-    price_scale: uint256 = self.tweak_price(A_gamma, xp, D)
+    price_scale: uint256 = self.tweak_price(
+        A_gamma, xp, D, staticcall _MATH.get_p(xp, D, A_gamma)
+    )
 
     self._transfer_out(i, amount_i, receiver)
     self._transfer_out(1 - i, dy, receiver)
@@ -608,6 +777,41 @@ def _remove_liquidity_fixed_out(
     return dy
 
 
+@internal
+def _exchange_and_send(
+    i: uint256,
+    j: uint256,
+    dx: uint256,
+    min_dy: uint256,
+    receiver: address,
+    expect_optimistic_transfer: bool,
+) -> uint256:
+    # _transfer_in updates self.balances here:
+    dx_received: uint256 = self._transfer_in(
+        i,
+        dx,
+        msg.sender,
+        expect_optimistic_transfer
+    )
+
+    # No ERC20 token transfers occur here:
+    out: uint256[3] = self._exchange(
+        i,
+        j,
+        dx_received,
+        min_dy,
+    )
+
+    # _transfer_out updates self.balances here. Update to state occurs before
+    # external calls:
+    self._transfer_out(j, out[0], receiver)
+
+    # log:
+    log ITwocrypto.TokenExchange(buyer=msg.sender, sold_id=i, tokens_sold=dx_received, bought_id=j, tokens_bought=out[0], fee=out[1], price_scale=out[2])
+
+    return out[0]
+
+
 @internal
 def _exchange(
     i: uint256,
@@ -631,6 +835,9 @@ def _exchange(
 
     # ----------- Update invariant if A, gamma are undergoing ramps ---------
 
+    # tweak_price stores the D after the trade, the one of the old balances
+    # under the ramped A, gamma only needs to be known here.
+    D: uint256 = utils.unpack_2(self.packed_D_virtual_price)[0]
     if params._is_ramping():
 
         x0 *= PRECISIONS[i]
@@ -640,12 +847,11 @@ def _exchange(
 
         x1: uint256 = xp[i]  # <------------------ Back up old value in xp ...
         xp[i] = x0                                                         # |
-        self.D = staticcall _MATH.newton_D(A_gamma[0], A_gamma[1], xp, 0)   # |
+        D = self._ramped_D(A_gamma, xp, D)                                 # |
         xp[i] = x1  # <-------------------------------------- ... and restore.
 
     # ----------------------- Calculate dy and fees --------------------------
 
-    D: uint256 = self.D
     y_out: uint256[2] = staticcall _MATH.get_y(A_gamma[0], A_gamma[1], xp, D, j)
     dy = xp[j] - y_out[0]
     xp[j] -= dy
@@ -657,7 +863,7 @@ def _exchange(
 
     fee: uint256 = unsafe_div(self._fee(xp) * dy, 10**10)
     dy -= fee  # <--------------------- Subtract fee from the outgoing amount.
-    assert dy >= min_dy, "slippage"
+    self._check_slippage(dy, min_dy)
     y -= dy
 
     y *= PRECISIONS[j]
@@ -668,10 +874,11 @@ def _exchange(
     # ------ Tweak price_scale with good initial guess for newton_D ----------
 
     # Technically a swap wouldn't require to recompute D, however since we're taking
-    # fees, we need to update D to reflect the new balances.
-    D = staticcall _MATH.newton_D(A_gamma[0], A_gamma[1], xp, y_out[1])
+    # fees, we need to update D to reflect the new balances. The spot price
+    # at the new balances comes with it.
+    D_p: uint256[2] = staticcall _MATH.newton_D_and_p(A_gamma[0], A_gamma[1], xp, y_out[1])
 
-    price_scale = self.tweak_price(A_gamma, xp, D)
+    price_scale = self.tweak_price(A_gamma, xp, D_p[0], D_p[1])
 
     return [dy, fee, price_scale]
 
@@ -681,6 +888,7 @@ def tweak_price(
     A_gamma: uint256[2],
     _xp: uint256[N_COINS],
     D: uint256,
+    p: uint256,
 ) -> uint256:
     """
     @notice Updates price_oracle, last_price and conditionally adjusts
@@ -688,53 +896,46 @@ def tweak_price(
             liquidity operation: _exchange, add_liquidity, or
             remove_liquidity_fixed_out.
     @dev Contains main liquidity rebalancing logic, by tweaking `price_scale`.
+         Only the first call in a block attempts a rebalance, later calls
+         in the same block only update last_prices and the profits.
     @param A_gamma Array of A and gamma parameters.
     @param _xp Array of current balances.
     @param new_D New D value.
+    @param p Spot price dx/dy at _xp and D, as given by get_p.
     """
 
     # ---------------------------- Read storage ------------------------------
 
-    price_oracle: uint256 = self.cached_price_oracle
-    last_prices: uint256 = self.last_prices
+    oracle_timestamp: uint256[2] = utils.unpack_2(self.packed_price_oracle_timestamp)
+    price_oracle: uint256 = oracle_timestamp[0]
+    last_timestamp: uint256 = oracle_timestamp[1]
+    last_prices_xcp_profit: uint256[2] = utils.unpack_2(self.packed_last_prices_xcp_profit)
+    last_prices: uint256 = last_prices_xcp_profit[0]
     price_scale: uint256 = self.cached_price_scale
-    rebalancing_params: uint256[3] = utils.unpack_3(params.packed_rebalancing_params)
-    # Contains: allowed_extra_profit, adjustment_step, ma_time. -----^
 
     # ------------------ Update Price Oracle if needed -----------------------
 
-    last_timestamp: uint256 = self.last_timestamp
-    alpha: uint256 = 0
-    if last_timestamp < block.timestamp:  # 0th index is for price_oracle.
+    # The price oracle, the target of rebalances, only moves on the first
+    # trade of a block. Rebalancing parameters are only needed then.
+    new_block: bool = last_timestamp < block.timestamp
+    rebalancing_params: uint256[3] = empty(uint256[3])
+    if new_block:
+
+        rebalancing_params = utils.unpack_3(params.packed_rebalancing_params)
+        # Contains: allowed_extra_profit, adjustment_step, ma_time. -----^
 
         #   The moving average price oracle is calculated using the last_price
         #      of the trade at the previous block, and the price oracle logged
         #              before that trade. This can happen only once per block.
-
-        # ------------------ Calculate moving average params -----------------
-
-        alpha = staticcall _MATH.wad_exp(
-            -convert(
-                unsafe_div(
-                    unsafe_sub(block.timestamp, last_timestamp) * 10**18,
-                    rebalancing_params[2]  # <----------------------- ma_time.
-                ),
-                int256,
-            )
-        )
-
-        # ---------------------------------------------- Update price oracles.
-
-        # ----------------- We cap state price that goes into the EMA with
-        #                                                 2 x price_scale.
-        price_oracle = unsafe_div(
-            min(last_prices, 2 * price_scale) * (10**18 - alpha) +
-            price_oracle * alpha,  # ^-------- Cap spot price into EMA.
-            10**18
+        price_oracle = self._moving_average(
+            price_oracle,
+            last_prices,
+            price_scale,
+            unsafe_sub(block.timestamp, last_timestamp),
+            rebalancing_params[2]  # <--------------------------------- ma_time.
         )
 
-        self.cached_price_oracle = price_oracle
-        self.last_timestamp = block.timestamp
+        self.packed_price_oracle_timestamp = utils.pack_2(price_oracle, block.timestamp)
 
     #  `price_oracle` is used further on to calculate its vector distance from
     # price_scale. This distance is used to calculate the amount of adjustment
@@ -742,11 +943,8 @@ def tweak_price(
     # ------------------------------------------------------------------------
 
     # Here we update the spot price, please notice that this value is unsafe
-    # and can be manipulated.
-    self.last_prices = unsafe_div(
-        staticcall _MATH.get_p(_xp, D, A_gamma) * price_scale,
-        10**18
-    )
+    # and can be manipulated. It is stored along with xcp_profit below.
+    last_prices = unsafe_div(p * price_scale, 10**18)
 
     # ---------- Update profit numbers without price adjustment first --------
 
@@ -755,7 +953,7 @@ def tweak_price(
 
     # `totalSupply` will not change during this function call.
     total_supply: uint256 = erc20.totalSupply
-    old_virtual_price: uint256 = self.virtual_price
+    old_virtual_price: uint256 = utils.unpack_2(self.packed_D_virtual_price)[1]
     if old_virtual_price > 0:
         xcp: uint256 = self._xcp(D, price_scale)
 
@@ -765,7 +963,7 @@ def tweak_price(
         virtual_price = 10**18 * xcp // total_supply + 1
 
         # Safe to do unsafe_div as old_virtual_price > 0.
-        old_xcp_profit: uint256 = self.xcp_profit
+        old_xcp_profit: uint256 = last_prices_xcp_profit[1]
         xcp_profit = unsafe_div(
             old_xcp_profit * virtual_price,
             old_virtual_price
@@ -780,7 +978,7 @@ def tweak_price(
             # as changing the shape of the bonding curve causes losses in the pool.
             assert params._is_ramping(), "virtual price decreased"
 
-    self.xcp_profit = xcp_profit
+    self.packed_last_prices_xcp_profit = utils.pack_2(last_prices, xcp_profit)
 
     # ------------ Rebalance liquidity if there's enough profits to adjust it:
     #
@@ -796,7 +994,12 @@ def tweak_price(
     #
     # The allowed_extra_profit parameter prevents reverting gas-wasting rebalances
     # by ensuring sufficient profit margin
-    if (virtual_price - rebalancing_params[0])**2 > xcp_profit * 10**18:
+    #
+    # Rebalancing is only attempted on the first trade of a block. The oracle
+    # does not move within a block, so later trades would aim at the same
+    # target with the same step: they are deferred to the next block and
+    # skip the check, along with the newton_D it may take.
+    if new_block and (virtual_price - rebalancing_params[0])**2 > xcp_profit * 10**18:
         # allowed_extra_profit ---^
         # Calculate the vector distance between price_scale and price_oracle.
         norm: uint256 = unsafe_div(
@@ -830,7 +1033,11 @@ def tweak_price(
             ]
 
             # ------------------------------------------ Update D with new xp.
-            new_D: uint256 = staticcall _MATH.newton_D(A_gamma[0], A_gamma[1], xp, 0)
+            # Only xp[1] moved, by p_new / price_scale: starting from the K0
+            # of D and _xp, newton_D starts from D * sqrt(p_new / price_scale).
+            new_D: uint256 = staticcall _MATH.newton_D(
+                A_gamma[0], A_gamma[1], xp, self._K0(_xp, D)
+            )
 
             # ------------------------------------- Convert xp to real prices.
 
@@ -848,16 +1055,14 @@ def tweak_price(
                 new_virtual_price ** 2 > xcp_profit * 10**18
             ):
 
-                self.D = new_D
-                self.virtual_price = new_virtual_price
+                self.packed_D_virtual_price = utils.pack_2(new_D, new_virtual_price)
                 self.cached_price_scale = p_new
 
                 return p_new
 
     # If we end up here price_scale was not adjusted. So we update the state
     # with the virtual price and D we calculated before attempting a rebalance.
-    self.D = D
-    self.virtual_price = virtual_price
+    self.packed_D_virtual_price = utils.pack_2(D, virtual_price)
 
     return price_scale
 
@@ -886,7 +1091,8 @@ def _claim_admin_fees():
     ):
         return
 
-    xcp_profit: uint256 = self.xcp_profit  # <---------- Current pool profits.
+    last_prices_xcp_profit: uint256[2] = utils.unpack_2(self.packed_last_prices_xcp_profit)
+    xcp_profit: uint256 = last_prices_xcp_profit[1]  # <-- Current pool profits.
     xcp_profit_a: uint256 = self.xcp_profit_a  # <- Profits at previous claim.
     current_lp_token_supply: uint256 = erc20.totalSupply
 
@@ -901,8 +1107,9 @@ def _claim_admin_fees():
     # ---------- Conditions met to claim admin fees: compute state. ----------
 
     A_gamma: uint256[2] = params._A_gamma()
-    D: uint256 = self.D
-    vprice: uint256 = self.virtual_price
+    D_vprice: uint256[2] = utils.unpack_2(self.packed_D_virtual_price)
+    D: uint256 = D_vprice[0]
+    vprice: uint256 = D_vprice[1]
     price_scale: uint256 = self.cached_price_scale
     fee_receiver: address = params._fee_receiver()
     balances: uint256[N_COINS] = self.balances
@@ -954,14 +1161,15 @@ def _claim_admin_fees():
     # Set admin virtual LP balances to zero because we claimed:
     self.admin_lp_virtual_balance = 0
 
-    self.xcp_profit = xcp_profit
+    self.packed_last_prices_xcp_profit = utils.pack_2(last_prices_xcp_profit[0], xcp_profit)
     self.last_admin_fee_claim_timestamp = block.timestamp
 
-    # Since we reduce balances: virtual price goes down
-    self.virtual_price = vprice
-
-    # Adjust D after admin seemingly removes liquidity
-    self.D = D - unsafe_div(D * admin_share, total_supply_including_admin_share)
+    # Since we reduce balances: virtual price goes down, and D is adjusted
+    # after admin seemingly removes liquidity.
+    self.packed_D_virtual_price = utils.pack_2(
+        D - unsafe_div(D * admin_share, total_supply_including_admin_share),
+        vprice,
+    )
 
     if xcp_profit > xcp_profit_a:
         self.xcp_profit_a = xcp_profit  # <-------- Cache last claimed profit.
@@ -1051,7 +1259,54 @@ def _xcp(D: uint256, price_scale: uint256) -> uint256:
     # In the end we take the geometric average of the scaled balances:
     # xcp = sqrt(D // (N_COINS * 1) * D // (N_COINS * price_scale))
     # this is equivalent to D // N_COINS * sqrt(price_scale).
-    return D * WAD // N_COINS // isqrt(WAD * price_scale)
+    return D * WAD // N_COINS // self._sqrt_price(price_scale)
+
+
+@internal
+@pure
+def _check_slippage(amount: uint256, min_amount: uint256):
+    # The five slippage checks share one copy of the revert string, which
+    # the blueprint can't afford in each of them.
+    assert amount >= min_amount, "slippage"
+
+
+@internal
+@pure
+def _sqrt_price(price: uint256) -> uint256:
+    # square root of a WAD price, as a WAD. isqrt is about 200 bytes, which
+    # the blueprint can't afford twice: _xcp pays ~50 gas for the call.
+    return isqrt(WAD * price)
+
+
+@internal
+@view
+def _ramped_D(A_gamma: uint256[2], xp: uint256[N_COINS], D: uint256) -> uint256:
+    # D of `xp` under the current A and gamma, given its D under the ones
+    # before the ramp moved them. Only called during a ramp.
+    return staticcall _MATH.newton_D(A_gamma[0], A_gamma[1], xp, self._K0(xp, D))
+
+
+@internal
+@view
+def _get_y(A_gamma: uint256[2], xp: uint256[N_COINS], D: uint256, i: uint256) -> uint256[2]:
+    # For the withdrawals, _exchange calls get_y directly.
+    return staticcall _MATH.get_y(A_gamma[0], A_gamma[1], xp, D, i)
+
+
+@internal
+@pure
+def _K0(xp: uint256[N_COINS], D: uint256) -> uint256:
+    # K0 = 4 * xp[0] * xp[1] / D**2 is what newton_D takes as K0_prev.
+    # Given the K0 of a previous state, newton_D starts from that state's D
+    # scaled by sqrt of the change in xp[0] * xp[1], which is much closer
+    # to the new D than the constant-product guess 2 * sqrt(xp[0] * xp[1]).
+    # That usually saves iterations but is not guaranteed to: after a large
+    # imbalanced change it can take one more. The D found is not bitwise the
+    # one of a cold start, only within newton_D's convergence tolerance.
+    # 0 (no state to start from) makes newton_D use the constant-product guess.
+    if D == 0:
+        return 0
+    return unsafe_div(unsafe_div((10**18 * N_COINS**2) * xp[0], D) * xp[1], D)
 
 
 @view
@@ -1140,11 +1395,9 @@ def _calc_withdraw_fixed_out(
     price_scale: uint256 = self.cached_price_scale
     xp: uint256[N_COINS] = self._xp(balances, price_scale)
 
-    D: uint256 = 0
+    D: uint256 = utils.unpack_2(self.packed_D_virtual_price)[0]
     if params._is_ramping():
-        D = staticcall _MATH.newton_D(A_gamma[0], A_gamma[1], xp, 0)
-    else:
-        D = self.D
+        D = self._ramped_D(A_gamma, xp, D)
 
 
     # ------------------------------ Amounts calc ----------------------------
@@ -1165,7 +1418,7 @@ def _calc_withdraw_fixed_out(
     # We compute the position on the y axis after a withdrawal of dD with the constraint
     # that xp_new[i] has been reduced by amountsp[i]. This is the new position on the curve
     # after the withdrawal without applying fees.
-    y: uint256 = (staticcall _MATH.get_y(A_gamma[0], A_gamma[1], xp_new, D - dD, j))[0]
+    y: uint256 = self._get_y(A_gamma, xp_new, D - dD, j)[0]
     amountsp[j] = xp[j] - y
     xp_new[j] = y
 
@@ -1177,7 +1430,7 @@ def _calc_withdraw_fixed_out(
     # We reduce D by the withdrawn + fees.
     D -= dD
     # Same reasoning as before except now we're charging fees.
-    y = (staticcall _MATH.get_y(A_gamma[0], A_gamma[1], xp_new, D, j))[0]
+    y = self._get_y(A_gamma, xp_new, D, j)[0]
     # We descale y to obtain the amount dy in balances and not scaled balances.
     dy: uint256 = (xp[j] - y) * WAD // price_scales[j]
     xp_new[j] = y
@@ -1199,31 +1452,56 @@ def internal_price_oracle() -> uint256:
     @param k The index of the coin.
     @return uint256 Price oracle value of kth coin.
     """
-    price_oracle: uint256 = self.cached_price_oracle
+    oracle_timestamp: uint256[2] = utils.unpack_2(self.packed_price_oracle_timestamp)
+    price_oracle: uint256 = oracle_timestamp[0]
     price_scale: uint256 = self.cached_price_scale
-    last_prices_timestamp: uint256 = self.last_timestamp
+    last_prices_timestamp: uint256 = oracle_timestamp[1]
 
     if last_prices_timestamp < block.timestamp:  # <------------ Update moving
         #                                                   average if needed.
 
-        last_prices: uint256 = self.last_prices
-        ma_time: uint256 = params._ma_time()
-        alpha: uint256 = staticcall _MATH.wad_exp(
-            -convert(
-                unsafe_sub(block.timestamp, last_prices_timestamp) * 10**18 // ma_time,
-                int256,
-            )
+        return self._moving_average(
+            price_oracle,
+            utils.unpack_2(self.packed_last_prices_xcp_profit)[0],
+            price_scale,
+            unsafe_sub(block.timestamp, last_prices_timestamp),
+            params._ma_time(),
         )
 
-        # ---- We cap state price that goes into the EMA with 2 x price_scale.
-        return (
-            min(last_prices, 2 * price_scale) * (10**18 - alpha) +
-            price_oracle * alpha
-        ) // 10**18
-
     return price_oracle
 
 
+@internal
+@view
+def _moving_average(
+    price_oracle: uint256,
+    last_prices: uint256,
+    price_scale: uint256,
+    dt: uint256,
+    ma_time: uint256,
+) -> uint256:
+    """
+    @notice Moves the price oracle towards the last price, `dt` seconds
+            after the last update.
+    @param price_oracle Price oracle at the last update.
+    @param last_prices Spot price after the last trade before `dt`.
+    @param price_scale Current price scale.
+    @param dt Seconds since the last update.
+    @param ma_time Averaging window of the oracle.
+    @return uint256 Updated price oracle.
+    """
+    alpha: uint256 = staticcall _MATH.wad_exp(
+        -convert(unsafe_div(dt * 10**18, ma_time), int256)
+    )
+
+    # ----- We cap state price that goes into the EMA with 2 x price_scale.
+    return unsafe_div(
+        min(last_prices, 2 * price_scale) * (10**18 - alpha) +
+        price_oracle * alpha,  # ^-------- Cap spot price into EMA.
+        10**18
+    )
+
+
 @external
 @view
 def calc_token_amount(amounts: uint256[N_COINS], deposit: bool) -> uint256:
@@ -1281,7 +1559,8 @@ def lp_price() -> uint256:
             0th index
     @return uint256 LP price.
     """
-    return 2 * self.virtual_price * isqrt(self.internal_price_oracle() * 10**18) // 10**18
+    virtual_price: uint256 = utils.unpack_2(self.packed_D_virtual_price)[1]
+    return 2 * virtual_price * self._sqrt_price(self.internal_price_oracle()) // 10**18
 
 
 @external
@@ -1290,11 +1569,12 @@ def lp_price() -> uint256:
 def get_virtual_price() -> uint256:
     """
     @notice Calculates the current virtual price of the pool LP token.
-    @dev Not to be confused with `self.virtual_price` which is a cached
+    @dev Not to be confused with `virtual_price` which is a cached
          virtual price.
     @return uint256 Virtual Price.
     """
-    return 10**18 * self._xcp(self.D, self.cached_price_scale) // erc20.totalSupply
+    D: uint256 = utils.unpack_2(self.packed_D_virtual_price)[0]
+    return 10**18 * self._xcp(D, self.cached_price_scale) // erc20.totalSupply
 
 
 @external
@@ -1326,6 +1606,59 @@ def price_scale() -> uint256:
     return self.cached_price_scale
 
 
+@external
+@view
+def last_prices() -> uint256:
+    """
+    @notice Returns the spot price of the coin at index 1 w.r.t the coin at
+            index 0 after the latest trade.
+    @return uint256 Last spot price.
+    """
+    return utils.unpack_2(self.packed_last_prices_xcp_profit)[0]
+
+
+@external
+@view
+def last_timestamp() -> uint256:
+    """
+    @notice Returns the timestamp of the latest price oracle update.
+    @return uint256 Timestamp of the last update.
+    """
+    return utils.unpack_2(self.packed_price_oracle_timestamp)[1]
+
+
+@external
+@view
+def D() -> uint256:
+    """
+    @notice Returns the cached invariant of the pool.
+    @return uint256 D.
+    """
+    return utils.unpack_2(self.packed_D_virtual_price)[0]
+
+
+@external
+@view
+def xcp_profit() -> uint256:
+    """
+    @notice Returns the full profit of the pool.
+    @return uint256 xcp_profit.
+    """
+    return utils.unpack_2(self.packed_last_prices_xcp_profit)[1]
+
+
+@external
+@view
+def virtual_price() -> uint256:
+    """
+    @notice Returns the cached virtual price of the pool LP token.
+    @dev Not to be confused with `get_virtual_price`, which computes it
+         from the current D and price scale.
+    @return uint256 Cached virtual price.
+    """
+    return utils.unpack_2(self.packed_D_virtual_price)[1]
+
+
 @external
 @view
 def fee() -> uint256:
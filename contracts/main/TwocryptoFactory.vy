@@ -17,6 +17,7 @@ struct PoolArray:
     coins: address[N_COINS]
     decimals: uint256[N_COINS]
     implementation: address
+    standard_erc20: bool
 
 
 N_COINS: constant(uint256) = 2
@@ -44,6 +45,11 @@ markets: HashMap[uint256, DynArray[address, 4294967296]]
 pool_data: HashMap[address, PoolArray]
 pool_list: public(DynArray[address, 4294967296])   # master list of pools
 
+# coins vetted by the admin to transfer exactly the amount asked for (no fee
+# on transfer, no rebasing). Pools of two such coins skip measuring their
+# balance around every transfer in.
+standard_tokens: public(HashMap[address, bool])
+
 
 
 @deploy
@@ -153,6 +159,8 @@ def deploy_pool(
     # pack gamma and A
     packed_gamma_A: uint256 = self._pack_2(gamma, A)
 
+    standard_erc20: bool = self.standard_tokens[_coins[0]] and self.standard_tokens[_coins[1]]
+
     # pool is an ERC20 implementation
     _salt: bytes32 = block.prevhash
     pool: address = create_from_blueprint(
@@ -167,6 +175,7 @@ def deploy_pool(
         packed_fee_params,  # uint256
         packed_rebalancing_params,  # uint256
         initial_price,  # uint256
+        standard_erc20,  # bool
         code_offset=3,
     )
 
@@ -176,6 +185,7 @@ def deploy_pool(
     self.pool_data[pool].decimals = decimals
     self.pool_data[pool].coins = _coins
     self.pool_data[pool].implementation = pool_implementation
+    self.pool_data[pool].standard_erc20 = standard_erc20
 
     # add coins to market:
     self._add_coins_to_market(_coins[0], _coins[1], pool)
@@ -290,14 +300,61 @@ def set_views_implementation(_views_implementation: address):
 def set_math_implementation(_math_implementation: address):
     """
     @notice Set math implementation
+    @dev Pools call `newton_D_and_p`, which math contracts deployed before
+         it was added do not have: every pool deployed with one would
+         revert on its first deposit. Such implementations are rejected.
     @param _math_implementation Address of the new math contract
     """
     assert msg.sender == self.admin, "admin only"
 
+    if _math_implementation != empty(address):
+        # any balanced pool will do:
+        A: uint256 = 400000
+        gamma: uint256 = 145000000000000
+        xp: uint256[N_COINS] = [10**18, 10**18]
+        success: bool = False
+        response: Bytes[64] = b""
+        success, response = raw_call(
+            _math_implementation,
+            abi_encode(
+                A,
+                gamma,
+                xp,
+                empty(uint256),  # K0_prev
+                method_id=method_id("newton_D_and_p(uint256,uint256,uint256[2],uint256)"),
+            ),
+            max_outsize=64,
+            is_static_call=True,
+            revert_on_failure=False,
+        )
+        assert success and len(response) == 64, "math lacks newton_D_and_p"
+
     log ITwocryptoFactory.UpdateMathImplementation(old_math_implementation=self.math_implementation, new_math_implementation=_math_implementation)
     self.math_implementation = _math_implementation
 
 
+@external
+def set_standard_token(_token: address, _is_standard: bool):
+    """
+    @notice Mark a coin as a standard ERC20 for the pools deployed next
+    @dev Only for coins that transfer exactly the amount asked for: pools
+         of two standard coins credit `transferFrom` amounts without
+         checking their balance. Pools already deployed are not affected,
+         in either direction: the flag is an immutable of the pool and
+         unlisting a coin does not revoke it. A listed coin that later
+         takes a fee on transfer or rebases down (e.g. an upgradeable one)
+         leaves its pools crediting more than they receive, so that their
+         balances exceed their holdings. Unlisted coins, the default, are
+         measured by their balance.
+    @param _token Address of the coin
+    @param _is_standard True if the coin is a standard ERC20
+    """
+    assert msg.sender == self.admin, "admin only"
+
+    log ITwocryptoFactory.UpdateStandardToken(token=_token, is_standard=_is_standard)
+    self.standard_tokens[_token] = _is_standard
+
+
 @external
 def commit_transfer_ownership(_addr: address):
     """
@@ -422,6 +479,17 @@ def get_gauge(_pool: address) -> address:
     return self.pool_data[_pool].liquidity_gauge
 
 
+@view
+@external
+def get_standard_erc20(_pool: address) -> bool:
+    """
+    @notice Get whether a factory pool trusts its coins to be standard ERC20s
+    @param _pool Pool address
+    @return True if the pool skips balance checks on transfers in
+    """
+    return self.pool_data[_pool].standard_erc20
+
+
 @view
 @external
 def get_market_counts(coin_a: address, coin_b: address) -> uint256:
@@ -21,6 +21,10 @@ N_COINS: public(constant(uint256)) = c.N_COINS
 version: public(constant(String[8])) = "v2.1.0"
 
 
+# floor(log2(v)) of every v < 16, 4 bits per value.
+LOG2_TABLE: constant(uint256) = 3689348814455574784
+
+
 # ------------------------ AMM math functions --------------------------------
 
 
@@ -64,11 +68,8 @@ def _snekmate_log_2(x: uint256, roundup: bool) -> uint256:
     if value >> 4 != empty(uint256):
         value = value >> 4
         result = unsafe_add(result, 4)
-    if value >> 2 != empty(uint256):
-        value = value >> 2
-        result = unsafe_add(result, 2)
-    if value >> 1 != empty(uint256):
-        result = unsafe_add(result, 1)
+    # `value` < 16: the last two steps are looked up instead.
+    result = unsafe_add(result, (LOG2_TABLE >> unsafe_mul(value, 4)) & 15)
 
     if (roundup and (1 << result) < x):
         result = unsafe_add(result, 1)
@@ -218,9 +219,9 @@ def newton_y(ANN: uint256, gamma: uint256, x: uint256[N_COINS], D: uint256, i: u
     return y
 
 
-@external
+@internal
 @pure
-def get_y(
+def _get_y(
     _ANN: uint256,
     _gamma: uint256,
     _x: uint256[N_COINS],
@@ -280,27 +281,11 @@ def get_y(
     # delta1: int256 = 9*a*c/b - 2*b - 27*a**2/b*d/b
     delta1: int256 = 3 * delta0 + b - 27*a**2//b*d//b
 
+    # threshold <= a = 10**32: the dividers of larger thresholds (up to
+    # 10**30 above 10**48) could never be picked and are left out.
     divider: int256 = 1
     threshold: int256 = min(min(abs(delta0), abs(delta1)), a)
-    if threshold > 10**48:
-        divider = 10**30
-    elif threshold > 10**46:
-        divider = 10**28
-    elif threshold > 10**44:
-        divider = 10**26
-    elif threshold > 10**42:
-        divider = 10**24
-    elif threshold > 10**40:
-        divider = 10**22
-    elif threshold > 10**38:
-        divider = 10**20
-    elif threshold > 10**36:
-        divider = 10**18
-    elif threshold > 10**34:
-        divider = 10**16
-    elif threshold > 10**32:
-        divider = 10**14
-    elif threshold > 10**30:
+    if threshold > 10**30:
         divider = 10**12
     elif threshold > 10**28:
         divider = 10**10
@@ -366,8 +351,20 @@ def get_y(
 
 
 @external
-@view
-def newton_D(ANN: uint256, gamma: uint256, x_unsorted: uint256[N_COINS], K0_prev: uint256 = 0) -> uint256:
+@pure
+def get_y(
+    _ANN: uint256,
+    _gamma: uint256,
+    _x: uint256[N_COINS],
+    _D: uint256,
+    i: uint256
+) -> uint256[2]:
+    return self._get_y(_ANN, _gamma, _x, _D, i)
+
+
+@internal
+@pure
+def _newton_D(ANN: uint256, gamma: uint256, x_unsorted: uint256[N_COINS], K0_prev: uint256) -> uint256:
     """
     Finding the invariant using Newton method.
     ANN is higher by the factor A_MULTIPLIER
@@ -456,7 +453,134 @@ def newton_D(ANN: uint256, gamma: uint256, x_unsorted: uint256[N_COINS], K0_prev
 
 @external
 @view
-def get_p(
+def newton_D(ANN: uint256, gamma: uint256, x_unsorted: uint256[N_COINS], K0_prev: uint256 = 0) -> uint256:
+    return self._newton_D(ANN, gamma, x_unsorted, K0_prev)
+
+
+@internal
+@pure
+def _newton_D_and_p(ANN: uint256, gamma: uint256, x_unsorted: uint256[N_COINS], K0_prev: uint256) -> uint256[2]:
+    """
+    @notice newton_D followed by get_p at the D found, for the pool to
+            update both after a trade in a single call.
+    @dev The intermediates of the last Newton iteration were computed
+         with the previous iterate of D, so get_p is evaluated again at
+         the converged D to return exactly what it would have.
+         Pools depend on this entry point, so they cannot use a math
+         implementation deployed before it was added. The factory rejects
+         such implementations in set_math_implementation.
+    """
+    D: uint256 = self._newton_D(ANN, gamma, x_unsorted, K0_prev)
+    return [D, self._get_p(x_unsorted, D, [ANN, gamma])]
+
+
+@external
+@view
+def newton_D_and_p(ANN: uint256, gamma: uint256, x_unsorted: uint256[N_COINS], K0_prev: uint256) -> uint256[2]:
+    return self._newton_D_and_p(ANN, gamma, x_unsorted, K0_prev)
+
+
+@internal
+@pure
+def _get_K0(ANN: uint256, gamma: uint256, x: uint256[N_COINS]) -> uint256:
+    """
+    @notice Estimate of K0 = 4 * x[0] * x[1] / D**2 at the invariant, for
+            newton_D to start from. x must be sorted (x[0] >= x[1]).
+    @dev With u = 1 - K0, r = 4 * x[0] * x[1] / (x[0] + x[1])**2 and
+         k = ANN * gamma**2 / A_MULTIPLIER the 2-coin invariant reads
+             u * (gamma + u)**2 = k * (1 - u) * (sqrt(1 - u) / sqrt(r) - 1)
+         Taking sqrt(1 - u) ~ 1 - u / 2 leaves a cubic in u:
+             u**3 + b * u**2 + c * u - e = 0
+         solved like in get_y with Cardano's formula when it has one real
+         root. When it has three, the smallest one is the one in [0, 1)
+         and the cubic is concave up to it: Newton's method from u = 0
+         approaches it from below without overshooting.
+         Returns 0 (no estimate) for values that newton_D rejects.
+    """
+    if (
+        ANN < c.MIN_A or ANN > c.MAX_A or
+        gamma < c.MIN_GAMMA or gamma > c.MAX_GAMMA or
+        x[0] > 10**15 * 10**18 or
+        unsafe_div(x[1] * 10**18, x[0]) < 10**14
+    ):
+        return 0
+
+    # sqrt(r), in (0, 10**18]
+    sqrt_r: int256 = convert(
+        unsafe_div(2 * 10**18 * isqrt(x[0] * x[1]), unsafe_add(x[0], x[1])), int256
+    )
+    inv_sqrt_r: int256 = 10**36 // sqrt_r
+    k: int256 = convert(ANN * gamma**2 // c.A_MULTIPLIER // 10**18, int256)
+    g: int256 = convert(gamma, int256)
+
+    # b = 2 * gamma - k / (2 * sqrt(r))
+    b: int256 = 2 * g - k * inv_sqrt_r // (2 * 10**18)
+    # c = gamma**2 + k * (3 / (2 * sqrt(r)) - 1)
+    _c: int256 = g**2 // 10**18 + k * (3 * inv_sqrt_r // 2 - 10**18) // 10**18
+    # e = k * (1 / sqrt(r) - 1)
+    e: int256 = k * (inv_sqrt_r - 10**18) // 10**18
+
+    # Depressed cubic w**3 + p * w + q = 0 with u = w - b / 3
+    p3: int256 = (_c - b * b // (3 * 10**18)) // 3  # p / 3
+    q2: int256 = ((2 * b * b // (27 * 10**18)) * b // 10**18 - b * _c // (3 * 10**18) - e) // 2  # q / 2
+    delta: int256 = q2**2 + p3 * p3 // 10**18 * p3
+
+    u: int256 = 0
+    if delta >= 0:
+        sqrt_delta: int256 = convert(isqrt(convert(delta, uint256)), int256)
+        w: int256 = 0
+        if sqrt_delta > q2:
+            w = convert(self._cbrt(convert(sqrt_delta - q2, uint256)), int256)
+        else:
+            w = -convert(self._cbrt(convert(q2 - sqrt_delta, uint256)), int256)
+        if -sqrt_delta > q2:
+            w += convert(self._cbrt(convert(-sqrt_delta - q2, uint256)), int256)
+        else:
+            w -= convert(self._cbrt(convert(q2 + sqrt_delta, uint256)), int256)
+        u = w - b // 3
+    else:
+        for _i: uint256 in range(4):
+            # f = ((u + b) * u + c) * u - e, f' = (3 * u + 2 * b) * u + c
+            f: int256 = ((u + b) * u // 10**18 + _c) * u // 10**18 - e
+            fprime: int256 = (3 * u + 2 * b) * u // 10**18 + _c
+            if fprime <= 0:
+                return 0
+            u -= f * 10**18 // fprime
+
+    if u < 0:
+        u = 0
+    if u >= 10**18:
+        return 0
+    return convert(10**18 - u, uint256)
+
+
+@internal
+@pure
+def _get_D(ANN: uint256, gamma: uint256, x_unsorted: uint256[N_COINS]) -> uint256:
+    """
+    @notice Finding the invariant from an analytic estimate (see _get_K0),
+            with Newton's method as the fallback for its approximation
+            error: a couple of iterations instead of newton_D's cold start.
+    @dev A standalone entry point for integrators and off-chain tooling:
+         pools do not call it, and keep working with math implementations
+         that lack it.
+    """
+    x: uint256[N_COINS] = x_unsorted
+    if x[0] < x[1]:
+        x = [x_unsorted[1], x_unsorted[0]]
+
+    return self._newton_D(ANN, gamma, x_unsorted, self._get_K0(ANN, gamma, x))
+
+
+@external
+@view
+def get_D(ANN: uint256, gamma: uint256, x_unsorted: uint256[N_COINS]) -> uint256:
+    return self._get_D(ANN, gamma, x_unsorted)
+
+
+@internal
+@pure
+def _get_p(
     _xp: uint256[N_COINS], _D: uint256, _A_gamma: uint256[N_COINS]
 ) -> uint256:
     """
@@ -506,7 +630,21 @@ def get_p(
     )
 
 
+@external
+@view
+def get_p(
+    _xp: uint256[N_COINS], _D: uint256, _A_gamma: uint256[N_COINS]
+) -> uint256:
+    return self._get_p(_xp, _D, _A_gamma)
+
+
+@internal
+@pure
+def _wad_exp(x: int256) -> uint256:
+    return convert(math._wad_exp(x), uint256)
+
+
 @external
 @pure
 def wad_exp(x: int256) -> uint256:
-    return convert(math._wad_exp(x), uint256)
+    return self._wad_exp(x)
@@ -18,20 +18,26 @@ import constants as c
 N_COINS: constant(uint256) = c.N_COINS
 WAD: constant(uint256) = c.WAD
 
+MAX_QUOTES: constant(uint256) = 64  # <--------- Per get_dy_many/get_dx_many.
+
+# What quoting an exchange reads from the pool, read once per call.
+struct PoolState:
+    math: ITwocryptoMath
+    balances: uint256[N_COINS]
+    D: uint256
+    price_scale: uint256
+    A: uint256
+    gamma: uint256
+    precisions: uint256[N_COINS]
+
+
 @external
 @view
 def get_dy(
     i: uint256, j: uint256, dx: uint256, swap: address
 ) -> uint256:
 
-    dy: uint256 = 0
-    xp: uint256[N_COINS] = empty(uint256[N_COINS])
-
-    # dy = (get_y(x + dx) - y) * (1 - fee)
-    dy, xp = self._get_dy_nofee(i, j, dx, swap)
-    dy -= staticcall ITwocrypto(swap).fee_calc(xp) * dy // 10**10
-
-    return dy
+    return self._get_dy(i, j, dx, swap, self._pool_state(swap))
 
 
 @view
@@ -40,16 +46,47 @@ def get_dx(
     i: uint256, j: uint256, dy: uint256, swap: address
 ) -> uint256:
 
-    dx: uint256 = 0
-    xp: uint256[N_COINS] = empty(uint256[N_COINS])
-    fee_dy: uint256 = 0
-    _dy: uint256 = dy
+    return self._get_dx(i, j, dy, swap, self._pool_state(swap))
 
-    # for more precise dx (but never exact), increase num loops
-    for k: uint256 in range(5):
-        dx, xp = self._get_dx_fee(i, j, _dy, swap)
-        fee_dy = staticcall ITwocrypto(swap).fee_calc(xp) * _dy // 10**10
-        _dy = dy + fee_dy + 1
+
+@external
+@view
+def get_dy_many(
+    i: uint256,
+    j: uint256,
+    dx: DynArray[uint256, MAX_QUOTES],
+    swap: address
+) -> DynArray[uint256, MAX_QUOTES]:
+    """
+    @notice get_dy of each amount of `dx`, reading the pool once
+    @dev Every amount is quoted on the current state of the pool, not after
+         the ones before it (e.g. for the price impact curve of the pool).
+    """
+    state: PoolState = self._pool_state(swap)
+    dy: DynArray[uint256, MAX_QUOTES] = []
+    for _dx: uint256 in dx:
+        dy.append(self._get_dy(i, j, _dx, swap, state))
+
+    return dy
+
+
+@view
+@external
+def get_dx_many(
+    i: uint256,
+    j: uint256,
+    dy: DynArray[uint256, MAX_QUOTES],
+    swap: address
+) -> DynArray[uint256, MAX_QUOTES]:
+    """
+    @notice get_dx of each amount of `dy`, reading the pool once
+    @dev Every amount is quoted on the current state of the pool, not after
+         the ones before it.
+    """
+    state: PoolState = self._pool_state(swap)
+    dx: DynArray[uint256, MAX_QUOTES] = []
+    for _dy: uint256 in dy:
+        dx.append(self._get_dx(i, j, _dy, swap, state))
 
     return dx
 
@@ -88,7 +125,7 @@ def calc_fee_get_dy(i: uint256, j: uint256, dx: uint256, swap: address
 
     dy: uint256 = 0
     xp: uint256[N_COINS] = empty(uint256[N_COINS])
-    dy, xp = self._get_dy_nofee(i, j, dx, swap)
+    dy, xp = self._get_dy_nofee(i, j, dx, self._pool_state(swap))
 
     return (staticcall ITwocrypto(swap).fee_calc(xp)) * dy // 10**10
 
@@ -133,15 +170,51 @@ def _calc_D_ramp(
         _xp: uint256[N_COINS] = xp
         _xp[0] *= precisions[0]
         _xp[1] = _xp[1] * price_scale * precisions[1] // WAD
-        D = staticcall math.newton_D(A, gamma, _xp, 0)
+        D = staticcall math.newton_D(A, gamma, _xp, self._K0(_xp, D))
 
     return D
 
 
+@internal
+@view
+def _get_dy(
+    i: uint256, j: uint256, dx: uint256, swap: address, state: PoolState
+) -> uint256:
+
+    dy: uint256 = 0
+    xp: uint256[N_COINS] = empty(uint256[N_COINS])
+
+    # dy = (get_y(x + dx) - y) * (1 - fee)
+    dy, xp = self._get_dy_nofee(i, j, dx, state)
+    dy -= staticcall ITwocrypto(swap).fee_calc(xp) * dy // 10**10
+
+    return dy
+
+
+@internal
+@view
+def _get_dx(
+    i: uint256, j: uint256, dy: uint256, swap: address, state: PoolState
+) -> uint256:
+
+    dx: uint256 = 0
+    xp: uint256[N_COINS] = empty(uint256[N_COINS])
+    fee_dy: uint256 = 0
+    _dy: uint256 = dy
+
+    # for more precise dx (but never exact), increase num loops
+    for k: uint256 in range(5):
+        dx, xp = self._get_dx_fee(i, j, _dy, state)
+        fee_dy = staticcall ITwocrypto(swap).fee_calc(xp) * _dy // 10**10
+        _dy = dy + fee_dy + 1
+
+    return dx
+
+
 @internal
 @view
 def _get_dx_fee(
-    i: uint256, j: uint256, dy: uint256, swap: address
+    i: uint256, j: uint256, dy: uint256, state: PoolState
 ) -> (uint256, uint256[N_COINS]):
 
     # here, dy must include fees (and 1 wei offset)
@@ -149,24 +222,16 @@ def _get_dx_fee(
     assert i != j and i < N_COINS and j < N_COINS, "coin index out of range"
     assert dy > 0, "do not exchange out 0 coins"
 
-    math: ITwocryptoMath = staticcall ITwocrypto(swap).MATH()
-
-    xp: uint256[N_COINS] = empty(uint256[N_COINS])
-    precisions: uint256[N_COINS] = empty(uint256[N_COINS])
-    price_scale: uint256 = 0
-    D: uint256 = 0
-    token_supply: uint256 = 0
-    A: uint256 = 0
-    gamma: uint256 = 0
-
-    xp, D, token_supply, price_scale, A, gamma, precisions = self._prep_calc(swap)
+    precisions: uint256[N_COINS] = state.precisions
+    price_scale: uint256 = state.price_scale
 
     # adjust xp with output dy. dy contains fee element, which we handle later
     # (hence this internal method is called _get_dx_fee)
+    xp: uint256[N_COINS] = state.balances
     xp[j] -= dy
     xp = [xp[0] * precisions[0], xp[1] * price_scale * precisions[1] // WAD]
 
-    x_out: uint256[2] = staticcall math.get_y(A, gamma, xp, D, i)
+    x_out: uint256[2] = staticcall state.math.get_y(state.A, state.gamma, xp, state.D, i)
     dx: uint256 = x_out[0] - xp[i]
     xp[i] = x_out[0]
 
@@ -180,32 +245,24 @@ def _get_dx_fee(
 @internal
 @view
 def _get_dy_nofee(
-    i: uint256, j: uint256, dx: uint256, swap: address
+    i: uint256, j: uint256, dx: uint256, state: PoolState
 ) -> (uint256, uint256[N_COINS]):
 
     assert i != j and i < N_COINS and j < N_COINS, "coin index out of range"
     assert dx > 0, "do not exchange 0 coins"
 
-    math: ITwocryptoMath = staticcall ITwocrypto(swap).MATH()
-
-    xp: uint256[N_COINS] = empty(uint256[N_COINS])
-    precisions: uint256[N_COINS] = empty(uint256[N_COINS])
-    price_scale: uint256 = 0
-    D: uint256 = 0
-    token_supply: uint256 = 0
-    A: uint256 = 0
-    gamma: uint256 = 0
-
-    xp, D, token_supply, price_scale, A, gamma, precisions = self._prep_calc(swap)
+    precisions: uint256[N_COINS] = state.precisions
+    price_scale: uint256 = state.price_scale
 
     # adjust xp with input dx
+    xp: uint256[N_COINS] = state.balances
     xp[i] += dx
     xp = [
         xp[0] * precisions[0],
         xp[1] * price_scale * precisions[1] // WAD
     ]
 
-    y_out: uint256[2] = staticcall math.get_y(A, gamma, xp, D, j)
+    y_out: uint256[2] = staticcall state.math.get_y(state.A, state.gamma, xp, state.D, j)
 
     dy: uint256 = xp[j] - y_out[0] - 1
     xp[j] = y_out[0]
@@ -234,6 +291,10 @@ def _calc_dtoken_nofee(
 
     xp, D0, token_supply, price_scale, A, gamma, precisions = self._prep_calc(swap)
 
+    old_xp: uint256[N_COINS] = [
+        xp[0] * precisions[0],
+        xp[1] * price_scale * precisions[1] // WAD
+    ]
     amountsp: uint256[N_COINS] = amounts
     if deposit:
         for k: uint256 in range(N_COINS):
@@ -251,7 +312,7 @@ def _calc_dtoken_nofee(
         amountsp[1] * price_scale * precisions[1] // WAD
     ]
 
-    D: uint256 = staticcall math.newton_D(A, gamma, xp, 0)
+    D: uint256 = staticcall math.newton_D(A, gamma, xp, self._K0(old_xp, D0))
     d_token: uint256 = token_supply * D // D0
 
     if deposit:
@@ -294,10 +355,9 @@ def _calc_withdraw_one_coin(
     if i == 0:
         price_scale_i = WAD * precisions[0]
 
+    D0 = staticcall ITwocrypto(swap).D()
     if staticcall ITwocrypto(swap).future_A_gamma_time() > block.timestamp:
-        D0 = staticcall math.newton_D(A, gamma, xp, 0)
-    else:
-        D0 = staticcall ITwocrypto(swap).D()
+        D0 = staticcall math.newton_D(A, gamma, xp, self._K0(xp, D0))
 
     D: uint256 = D0
 
@@ -331,6 +391,18 @@ def _fee(xp: uint256[N_COINS], swap: address) -> uint256:
     return (fee_params[0] * f + fee_params[1] * (10**18 - f)) // 10**18
 
 
+@internal
+@view
+def _pool_state(swap: address) -> PoolState:
+
+    state: PoolState = empty(PoolState)
+    token_supply: uint256 = 0
+    state.math = staticcall ITwocrypto(swap).MATH()
+    state.balances, state.D, token_supply, state.price_scale, state.A, state.gamma, state.precisions = self._prep_calc(swap)
+
+    return state
+
+
 @internal
 @view
 def _prep_calc(swap: address) -> (
@@ -360,6 +432,15 @@ def _prep_calc(swap: address) -> (
     return xp, D, token_supply, price_scale, A, gamma, precisions
 
 
+@internal
+@pure
+def _K0(xp: uint256[N_COINS], D: uint256) -> uint256:
+    # same starting point for newton_D as the pool (see Twocrypto._K0)
+    if D == 0:
+        return 0
+    return unsafe_div(unsafe_div((10**18 * N_COINS**2) * xp[0], D) * xp[1], D)
+
+
 @internal
 @view
 def _unpack_3(_packed: uint256) -> uint256[3]:
@@ -42,6 +42,7 @@ def pack_2(p1: uint256, p2: uint256) -> uint256:
     @param p2 The second integer to pack
     @return uint256 Integer with packed values
     """
+    assert p1 | p2 <= MAX_UINT128  # <-- neither value spills into the other.
     return p1 | (p2 << 128)
 
 
@@ -49,7 +49,7 @@ def ramp_A_gamma(
     @param future_gamma The future gamma value.
     @param future_time The timestamp at which the ramping will end.
     """
-    assert msg.sender == self._admin(), "only owner"
+    self._check_admin()
     assert not self._is_ramping(), "ramp undergoing"
     assert future_time > block.timestamp + c.MIN_RAMP_TIME - 1, "ramp time<min"
 
@@ -91,7 +91,7 @@ def stop_ramp_A_gamma():
     @notice Stop Ramping A and gamma parameters immediately.
     @dev Only accessible by admin.
     """
-    assert msg.sender == self._admin(), "only owner"
+    self._check_admin()
 
     A_gamma: uint256[2] = self._A_gamma()
     packed_gamma_A: uint256 = utils.pack_2(A_gamma[1], A_gamma[0]) # [gamma, A]
@@ -125,7 +125,7 @@ def apply_new_parameters(
     @param _new_adjustment_step The new adjustment step.
     @param _new_ma_time The new ma time. ma_time is time_in_seconds/ln(2).
     """
-    assert msg.sender == self._admin(), "only owner"
+    self._check_admin()
 
     # ----------------------------- Set fee params ---------------------------
 
@@ -211,6 +211,12 @@ def _admin() -> address:
     return staticcall factory.admin()
 
 
+@view
+@internal
+def _check_admin():
+    assert msg.sender == self._admin(), "only owner"
+
+
 @external
 @view
 def admin() -> address:
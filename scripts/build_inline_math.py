@@ -0,0 +1,55 @@
+"""
+Builds `TwocryptoInlineMath.vy`, the variant of the pool with the math
+inlined: `TwocryptoMath` is imported as a module and called internally
+instead of through `staticcall`s to the math implementation. Every swap
+saves the call overhead and ABI encoding of its 4-5 math calls, for a
+larger bytecode.
+
+The variant is generated from `Twocrypto.vy`, so that the two cannot
+drift apart, and committed, so that it deploys like any other contract.
+The factory deploys it as a separate pool implementation id. It still
+takes (and returns from `MATH()`) the math implementation, which the
+views contract and integrators call.
+
+    python scripts/build_inline_math.py          # write the variant
+    python scripts/build_inline_math.py --check  # fail if it is stale
+"""
+
+import re
+import sys
+
+POOL_PATH = "contracts/main/Twocrypto.vy"
+INLINE_PATH = "contracts/main/TwocryptoInlineMath.vy"
+
+# every math function the pool calls
+INLINED = ("get_y", "newton_D_and_p", "newton_D", "get_p", "wad_exp")
+
+HEADER = "# Generated from Twocrypto.vy by scripts/build_inline_math.py, do not edit.\n"
+
+
+def inline_source(path=POOL_PATH):
+    with open(path) as f:
+        src = f.read()
+
+    pragma, rest = src.split("\n", 1)
+    src = f"{pragma}\n{HEADER}{rest}"
+    src = src.replace(
+        "import constants as c\n", "import constants as c\nimport TwocryptoMath as math\n"
+    )
+    # every external entry point of the math contract wraps an internal
+    # function of the same name with a leading underscore
+    src = re.sub(rf"staticcall _MATH\.({'|'.join(INLINED)})\(", r"math._\1(", src)
+    assert "staticcall _MATH." not in src
+
+    return src
+
+
+if __name__ == "__main__":
+    src = inline_source()
+    if "--check" in sys.argv:
+        with open(INLINE_PATH) as f:
+            if f.read() != src:
+                sys.exit(f"{INLINE_PATH} is stale, run scripts/build_inline_math.py")
+    else:
+        with open(INLINE_PATH, "w") as f:
+            f.write(src)
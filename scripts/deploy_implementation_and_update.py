@@ -70,6 +70,9 @@ def deploy(network, url, account, fork=False):
 
     if boa.env.eoa == factory.admin():
         # update implementation here
+        # Pools from v2.1.0 take a `standard_erc20` constructor argument that
+        # older factories do not pass: their deployments would revert. Only
+        # set the blueprint on a factory deployed from the same tree.
         if not factory.pool_implementations(0) == amm_blueprint.address:
             logger.log("Setting AMM implementation ...")
             factory.set_pool_implementation(amm_blueprint, 0)
@@ -4,9 +4,11 @@ from tests.utils.constants import (
     MATH_DEPLOYER,
     GAUGE_DEPLOYER,
     POOL_DEPLOYER,
+    POOL_INLINE_MATH_DEPLOYER,
     VIEW_DEPLOYER,
     FACTORY_DEPLOYER,
     ERC20_DEPLOYER,
+    CODE_SIZE_LIMIT,
 )
 import boa
 
@@ -143,6 +145,20 @@ def amm_implementation(deployer):
         return POOL_DEPLOYER.deploy_as_blueprint()
 
 
+@fixture(scope="module")
+def large_code_size_limit():
+    # as on chains that allow contracts larger than EIP-170 does
+    with boa.env.evm.patch.anchor():
+        boa.env.evm.patch.code_size_limit = 2 * CODE_SIZE_LIMIT
+        yield
+
+
+@fixture(scope="module")
+def inline_math_amm_implementation(deployer, large_code_size_limit):
+    with boa.env.prank(deployer):
+        return POOL_INLINE_MATH_DEPLOYER.deploy_as_blueprint()
+
+
 @fixture(scope="module")
 def views_contract(deployer):
     with boa.env.prank(deployer):
@@ -188,12 +204,19 @@ def params():
     }
 
 
+@fixture(scope="module")
+def pool_deployer():
+    # source the pool is wrapped with, that of `amm_implementation`
+    return POOL_DEPLOYER
+
+
 @fixture(scope="module")
 def pool(
     factory,
     coins,
     params,
     deployer,
+    pool_deployer,
 ):
     with boa.env.prank(deployer):
         pool = factory.deploy_pool(
@@ -212,7 +235,7 @@ def pool(
             params["initial_prices"][1],  # initial_price: uint256
         )
 
-    return POOL_DEPLOYER.at(pool)
+    return pool_deployer.at(pool)
 
 
 @fixture(scope="module")
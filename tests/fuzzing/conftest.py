@@ -14,3 +14,12 @@ def math_optimized(deployer):
 def math_unoptimized(deployer):
     with boa.env.prank(deployer):
         return boa.load("contracts/old/CurveCryptoSwap2Math.vy")
+
+
+@pytest.fixture(scope="module")
+def math_iterations(deployer):
+    # math contract that also records the iterations of newton_D/_newton_y
+    from tests.utils.newton_profile import math_harness
+
+    with boa.env.prank(deployer):
+        return math_harness()
@@ -1,11 +1,56 @@
 import pytest
 from boa.test import strategy
-from hypothesis import example, given, settings
+from hypothesis import assume, event, example, given, settings
+from hypothesis import strategies as st
 from vyper.utils import SizeLimits
 
+import tests.utils.simulator as sim
+
 SETTINGS = {"max_examples": 10000, "deadline": None}
 MAX_VAL = SizeLimits.MAX_UINT256
 MAX_CBRT_PRECISE_VAL = MAX_VAL // 10**36
+# _cbrt scales x by 10**36, 10**18 or 1 below/above these
+SCALED_36 = 115792089237316195423570985008687907853269
+SCALED_18 = SCALED_36 * 10**18
+
+
+def _scale(x):
+    if x >= SCALED_18:
+        return 1, 10**12
+    if x >= SCALED_36:
+        return 10**18, 10**6
+    return 10**36, 1
+
+
+def _icbrt(n):
+    # floor of the cube root of n
+    if n == 0:
+        return 0
+    a = 1 << ((n.bit_length() + 2) // 3)
+    while True:
+        b = (2 * a + n // (a * a)) // 3
+        if b >= a:
+            return a
+        a = b
+
+
+def cbrt_legacy(x):
+    # _cbrt as deployed: log2 guess and 7 Newton iterations
+    scale, unscale = _scale(x)
+    xx = x * scale
+    log2x = max(xx.bit_length() - 1, 0)
+    remainder = log2x % 3
+    a = 2 ** (log2x // 3) * 1260**remainder // 1000**remainder
+    for _ in range(7):
+        a = (2 * a + (xx // (a * a) if a > 0 else 0)) // 3
+    return a * unscale
+
+
+def uint256_by_size():
+    # as many values of every bit length as of any other
+    return st.integers(min_value=0, max_value=256).flatmap(
+        lambda n: st.integers(min_value=(1 << n) >> 1, max_value=(1 << n) - 1)
+    )
 
 
 @pytest.fixture(scope="module")
@@ -71,3 +116,56 @@ def test_cbrt_precision_loss_gte_limit(cbrt_1e18_base, math_optimized, val):
     cbrt_vyper = math_optimized.internal._cbrt(val)
     cbrt_python = cbrt_1e18_base(val)
     assert cbrt_vyper == pytest.approx(cbrt_python)
+
+
+@given(val=strategy("uint256"))
+@settings(**SETTINGS)
+@example(0)
+@example(MAX_VAL)
+@example(MAX_CBRT_PRECISE_VAL)
+@example(MAX_CBRT_PRECISE_VAL * 10**18)
+def test_cbrt_simulator(math_optimized, val):
+    # the simulator port must be bit-exact on the whole uint256 domain
+    assert sim._cbrt(val) == math_optimized.internal._cbrt(val)
+
+
+@given(val=uint256_by_size())
+@settings(**SETTINGS)
+@example(0)
+@example(MAX_VAL)
+@example(SCALED_36 - 1)
+@example(SCALED_36)
+@example(SCALED_18 - 1)
+@example(SCALED_18)
+def test_cbrt_legacy(math_optimized, val):
+    # _cbrt must stay bit-exact with the deployed math (_snekmate_log_2,
+    # which it starts from, is looked up from a table)
+    assert math_optimized.internal._cbrt(val) == cbrt_legacy(val)
+
+
+# bounds of the root r of the scaled argument on the paths that scale by 1
+# and by 10**18 (scaling by 10**36 leaves no room for the band below)
+BAND_ROOTS = {
+    1: (_icbrt(SCALED_18) + 1, _icbrt(MAX_VAL) - 1),
+    10**18: (_icbrt(SCALED_36 * 10**18) + 1, _icbrt(SCALED_18 * 10**18) - 1),
+}
+
+
+@pytest.mark.parametrize("scale", BAND_ROOTS)
+@given(data=st.data())
+@settings(**SETTINGS)
+def test_cbrt_legacy_band(math_optimized, scale, data):
+    """
+    Where r**3 + 3 * r**2 <= xx < (r + 1)**3, the integer Newton iteration
+    alternates between r and r + 1, and the deployed _cbrt returns either
+    one depending on its starting point. Any other starting point or
+    iteration count would change results there, so this band is fuzzed
+    on its own.
+    """
+    r = data.draw(st.integers(*BAND_ROOTS[scale]), label="r")
+    x = -(-(r**3 + 3 * r**2) // scale) + data.draw(st.integers(0, 3 * r // scale), label="k")
+    assume(x * scale < (r + 1) ** 3)
+
+    result = math_optimized.internal._cbrt(x)
+    event("r + 1" if result // _scale(x)[1] == r + 1 else "r")
+    assert result == cbrt_legacy(x)
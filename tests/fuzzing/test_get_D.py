@@ -0,0 +1,106 @@
+import boa
+import pytest
+from hypothesis import event, given, note, settings
+from hypothesis import strategies as st
+
+import tests.utils.simulator as sim
+from tests.utils.newton_profile import harness_call
+from tests.utils.strategies import A, gamma
+
+# you might want to increase this when fuzzing locally
+MAX_SAMPLES = 10000
+# N_CASES = 32 # Increase for fuzzing
+N_CASES = 1
+
+MIN_XD = 10**17
+MAX_XD = 10**19
+
+
+@pytest.mark.parametrize(
+    "_tmp", range(N_CASES)
+)  # Parallelisation hack (more details in folder's README)
+@given(
+    D=st.integers(min_value=10**18, max_value=10**14 * 10**18),  # 1 USD to 100T USD
+    xD=st.integers(min_value=MIN_XD, max_value=MAX_XD),
+    yD=st.integers(min_value=MIN_XD, max_value=MAX_XD),
+    A=A,
+    gamma=gamma,
+)
+@settings(max_examples=MAX_SAMPLES, deadline=None)
+def test_get_D(math_optimized, math_unoptimized, D, xD, yD, A, gamma, _tmp):
+    """
+    get_D must converge wherever a cold newton_D does, to the same D as
+    the old math contract and the simulator.
+    """
+    X = [D * xD // 10**18, D * yD // 10**18]
+
+    note("{" f"'ANN': {A}, 'GAMMA': {gamma}, 'x': {X}" "}\n")
+
+    try:
+        expected = math_optimized.newton_D(A, gamma, X)
+    except boa.BoaError:
+        event("newton_D reverted")
+        return
+
+    if math_optimized.internal._get_K0(A, gamma, sorted(X, reverse=True)) == 0:
+        event("no analytic estimate")
+
+    result = math_optimized.get_D(A, gamma, X)
+
+    for reference in (
+        expected,
+        math_unoptimized.newton_D(A, gamma, X),
+        sim.solve_D(A, gamma, X),
+    ):
+        assert abs(result - reference) <= max(10000, reference / 1e12)
+
+
+@pytest.mark.parametrize(
+    "_tmp", range(N_CASES)
+)  # Parallelisation hack (more details in folder's README)
+@given(
+    D=st.integers(min_value=10**17, max_value=10**15 * 10**18),
+    xD=st.integers(min_value=10**14, max_value=10**21),  # wider than the safe region
+    yD=st.integers(min_value=10**14, max_value=10**21),
+    A=A,
+    gamma=gamma,
+)
+@settings(max_examples=MAX_SAMPLES, deadline=None)
+def test_get_K0_simulator(math_optimized, D, xD, yD, A, gamma, _tmp):
+    """
+    The simulator port of the analytic estimate must return exactly
+    what the contract returns, including the cases it gives up on.
+    """
+    x = sorted([D * xD // 10**18, D * yD // 10**18], reverse=True)
+
+    note("{" f"'ANN': {A}, 'GAMMA': {gamma}, 'x': {x}" "}\n")
+
+    expected = math_optimized.internal._get_K0(A, gamma, x)
+    if expected == 0:
+        event("no analytic estimate")
+
+    assert sim.get_K0(A, gamma, x) == expected
+
+
+@given(
+    D=st.integers(min_value=10**18, max_value=10**14 * 10**18),
+    xD=st.integers(min_value=MIN_XD, max_value=MAX_XD),
+    yD=st.integers(min_value=MIN_XD, max_value=MAX_XD),
+    A=A,
+    gamma=gamma,
+)
+@settings(max_examples=MAX_SAMPLES // 10, deadline=None)
+def test_get_D_iterations(math_iterations, D, xD, yD, A, gamma):
+    """
+    Starting from the analytic estimate must not take more iterations
+    than the cold start it replaces, give or take the final step.
+    """
+    X = [D * xD // 10**18, D * yD // 10**18]
+
+    try:
+        _, cold = harness_call(math_iterations, "newton_D", A, gamma, X, 0)
+    except boa.BoaError:
+        return
+    _, analytic = harness_call(math_iterations, "get_D", A, gamma, X)
+
+    assert analytic["newton_D_iterations"] <= cold["newton_D_iterations"] + 1
@@ -5,6 +5,7 @@ import pytest
 from hypothesis import event, given, note, settings
 from hypothesis.strategies import integers
 
+import tests.utils.simulator as sim
 from tests.utils.strategies import A, gamma
 
 # you might want to increase this when fuzzing locally
@@ -120,3 +121,71 @@ def test_get_y(math_unoptimized, math_optimized, A, D, xD, yD, gamma, j, _tmp):
     assert abs(result_original - result_get_y) <= max(10**4, result_original / 1e8) or abs(
         calculate_F_by_y0(result_get_y)
     ) <= abs(calculate_F_by_y0(result_original))
+
+
+@pytest.mark.parametrize(
+    "_tmp", range(N_CASES)
+)  # Parallelisation hack (more details in folder's README)
+@given(
+    A=A,
+    gamma=gamma,
+    D=integers(min_value=10**18, max_value=10**14 * 10**18),  # 1 USD to 100T USD
+    xD=integers(min_value=10**17 // 2, max_value=10**19 // 2),
+    yD=integers(min_value=10**17 // 2, max_value=10**19 // 2),
+    j=integers(min_value=0, max_value=1),
+)
+@settings(max_examples=MAX_SAMPLES, deadline=None)
+def test_get_y_divider(math_optimized, A, D, xD, yD, gamma, j, _tmp):
+    """
+    get_y only compares the threshold against the dividers it can pick,
+    the simulator still walks the whole ladder of the previous
+    implementation: on the domain of test_get_y both find the same root.
+    """
+    X = [D * xD // 10**18, D * yD // 10**18]
+
+    note("{" f"'ANN': {A}, 'GAMMA': {gamma}, 'x': {X}, 'D': {D}, 'index': {j}" "}\n")
+
+    try:
+        expected = sim.get_y(A, gamma, X, D, j)
+    except ValueError:
+        with boa.reverts():
+            math_optimized.get_y(A, gamma, X, D, j)
+        return
+
+    assert list(math_optimized.get_y(A, gamma, X, D, j)) == expected
+
+
+@pytest.mark.parametrize(
+    "_tmp", range(N_CASES)
+)  # Parallelisation hack (more details in folder's README)
+@given(
+    A=A,
+    gamma=gamma,
+    D=integers(min_value=10**17, max_value=10**15 * 10**18),
+    xD=integers(min_value=10**15, max_value=10**21),  # wider than the safe region
+    yD=integers(min_value=10**15, max_value=10**21),
+    j=integers(min_value=0, max_value=1),
+)
+@settings(max_examples=MAX_SAMPLES, deadline=None)
+def test_get_y_simulator(math_optimized, A, D, xD, yD, gamma, j, _tmp):
+    """
+    The simulator port of get_y must return exactly what the
+    contract returns (including K0_prev and the newton_y fallback)
+    and must fail exactly when the contract reverts.
+    """
+    X = [D * xD // 10**18, D * yD // 10**18]
+
+    note("{" f"'ANN': {A}, 'GAMMA': {gamma}, 'x': {X}, 'D': {D}, 'index': {j}" "}\n")
+
+    try:
+        expected = math_optimized.get_y(A, gamma, X, D, j)
+    except boa.BoaError:
+        event("get_y reverted")
+        with pytest.raises(ValueError):
+            sim.get_y(A, gamma, X, D, j)
+        return
+
+    if expected[1] == 0:
+        event("fallback to newton_y")
+
+    assert sim.get_y(A, gamma, X, D, j) == list(expected)
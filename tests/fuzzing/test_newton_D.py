@@ -1,8 +1,10 @@
+import boa
 import pytest
-from hypothesis import event, given, note, settings
+from hypothesis import event, given, note, settings, target
 from hypothesis import strategies as st
 
 import tests.utils.simulator as sim
+from tests.utils.newton_profile import harness_call
 from tests.utils.strategies import A, fee_gamma, fees, gamma
 
 # you might want to increase this when fuzzing locally
@@ -13,6 +15,10 @@ N_CASES = 1
 MIN_XD = 10**17
 MAX_XD = 10**19
 
+# largest |D_warm - D_cold| allowed, as a fraction of D: newton_D stops
+# within 1e-14 of D, but its last step is much smaller than that
+WARM_START_MAX_DRIFT = 10**-16
+
 
 @pytest.mark.parametrize(
     "_tmp", range(N_CASES)
@@ -110,3 +116,231 @@ def test_newton_D(
             result_contract = math_optimized.newton_D(A, gamma, X, K0)
 
             assert abs(result_sim - result_contract) <= max(10000, result_sim / 1e12)
+
+
+@pytest.mark.parametrize(
+    "_tmp", range(N_CASES)
+)  # Parallelisation hack (more details in folder's README)
+@given(
+    A=A,
+    gamma=gamma,
+    D=st.integers(min_value=10**18, max_value=10**14 * 10**18),  # 1 USD to 100T USD
+    xD=st.integers(min_value=MIN_XD, max_value=MAX_XD),
+    yD=st.integers(min_value=MIN_XD, max_value=MAX_XD),
+    K0_prev=st.integers(min_value=0, max_value=4 * 10**18),
+)
+@settings(max_examples=MAX_SAMPLES // 10, deadline=None)
+def test_newton_D_and_p(math_optimized, A, gamma, D, xD, yD, K0_prev, _tmp):
+    """
+    The combined entry point must return exactly what newton_D and get_p
+    return when called one after the other.
+    """
+    X = [D * xD // 10**18, D * yD // 10**18]
+    try:
+        D = math_optimized.newton_D(A, gamma, X, K0_prev)
+        expected = [D, math_optimized.get_p(X, D, [A, gamma])]
+    except boa.BoaError:
+        with boa.reverts():
+            math_optimized.newton_D_and_p(A, gamma, X, K0_prev)
+        return
+
+    assert math_optimized.newton_D_and_p(A, gamma, X, K0_prev) == expected
+
+
+@given(
+    A=A,
+    gamma=gamma,
+    trades=st.lists(
+        st.tuples(
+            st.integers(min_value=10**14, max_value=10**18),  # fraction of x[i] to swap in
+            st.integers(min_value=0, max_value=1),
+        ),
+        min_size=1,
+        max_size=10,
+    ),
+)
+@settings(max_examples=MAX_SAMPLES // 10, deadline=None)
+def test_curve_cached_D(A, gamma, trades):
+    """
+    The cached, warm-started D of the simulator must agree with a
+    cold solve up to newton_D's own convergence threshold.
+    """
+    trader = sim.Trader(A, gamma, 10**24, [10**18, 2000 * 10**18])
+    for frac, i in trades:
+        trader.buy(trader.curve.x[i] * frac // 10**18, i, 1 - i)
+
+        D = trader.curve.D()
+        assert trader.curve.D() is D  # nothing moved, so nothing is solved
+
+        cold = sim.solve_D(A, gamma, trader.curve.xp())
+        assert abs(D - cold) <= 2 * max(100, cold // 10**14)
+
+
+@given(
+    lanes=st.lists(
+        st.tuples(
+            A,
+            gamma,
+            st.integers(min_value=10**18, max_value=10**14 * 10**18),  # D
+            st.integers(min_value=MIN_XD // 10, max_value=MAX_XD * 10),  # xD
+            st.integers(min_value=MIN_XD // 10, max_value=MAX_XD * 10),  # yD
+        ),
+        min_size=1,
+        max_size=50,
+    )
+)
+@settings(max_examples=MAX_SAMPLES // 100, deadline=None)
+def test_solve_D_batch(lanes):
+    """
+    Every lane of the lockstep batch solver must match the scalar one,
+    including the lanes where the scalar one raises.
+    """
+    As = [lane[0] for lane in lanes]
+    gammas = [lane[1] for lane in lanes]
+    X = [[D * xD // 10**18, D * yD // 10**18] for _, _, D, xD, yD in lanes]
+
+    D_batch, iterations = sim.solve_D_batch(As, gammas, X)
+
+    for k in range(len(lanes)):
+        try:
+            D = sim.solve_D(As[k], gammas[k], X[k])
+        except (AssertionError, ValueError, ZeroDivisionError):
+            event("scalar solve_D failed")
+            D = 0
+        assert D_batch[k] == D
+        assert (iterations[k] == -1) == (D == 0)
+
+
+@given(
+    A=A,
+    gamma=gamma,
+    D=st.integers(min_value=10**18, max_value=10**14 * 10**18),  # 1 USD to 100T USD
+    xD=st.integers(min_value=sim.FLOAT_MIN_XD, max_value=10**18),
+    yD=st.integers(min_value=sim.FLOAT_MIN_XD, max_value=10**18),
+    j=st.integers(min_value=0, max_value=1),
+)
+@settings(max_examples=MAX_SAMPLES // 10, deadline=None)
+def test_float_twins(A, gamma, D, xD, yD, j):
+    """
+    Inside the band where Curve(mode="float") uses them, the float64
+    twins must agree with the exact solvers.
+    """
+    X = [D * xD // 10**18, D * yD // 10**18]
+    try:
+        D = sim.solve_D(A, gamma, X)
+    except (AssertionError, ValueError):
+        return
+
+    D_float = sim.newton_D_float(A, gamma, X, sim.initial_D(X))
+    assert abs(D_float - D) <= D * sim.FLOAT_MAX_ERROR
+
+    p = sim.Curve(A, gamma, D, [10**18, 10**18])
+    p.x = X
+    assert abs(sim.get_p_float(A, gamma, X, D) - p.get_p()) <= p.get_p() * sim.FLOAT_MAX_ERROR
+
+    y = sim.newton_y(A, gamma, X, D, j)
+    assert abs(sim.newton_y_float(A, gamma, X, D, j) - y) <= y * sim.FLOAT_MAX_ERROR
+
+
+@given(
+    A=A,
+    gamma=gamma,
+    D=st.integers(min_value=10**18, max_value=10**14 * 10**18),  # 1 USD to 100T USD
+    # relative size of each trade, in either direction
+    trades=st.lists(st.integers(min_value=-(10**17), max_value=10**17), min_size=1, max_size=20),
+)
+@settings(max_examples=MAX_SAMPLES // 10, deadline=None)
+def test_float_mode_parity(A, gamma, D, trades):
+    """
+    Curve(mode="float") must track Curve(mode="int") through a sequence of
+    trades: D, y and the spot price within FLOAT_MAX_ERROR (1e-10) relative,
+    whether each value came from the float twins or the integer fallback.
+    """
+    p = [10**18, 10**18]
+    exact = sim.Curve(A, gamma, D, p)
+    fast = sim.Curve(A, gamma, D, p, mode="float")
+
+    for dx in trades:
+        i = 0 if dx > 0 else 1
+        x = exact.x[i] * (10**18 + abs(dx)) // 10**18
+        try:
+            y = exact.y(x, i, 1 - i)
+        except (AssertionError, ValueError):
+            return
+
+        assert abs(fast.y(x, i, 1 - i) - y) <= y * sim.FLOAT_MAX_ERROR
+        exact.x[i] = fast.x[i] = x
+        exact.x[1 - i] = fast.x[1 - i] = y
+
+        assert abs(fast.D() - exact.D()) <= exact.D() * sim.FLOAT_MAX_ERROR
+        assert abs(fast.get_p() - exact.get_p()) <= exact.get_p() * sim.FLOAT_MAX_ERROR
+    assert fast.mode == "float"
+
+
+@pytest.mark.parametrize(
+    "_tmp", range(N_CASES)
+)  # Parallelisation hack (more details in folder's README)
+@given(
+    A=A,
+    gamma=gamma,
+    D=st.integers(min_value=10**18, max_value=10**14 * 10**18),  # 1 USD to 100T USD
+    xD=st.integers(min_value=MIN_XD, max_value=MAX_XD),
+    yD=st.integers(min_value=MIN_XD, max_value=MAX_XD),
+    # relative change of each balance, as in a deposit, a swap or a withdrawal
+    dx=st.integers(min_value=-(10**17), max_value=10**18),
+    dy=st.integers(min_value=-(10**17), max_value=10**18),
+)
+@settings(max_examples=MAX_SAMPLES // 10, deadline=None)
+def test_newton_D_warm_start(math_iterations, A, gamma, D, xD, yD, dx, dy, _tmp):
+    """
+    Starting newton_D from the K0 of the previous state, as the pool does
+    when balances change, must find the same D as starting cold within
+    newton_D's tolerance. It usually saves iterations, but far from the
+    previous state it can take one more than a cold start.
+    """
+    X_old = [D * xD // 10**18, D * yD // 10**18]
+    X = [X_old[0] * (10**18 + dx) // 10**18, X_old[1] * (10**18 + dy) // 10**18]
+    try:
+        D_old = math_iterations.newton_D(A, gamma, X_old, 0)
+        D_cold, cold = harness_call(math_iterations, "newton_D", A, gamma, X, 0)
+    except Exception:
+        return  # unsafe values, convergence is tested above
+
+    K0_prev = 4 * 10**18 * X_old[0] // D_old * X_old[1] // D_old
+    D_warm, warm = harness_call(math_iterations, "newton_D", A, gamma, X, K0_prev)
+
+    event(f"{cold['newton_D_iterations'] - warm['newton_D_iterations']} iterations saved")
+    assert abs(D_warm - D_cold) <= 2 * max(100, D_cold // 10**14)
+    assert warm["newton_D_iterations"] <= cold["newton_D_iterations"] + 1
+
+
+@given(
+    A=A,
+    gamma=gamma,
+    D=st.integers(min_value=10**18, max_value=10**14 * 10**18),  # 1 USD to 100T USD
+    xD=st.integers(min_value=MIN_XD, max_value=MAX_XD),
+    yD=st.integers(min_value=MIN_XD, max_value=MAX_XD),
+    dx=st.integers(min_value=-(10**17), max_value=10**18),
+    dy=st.integers(min_value=-(10**17), max_value=10**18),
+)
+@settings(max_examples=MAX_SAMPLES // 10, deadline=None)
+def test_newton_D_warm_start_drift(math_optimized, A, gamma, D, xD, yD, dx, dy):
+    """
+    The D of a warm start is not the D of a cold start, only close to it.
+    Hypothesis is steered towards the largest difference, which must stay
+    within WARM_START_MAX_DRIFT of D.
+    """
+    X_old = [D * xD // 10**18, D * yD // 10**18]
+    X = [X_old[0] * (10**18 + dx) // 10**18, X_old[1] * (10**18 + dy) // 10**18]
+    try:
+        D_old = math_optimized.newton_D(A, gamma, X_old, 0)
+        D_cold = math_optimized.newton_D(A, gamma, X, 0)
+    except Exception:
+        return  # unsafe values, convergence is tested above
+
+    K0_prev = 4 * 10**18 * X_old[0] // D_old * X_old[1] // D_old
+    D_warm = math_optimized.newton_D(A, gamma, X, K0_prev)
+
+    drift = abs(D_warm - D_cold) / D_cold
+    target(drift, label="relative drift")
+    assert drift <= WARM_START_MAX_DRIFT
@@ -26,7 +26,9 @@ import pytest
 from hypothesis import event, given, settings
 from hypothesis import strategies as st
 
+import tests.utils.simulator as sim
 from tests.utils.constants import MAX_GAMMA, MAX_GAMMA_SMALL, MIN_GAMMA, N_COINS
+from tests.utils.newton_profile import harness_call
 
 # MAX_SAMPLES = 1000000  # Increase for fuzzing
 MAX_SAMPLES = 10000
@@ -184,3 +186,79 @@ def test_new_bounds(math_optimized, math_exposed, A, D, xD, yD, gamma, j, _tmp):
     event(f"converges in {iterations} iterations")
 
     assert y == y_exposed
+
+
+@given(
+    lanes=st.lists(
+        st.tuples(
+            st.integers(min_value=MIN_A, max_value=MAX_A),
+            st.integers(min_value=MIN_GAMMA, max_value=MAX_GAMMA),
+            st.integers(min_value=10**18, max_value=10**14 * 10**18),  # D
+            st.integers(min_value=10**17 // 2, max_value=10**19 // 2),  # xD
+            st.integers(min_value=10**17 // 2, max_value=10**19 // 2),  # yD
+        ),
+        min_size=1,
+        max_size=50,
+    ),
+    j=st.integers(min_value=0, max_value=1),
+)
+@settings(max_examples=MAX_SAMPLES // 100, deadline=None)
+def test_newton_y_batch(lanes, j):
+    """
+    Every lane of the lockstep batch solver must match the scalar
+    simulator one, including the lanes where the scalar one raises.
+    """
+    As = [lane[0] for lane in lanes]
+    gammas = [lane[1] for lane in lanes]
+    Ds = [lane[2] for lane in lanes]
+    X = [[D * xD // 10**18, D * yD // 10**18] for _, _, D, xD, yD in lanes]
+
+    y_batch, iterations = sim.newton_y_batch(As, gammas, X, Ds, j)
+
+    for k in range(len(lanes)):
+        try:
+            y = sim.newton_y(As[k], gammas[k], X[k], Ds[k], j)
+        except Exception:
+            event("scalar newton_y failed")
+            y = 0
+        assert y_batch[k] == y
+        assert (iterations[k] == -1) == (y == 0)
+
+
+@pytest.mark.parametrize(
+    "_tmp", range(N_CASES)
+)  # Parallelisation hack (more details in folder's README)
+@given(
+    A=st.integers(min_value=MIN_A, max_value=MAX_A),
+    D=st.integers(min_value=10**18, max_value=10**14 * 10**18),  # 1 USD to 100T USD
+    xD=st.integers(min_value=10**17 // 2, max_value=10**19 // 2),
+    yD=st.integers(min_value=10**17 // 2, max_value=10**19 // 2),
+    gamma=st.integers(min_value=MIN_GAMMA, max_value=MAX_GAMMA),
+    j=st.integers(min_value=0, max_value=1),
+)
+@settings(max_examples=MAX_SAMPLES // 10, deadline=None)
+def test_iterations_harness(math_optimized, math_iterations, A, D, xD, yD, gamma, j, _tmp):
+    """
+    The iteration counting variant of the math contract must compute the
+    same values, and count as many iterations as the bit-exact port of
+    `_newton_y` in the simulator takes.
+    """
+    X = [D * xD // 10**18, D * yD // 10**18]
+
+    try:
+        y = math_optimized.newton_y(A, gamma, X, D, j)
+    except Exception:
+        return  # convergence is tested above
+
+    y_harness, counts = harness_call(math_iterations, "newton_y", A, gamma, X, D, j)
+    assert y_harness == y
+
+    lim_mul = 100 * 10**18
+    if gamma > MAX_GAMMA_SMALL:
+        lim_mul = lim_mul * MAX_GAMMA_SMALL // gamma
+    with sim.profile_newton() as prof:
+        assert sim._newton_y(A, gamma, X, D, j, lim_mul) == y
+    (*_, iterations), *_ = prof.records
+
+    event(f"converges in {iterations} iterations")
+    assert counts["newton_y_iterations"] == iterations
@@ -1,3 +1,4 @@
+import boa
 from boa.test import strategy
 from hypothesis import given, settings
 
@@ -22,3 +23,12 @@ def test_pack_unpack_2_integers(pool, val):
 
     assert unpacked[0] == val[0]
     assert unpacked[1] == val[1]
+
+
+@given(val=strategy("uint256", min_value=2**128))
+@settings(max_examples=1000, deadline=None)
+def test_pack_2_rejects_overflow(val):
+    with boa.reverts():
+        packing_utils.internal.pack_2(val, 0)
+    with boa.reverts():
+        packing_utils.internal.pack_2(0, val)
@@ -0,0 +1,151 @@
+import os
+
+import boa
+import pandas as pd
+import pytest
+
+from tests.conftest import INITIAL_PRICES
+from tests.utils.constants import POOL_DEPLOYER, POOL_INLINE_MATH_DEPLOYER
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(__file__), "gas-snapshot")
+
+# unlike `tests.utils.pool_presets.all_presets`, every row of the csv
+PRESETS = pd.read_csv("tests/utils/pool_presets.csv").to_dict(orient="records")
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--gas-check",
+        action="store_true",
+        help="fail if gas moved from the snapshot instead of updating it",
+    )
+
+
+# Pool fixtures
+@pytest.fixture(scope="module", params=PRESETS, ids=[p["name"] for p in PRESETS])
+def params(request):
+    preset = request.param
+    return {
+        "A": preset["A"],
+        "gamma": preset["gamma"],
+        "mid_fee": preset["mid_fee"],
+        "out_fee": preset["out_fee"],
+        "allowed_extra_profit": preset["allowed_extra_profit"],
+        "fee_gamma": preset["fee_gamma"],
+        "adjustment_step": preset["adjustment_step"],
+        "ma_time": preset["ma_exp_time"],
+        "initial_prices": INITIAL_PRICES,
+    }
+
+
+@pytest.fixture(scope="module", params=["external_math", "inline_math"])
+def build(request):
+    # the build of `scripts/build_inline_math.py` is measured too
+    return request.param
+
+
+@pytest.fixture(scope="module")
+def amm_implementation(request, build, deployer):
+    if build == "inline_math":
+        return request.getfixturevalue("inline_math_amm_implementation")
+    with boa.env.prank(deployer):
+        return POOL_DEPLOYER.deploy_as_blueprint()
+
+
+@pytest.fixture(scope="module", params=["standard", "nonstandard"])
+def factory(request, factory, coins, owner):
+    # the mocks transfer exactly what is asked: both the pools trusting them
+    # to (`set_standard_token`) and the default ones, measuring their
+    # balance around `transferFrom`, are measured
+    for coin in coins:
+        factory.set_standard_token(coin, request.param == "standard", sender=owner)
+    return factory
+
+
+@pytest.fixture(scope="module")
+def pool_deployer(build):
+    if build == "inline_math":
+        return POOL_INLINE_MATH_DEPLOYER
+    return POOL_DEPLOYER
+
+
+@pytest.fixture(scope="module")
+def gm_pool(gm_pool):
+    # We seed the pool with 2M dollars worth of liquidity
+    gm_pool.add_liquidity_balanced(10**6 * 10**18)
+    return gm_pool
+
+
+@pytest.fixture(autouse=True)
+def isolation():
+    with boa.env.anchor():
+        yield
+
+
+@pytest.fixture
+def record_gas(request):
+    def record(gas):
+        # user properties are sent back to the controller by xdist
+        request.node.user_properties.append(("gas", gas))
+
+    return record
+
+
+# ---------------- snapshot ----------------
+
+
+def read_snapshot(path=SNAPSHOT_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {k: int(v) for k, v in (line.rsplit(" ", 1) for line in f.read().splitlines())}
+
+
+def write_snapshot(snapshot, path=SNAPSHOT_PATH):
+    with open(path, "w") as f:
+        f.writelines(f"{k} {v}\n" for k, v in sorted(snapshot.items()))
+
+
+def diff_report(old, new):
+    """Lines of the cases whose gas moved, largest relative change first."""
+    lines = []
+    for k in sorted(new, key=lambda k: -abs(new[k] - old.get(k, 0)) / max(old.get(k, 1), 1)):
+        if k not in old:
+            lines.append(f"{k}: {new[k]} (new)")
+        elif new[k] != old[k]:
+            delta = new[k] - old[k]
+            lines.append(f"{k}: {old[k]} -> {new[k]} ({delta:+d}, {delta / old[k]:+.2%})")
+    return lines
+
+
+_measured = {}
+
+
+def pytest_runtest_logreport(report):
+    if report.when == "call" and report.passed:
+        for name, value in report.user_properties:
+            if name == "gas":
+                _measured[report.nodeid.split("[", 1)[-1].rstrip("]")] = value
+
+
+def pytest_sessionfinish(session):
+    if not _measured or hasattr(session.config, "workerinput"):
+        return
+    old = read_snapshot()
+    session.config._gas_diff = diff_report(old, _measured)
+    if session.config.getoption("--gas-check", default=False):
+        if session.config._gas_diff:
+            session.exitstatus = pytest.ExitCode.TESTS_FAILED
+    else:
+        # cases that did not run (e.g. deselected with -k) keep their gas
+        write_snapshot({**old, **_measured})
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    diff = getattr(config, "_gas_diff", None)
+    if diff is None:
+        return
+    terminalreporter.section("gas snapshot")
+    terminalreporter.write_line(
+        "\n".join(diff) if diff else f"no changes in {len(_measured)} measurements"
+    )
@@ -0,0 +1,160 @@
+"""
+Gas used by every pool entry point, for every preset of
+`pool_presets.csv` and every combination of:
+
+- balanced pool, or pool imbalanced by a large trade
+- static A and gamma, or halfway through a ramp
+- first transaction of a new block (the oracles of `tweak_price` are
+  updated), or transaction in the same block as a previous trade
+- pool calling the math implementation, or with the math inlined
+  (`scripts/build_inline_math.py`)
+- coins listed as standard by the factory admin, or not (the pool then
+  measures its balance around `transferFrom`)
+
+The gas of the last run is kept in `tests/gas/gas-snapshot` and a diff
+with the previous snapshot is printed at the end of the run. Changes to
+the contracts that move gas should commit the updated snapshot:
+
+    python -m pytest tests/gas -n auto
+    python -m pytest tests/gas -n auto --gas-check  # fail instead of updating
+"""
+
+from contextlib import contextmanager
+
+import boa
+import pytest
+
+from tests.utils.constants import UNIX_DAY
+from tests.utils.god_mode import god
+
+STATES = ["balanced", "imbalanced"]
+RAMPS = ["static", "ramping"]
+TIMINGS = ["new_block", "same_block"]
+
+
+@contextmanager
+def cold_access():
+    """
+    Run with the access lists of a new transaction: storage slots and
+    accounts touched by previous calls are cold again.
+    `boa.env.reset_gas_used()` does the same but drops the journal
+    `boa.env.anchor()` reverts with, so here the previous one is put
+    back afterwards.
+
+    Original storage values are not reset. They are still those from
+    before the test, so an SSTORE to a slot that the setup already wrote
+    is charged as a write to a dirty slot. Numbers are comparable between
+    cases, not with the gas of a transaction on chain.
+    """
+    db = boa.env.evm.vm.state._account_db
+    accessed = db._journal_accessed_state
+    db._reset_access_counters()
+    try:
+        yield
+    finally:
+        db._journal_accessed_state = accessed
+
+
+def _fund(coin, amount):
+    # twice what the call spends, so that it does not empty god's balance
+    # (clearing a slot is refunded, which would skew the comparison with
+    # the `*_received` variants whose transfer is made beforehand)
+    boa.deal(coin, god, 2 * amount)
+
+
+def _exchange(pool):
+    dx = pool.balances(0) // 100
+    _fund(pool.coins[0], dx)
+    return lambda: pool.instance.exchange(0, 1, dx, 0, sender=god)
+
+
+def _exchange_received(pool):
+    dx = pool.balances(0) // 100
+    boa.deal(pool.coins[0], god, dx)
+    pool.coins[0].transfer(pool.instance, dx, sender=god)
+    return lambda: pool.instance.exchange_received(0, 1, dx, 0, sender=god)
+
+
+def _exchange_many(pool):
+    # four legs the size of `_exchange`, two in each direction
+    legs = [(k % 2, pool.balances(k % 2) // 100, 0) for k in range(4)]
+    for i in range(2):
+        _fund(pool.coins[i], sum(dx for k, dx, _ in legs if k == i))
+    return lambda: pool.instance.exchange_many(legs, sender=god)
+
+
+def _add_liquidity(pool):
+    amounts = [pool.balances(i) // 100 for i in range(2)]
+    for coin, amount in zip(pool.coins, amounts):
+        _fund(coin, amount)
+    return lambda: pool.instance.add_liquidity(amounts, 0, sender=god)
+
+
+def _add_liquidity_received(pool):
+    amounts = [pool.balances(i) // 100 for i in range(2)]
+    for coin, amount in zip(pool.coins, amounts):
+        boa.deal(coin, god, amount)
+        coin.transfer(pool.instance, amount, sender=god)
+    return lambda: pool.instance.add_liquidity_received(amounts, 0, sender=god)
+
+
+def _remove_liquidity(pool):
+    amount = pool.balanceOf(boa.env.eoa) // 100
+    return lambda: pool.instance.remove_liquidity(amount, [0, 0])
+
+
+def _remove_liquidity_one_coin(pool):
+    amount = pool.balanceOf(boa.env.eoa) // 100
+    return lambda: pool.instance.remove_liquidity_one_coin(amount, 0, 0)
+
+
+def _remove_liquidity_fixed_out(pool):
+    amount = pool.balanceOf(boa.env.eoa) // 100
+    amount_0 = pool.calc_withdraw_one_coin(amount, 0) // 2
+    return lambda: pool.instance.remove_liquidity_fixed_out(amount, 0, amount_0, 0)
+
+
+OPERATIONS = {
+    f.__name__[1:]: f
+    for f in (
+        _exchange,
+        _exchange_received,
+        _exchange_many,
+        _add_liquidity,
+        _add_liquidity_received,
+        _remove_liquidity,
+        _remove_liquidity_one_coin,
+        _remove_liquidity_fixed_out,
+    )
+}
+
+
+@pytest.mark.parametrize("timing", TIMINGS)
+@pytest.mark.parametrize("ramp", RAMPS)
+@pytest.mark.parametrize("state", STATES)
+@pytest.mark.parametrize("operation", OPERATIONS)
+def test_gas(gm_pool, factory_admin, record_gas, operation, state, ramp, timing):
+    if state == "imbalanced":
+        gm_pool.exchange(0, gm_pool.balances(0) // 2)
+    boa.env.time_travel(seconds=UNIX_DAY)
+
+    if ramp == "ramping":
+        gm_pool.ramp_A_gamma(
+            gm_pool.A() // 2,
+            gm_pool.gamma() // 2,
+            boa.env.evm.patch.timestamp + UNIX_DAY,
+            sender=factory_admin,
+        )
+        boa.env.time_travel(seconds=UNIX_DAY // 2)
+
+    # both cases trade right before, so that they only differ in timing
+    gm_pool.exchange(1, gm_pool.balances(1) // 1000)
+    call = OPERATIONS[operation](gm_pool)
+    if timing == "new_block":
+        boa.env.time_travel(blocks=1)
+
+    with cold_access():
+        call()
+    # before refunds, as they depend on the original values of the slots
+    # (see `cold_access`)
+    record_gas(gm_pool.instance._computation.get_gas_used())
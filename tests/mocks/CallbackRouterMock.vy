@@ -0,0 +1,65 @@
+# pragma version 0.4.1
+
+"""
+@notice Mock router paying for twocrypto exchanges in their callback, for testing
+"""
+
+from ethereum.ercs import IERC20
+
+
+interface Pool:
+    def coins(i: uint256) -> address: view
+    def exchange_with_callback(
+        i: uint256,
+        j: uint256,
+        dx: uint256,
+        min_dy: uint256,
+        receiver: address,
+        data: Bytes[1024],
+    ) -> uint256: nonpayable
+
+
+# arguments of the last callback: i, j, dx, dy and data
+last_callback: public(uint256[4])
+last_data: public(Bytes[1024])
+
+# paid on top of dx, or short of it if negative
+surplus: public(int256)
+# called on the pool during the callback when set, and what it returned
+reentry: public(Bytes[1024])
+reentry_response: public(Bytes[1024])
+
+
+@external
+def set_surplus(_surplus: int256):
+    self.surplus = _surplus
+
+
+@external
+def set_reentry(_reentry: Bytes[1024]):
+    self.reentry = _reentry
+
+
+@external
+def exchange(
+    pool: address,
+    i: uint256,
+    j: uint256,
+    dx: uint256,
+    min_dy: uint256,
+    receiver: address,
+    data: Bytes[1024],
+) -> uint256:
+    return extcall Pool(pool).exchange_with_callback(i, j, dx, min_dy, receiver, data)
+
+
+@external
+def twocrypto_callback(i: uint256, j: uint256, dx: uint256, dy: uint256, data: Bytes[1024]):
+    self.last_callback = [i, j, dx, dy]
+    self.last_data = data
+
+    if len(self.reentry) > 0:
+        self.reentry_response = raw_call(msg.sender, self.reentry, max_outsize=1024)
+
+    amount: uint256 = convert(convert(dx, int256) + self.surplus, uint256)
+    assert extcall IERC20(staticcall Pool(msg.sender).coins(i)).transfer(msg.sender, amount)
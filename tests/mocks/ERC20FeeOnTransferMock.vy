@@ -0,0 +1,69 @@
+# @version ^0.3.9
+
+"""
+@notice Mock ERC20 taking a fee on every transfer, for testing
+@dev The fee is burnt: the receiver gets `_value` minus 1%.
+"""
+
+
+event Transfer:
+    _from: indexed(address)
+    _to: indexed(address)
+    _value: uint256
+
+
+event Approval:
+    _owner: indexed(address)
+    _spender: indexed(address)
+    _value: uint256
+
+
+FEE_BPS: constant(uint256) = 100
+
+name: public(String[64])
+symbol: public(String[32])
+decimals: public(uint256)
+balanceOf: public(HashMap[address, uint256])
+allowances: HashMap[address, HashMap[address, uint256]]
+totalSupply: public(uint256)
+
+
+@external
+def __init__(_name: String[64], _symbol: String[32], _decimals: uint256):
+    self.name = _name
+    self.symbol = _symbol
+    self.decimals = _decimals
+
+
+@external
+@view
+def allowance(_owner: address, _spender: address) -> uint256:
+    return self.allowances[_owner][_spender]
+
+
+@internal
+def _transfer(_from: address, _to: address, _value: uint256):
+    fee: uint256 = _value * FEE_BPS / 10000
+    self.balanceOf[_from] -= _value
+    self.balanceOf[_to] += _value - fee
+    log Transfer(_from, _to, _value - fee)
+
+
+@external
+def transfer(_to: address, _value: uint256) -> bool:
+    self._transfer(msg.sender, _to, _value)
+    return True
+
+
+@external
+def transferFrom(_from: address, _to: address, _value: uint256) -> bool:
+    self.allowances[_from][msg.sender] -= _value
+    self._transfer(_from, _to, _value)
+    return True
+
+
+@external
+def approve(_spender: address, _value: uint256) -> bool:
+    self.allowances[msg.sender][_spender] = _value
+    log Approval(msg.sender, _spender, _value)
+    return True
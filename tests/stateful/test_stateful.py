@@ -62,6 +62,54 @@ class OnlySwapStateful(StatefulBase):
             note("[ALLOWED FAILURE]")
 
 
+class SameBlockSwapsStateful(OnlySwapStateful):
+    """This test suite does everything as the `OnlySwapStateful`
+    but also lands bursts of swaps in a single block, as in MEV-heavy
+    blocks. Only the first swap of a block can move the price oracle
+    and the price scale, the later ones must leave them untouched.
+    """
+
+    @rule(
+        data=data(),
+        n_swaps=integers(min_value=2, max_value=10),
+    )
+    def exchange_burst(self, data, n_swaps: int):
+        note("[SAME BLOCK BURST]")
+        # start a new block, the burst must not leave it
+        boa.env.time_travel(seconds=12)
+        block_timestamp = boa.env.evm.patch.timestamp
+
+        first_swap = None
+        for _ in range(n_swaps):
+            i = data.draw(integers(min_value=0, max_value=1), label="i")
+            user = data.draw(address, label="user")
+            liquidity = self.coins[i].balanceOf(self.pool)
+            dx = data.draw(
+                integers(
+                    # smaller swaps than `exchange_rule`, there are many
+                    min_value=max(1, int(liquidity * 0.0001)),
+                    max_value=int(liquidity * 0.10),
+                ),
+                label="dx",
+            )
+
+            if not self.exchange(dx, i, user):
+                event("swap failed in a same block burst")
+                continue
+            self.report_equilibrium()
+
+            state = (self.pool.price_scale(), self.pool.price_oracle())
+            if first_swap is None:
+                first_swap = state
+            else:
+                assert state == first_swap, "price moved after the first swap of the block"
+
+        assert boa.env.evm.patch.timestamp == block_timestamp
+        if first_swap is not None:
+            assert self.pool.last_timestamp() == block_timestamp
+            note("[SUCCESS]")
+
+
 class UpOnlyLiquidityStateful(OnlySwapStateful):
     """This test suite does everything as the `OnlySwapStateful`
     but also adds liquidity to the pool. It does not remove liquidity."""
@@ -320,6 +368,7 @@ class RampingStateful(ImbalancedLiquidityStateful):
 
 
 TestOnlySwap = OnlySwapStateful.TestCase
+TestSameBlockSwaps = SameBlockSwapsStateful.TestCase
 TestUpOnlyLiquidity = UpOnlyLiquidityStateful.TestCase
 TestOnlyBalancedLiquidity = OnlyBalancedLiquidityStateful.TestCase
 TestImbalancedLiquidity = ImbalancedLiquidityStateful.TestCase
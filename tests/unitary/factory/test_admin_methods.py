@@ -12,6 +12,9 @@ def test_revert_unauthorised_access(user, factory):
         with boa.reverts("admin only"):
             factory.set_views_implementation(boa.env.generate_address())
 
+        with boa.reverts("admin only"):
+            factory.set_standard_token(boa.env.generate_address(), True)
+
 
 def test_revert_unauthorised_set_fee_receiver(user, factory, fee_receiver):
     with boa.env.prank(user):
@@ -30,3 +33,21 @@ def test_revert_unauthorised_new_admin(user, factory, owner):
 
     with boa.env.prank(user), boa.reverts("future admin only"):
         factory.accept_transfer_ownership()
+
+
+def test_revert_math_without_newton_D_and_p(factory, owner, math_contract):
+    # the math implementation of pools deployed before newton_D_and_p
+    old_math = boa.load("contracts/old/CurveCryptoSwap2Math.vy")
+
+    with boa.env.prank(owner):
+        with boa.reverts("math lacks newton_D_and_p"):
+            factory.set_math_implementation(old_math)
+
+        with boa.reverts("math lacks newton_D_and_p"):
+            factory.set_math_implementation(boa.env.generate_address())
+
+        # unsetting it stays possible
+        factory.set_math_implementation("0x0000000000000000000000000000000000000000")
+        factory.set_math_implementation(math_contract)
+
+    assert factory.math_implementation() == math_contract.address
@@ -0,0 +1,74 @@
+import boa
+import pytest
+
+from tests.utils.god_mode import god
+
+
+@pytest.fixture(scope="module")
+def pool(gm_pool):
+    gm_pool.add_liquidity_balanced(10**6 * 10**18)
+    return gm_pool
+
+
+def _amounts(pool):
+    return [pool.balances(0) // 100, pool.balances(1) // 300]
+
+
+def _send(pool, amounts):
+    for coin, amount in zip(pool.coins, amounts):
+        boa.deal(coin, god, amount)
+        coin.transfer(pool.instance, amount, sender=god)
+
+
+def test_same_as_add_liquidity(pool):
+    amounts = _amounts(pool)
+
+    def reference():
+        for coin, amount in zip(pool.coins, amounts):
+            boa.deal(coin, god, amount)
+        return pool.instance.add_liquidity(amounts, 0, sender=god)
+
+    with pool.same_state_as(reference, god) as expected:
+        _send(pool, amounts)
+        assert pool.instance.add_liquidity_received(amounts, 0, sender=god) == expected
+
+
+def test_single_coin(pool, user):
+    amounts = [0, pool.balances(1) // 100]
+
+    with boa.env.anchor():
+        _send(pool, amounts)
+        minted = pool.instance.add_liquidity_received(amounts, 0, user, sender=god)
+        assert minted > 0
+        assert pool.balanceOf(user) == minted
+        assert pool.coins[1].balanceOf(pool.instance) == pool.balances(1)
+
+
+def test_surplus_is_deposited(pool):
+    amounts = _amounts(pool)
+    surplus = [amount + amount // 10 for amount in amounts]
+
+    with boa.env.anchor():
+        _send(pool, surplus)
+        expected = pool.instance.add_liquidity_received(surplus, 0, sender=god)
+
+    with boa.env.anchor():
+        _send(pool, surplus)
+        assert pool.instance.add_liquidity_received(amounts, 0, sender=god) == expected
+        for i in range(2):
+            assert pool.coins[i].balanceOf(pool.instance) == pool.balances(i)
+
+
+def test_reverts(pool):
+    amounts = _amounts(pool)
+
+    with boa.reverts("user didn't give us coins"):
+        pool.instance.add_liquidity_received(amounts, 0, sender=god)
+
+    # sending less than `amounts` of one coin is not enough
+    _send(pool, [amounts[0], amounts[1] - 1])
+    with boa.reverts("user didn't give us coins"):
+        pool.instance.add_liquidity_received(amounts, 0, sender=god)
+
+    with boa.reverts("slippage"):
+        pool.instance.add_liquidity_received([amounts[0], 0], 2**255, sender=god)
@@ -0,0 +1,156 @@
+import boa
+import pytest
+
+from tests.utils.god_mode import god
+
+
+@pytest.fixture(scope="module")
+def pool(gm_pool):
+    gm_pool.add_liquidity_balanced(10**6 * 10**18)
+    return gm_pool
+
+
+def _legs(pool):
+    b = [pool.balances(i) for i in range(2)]
+    return [(0, b[0] // 100, 0), (1, b[1] // 50, 0), (0, b[0] // 300, 0), (0, b[0] // 70, 0)]
+
+
+def _deal(pool, legs):
+    for i in range(2):
+        boa.deal(pool.coins[i], god, sum(dx for k, dx, _ in legs if k == i))
+
+
+def _dx_total(legs):
+    return [sum(dx for k, dx, _ in legs if k == i) for i in range(2)]
+
+
+def _net(pool, dx_total):
+    # coin sold on net and the part of it left once the directions are netted
+    precisions = pool.instance.precisions()
+    value = [
+        dx_total[0] * precisions[0],
+        dx_total[1] * precisions[1] * pool.last_prices() // 10**18,
+    ]
+    i = int(value[1] > value[0])
+    return i, dx_total[i] * (value[i] - value[1 - i]) // value[i]
+
+
+def _exchange_logs(pool):
+    logs = pool.instance.get_logs()
+    return (
+        [log for log in logs if type(log).__name__ == "TokenExchange"],
+        [log for log in logs if type(log).__name__ == "ExchangeLegFilled"],
+    )
+
+
+@pytest.mark.parametrize("timing", ["new_block", "same_block"])
+def test_same_as_net_exchange(pool, timing):
+    if timing == "new_block":
+        boa.env.time_travel(seconds=600)
+    legs = _legs(pool)
+    _deal(pool, legs)
+    dx_total = _dx_total(legs)
+    i, dx = _net(pool, dx_total)
+    assert 0 < dx < dx_total[i]
+
+    def reference():
+        return pool.instance.exchange(i, 1 - i, dx, 0, sender=god)
+
+    # the matched coins go from god to god, so even its balances agree
+    with pool.same_state_as(reference, god) as expected:
+        dy = pool.instance.exchange_many(legs, sender=god)
+
+    # the net sellers share the trade and the coins of the other direction,
+    # the others the rest of the net coin, with no dust left
+    bought = [0, 0]
+    bought[1 - i] = dx_total[i] - dx
+    bought[i] = dx_total[1 - i] + expected
+    for k in range(2):
+        dy_legs = [leg_dy for (j, _, _), leg_dy in zip(legs, dy) if j == k]
+        assert sum(dy_legs) == bought[k]
+        for (j, dx_leg, _), leg_dy in zip(legs, dy):
+            if j == k:
+                assert abs(leg_dy - bought[k] * dx_leg // dx_total[k]) <= len(dy_legs)
+
+
+def test_logs_one_trade_and_every_leg(pool):
+    legs = _legs(pool)
+    _deal(pool, legs)
+    i, dx = _net(pool, _dx_total(legs))
+
+    with boa.env.anchor():
+        dy = pool.instance.exchange_many(legs, sender=god)
+        trades, fills = _exchange_logs(pool)
+
+        assert len(trades) == 1
+        assert (trades[0].buyer, trades[0].sold_id, trades[0].tokens_sold) == (god, i, dx)
+        assert trades[0].bought_id == 1 - i
+        assert trades[0].fee > 0
+        assert trades[0].price_scale == pool.price_scale()
+
+        assert len(fills) == len(legs)
+        for (k, dx_leg, _), leg_dy, fill in zip(legs, dy, fills):
+            assert (fill.buyer, fill.sold_id, fill.tokens_sold) == (god, k, dx_leg)
+            assert (fill.bought_id, fill.tokens_bought) == (1 - k, leg_dy)
+
+
+def test_one_direction(pool):
+    legs = [leg for leg in _legs(pool) if leg[0] == 0]
+    _deal(pool, legs)
+    dx_total = _dx_total(legs)
+    assert _net(pool, dx_total) == (0, dx_total[0])
+
+    def reference():
+        return pool.instance.exchange(0, 1, dx_total[0], 0, sender=god)
+
+    with pool.same_state_as(reference, god) as expected:
+        assert sum(pool.instance.exchange_many(legs, sender=god)) == expected
+
+
+def test_matched_directions_do_not_trade(pool):
+    dx1 = pool.balances(1) // 50
+    dx0 = dx1 * pool.last_prices() // 10**18
+    legs = [(0, dx0, 0), (1, dx1, 0)]
+    _deal(pool, legs)
+    assert _net(pool, [dx0, dx1])[1] == 0
+
+    with boa.env.anchor():
+        state = pool.state_snapshot(god)
+        dy = pool.instance.exchange_many(legs, sender=god)
+        trades, fills = _exchange_logs(pool)
+
+        assert dy == [dx1, dx0]
+        assert pool.state_snapshot(god) == state
+        assert trades == []
+        assert len(fills) == 2
+
+
+def test_receiver(pool, user):
+    legs = _legs(pool)
+    _deal(pool, legs)
+
+    with boa.env.anchor():
+        dy = pool.instance.exchange_many(legs, user, sender=god)
+        for k in range(2):
+            bought = sum(leg_dy for (i, _, _), leg_dy in zip(legs, dy) if i != k)
+            assert pool.coins[k].balanceOf(user) == bought
+            assert pool.coins[k].balanceOf(god) == 0
+            assert pool.coins[k].balanceOf(pool.instance) == pool.balances(k)
+
+
+def test_reverts(pool):
+    legs = _legs(pool)
+    _deal(pool, legs)
+
+    with boa.reverts("zero dx"):
+        pool.instance.exchange_many(legs + [(1, 0, 0)], sender=god)
+
+    with boa.reverts():
+        pool.instance.exchange_many(legs + [(2, 10**18, 0)], sender=god)
+
+    # a single leg out of bounds reverts the batch
+    with boa.env.anchor():
+        dy = pool.instance.exchange_many(legs[:2], sender=god)
+    legs[1] = (legs[1][0], legs[1][1], 2 * dy[1])
+    with boa.reverts("slippage"):
+        pool.instance.exchange_many(legs, sender=god)
@@ -0,0 +1,102 @@
+import boa
+import pytest
+
+from tests.utils.constants import CALLBACK_ROUTER_DEPLOYER
+from tests.utils.god_mode import god
+
+
+@pytest.fixture(scope="module")
+def pool(gm_pool):
+    gm_pool.add_liquidity_balanced(10**6 * 10**18)
+    return gm_pool
+
+
+@pytest.fixture(scope="module")
+def router():
+    return CALLBACK_ROUTER_DEPLOYER.deploy()
+
+
+@pytest.mark.parametrize("i", [0, 1])
+def test_same_as_exchange(pool, router, user, i):
+    dx = pool.balances(i) // 100
+
+    def reference():
+        boa.deal(pool.coins[i], god, dx)
+        return pool.instance.exchange(i, 1 - i, dx, 0, user, sender=god)
+
+    with pool.same_state_as(reference, user) as expected:
+        boa.deal(pool.coins[i], router, dx)
+        dy = router.exchange(pool.instance, i, 1 - i, dx, 0, user, b"route")
+
+        assert dy == expected
+        assert pool.coins[1 - i].balanceOf(user) == dy
+        assert pool.coins[i].balanceOf(router) == 0
+
+        assert [router.last_callback(k) for k in range(4)] == [i, 1 - i, dx, dy]
+        assert router.last_data() == b"route"
+
+
+def test_logs_received(pool, router):
+    dx = pool.balances(0) // 100
+    boa.deal(pool.coins[0], router, dx + 10**18)
+    router.set_surplus(10**18)
+
+    with boa.env.anchor():
+        balance = pool.balances(0)
+        expected = pool.get_dy(0, 1, dx)
+        dy = router.exchange(pool.instance, 0, 1, dx, 0, router, b"")
+        logs = router.get_logs(strict=False)
+        log = [log for log in logs if type(log).__name__ == "TokenExchange"][0]
+
+        # priced and accounted for dx, the surplus is left out like a donation
+        assert dy == expected
+        assert (log.buyer, log.tokens_sold, log.tokens_bought) == (router.address, dx, dy)
+        assert pool.balances(0) == balance + dx
+        assert pool.coins[0].balanceOf(pool.instance) == balance + dx + 10**18
+
+
+def test_surplus_same_as_exchange(pool, router, user):
+    dx = pool.balances(0) // 100
+
+    with boa.env.anchor():
+        boa.deal(pool.coins[0], god, dx)
+        pool.instance.exchange(0, 1, dx, 0, user, sender=god)
+        expected_state = pool.state_snapshot(user)
+
+    with boa.env.anchor():
+        boa.deal(pool.coins[0], router, dx + 10**18)
+        router.set_surplus(10**18)
+        router.exchange(pool.instance, 0, 1, dx, 0, user, b"")
+
+        # only the coins held by the pool differ, by the surplus
+        expected_state["pool_token_balances"][0] += 10**18
+        assert pool.state_snapshot(user) == expected_state
+
+
+def test_reverts_when_underpaid(pool, router):
+    dx = pool.balances(0) // 100
+    boa.deal(pool.coins[0], router, dx)
+    router.set_surplus(-1)
+
+    with boa.reverts("user didn't give us coins"):
+        router.exchange(pool.instance, 0, 1, dx, 0, router, b"")
+
+
+def test_locked_during_callback(pool, router):
+    dx = pool.balances(0) // 100
+    boa.deal(pool.coins[0], router, dx)
+
+    # getters without the lock can be called back into, and count the unpaid dx
+    balance = pool.balances(0)
+    router.set_reentry(pool.instance.balances.prepare_calldata(0))
+    with boa.env.anchor():
+        router.exchange(pool.instance, 0, 1, dx, 0, router, b"")
+        assert int.from_bytes(router.reentry_response(), "big") == balance + dx
+
+    for reentry in (
+        pool.instance.exchange.prepare_calldata(0, 1, 10**18, 0),
+        pool.instance.price_oracle.prepare_calldata(),
+    ):
+        router.set_reentry(reentry)
+        with boa.reverts():
+            router.exchange(pool.instance, 0, 1, dx, 0, router, b"")
@@ -0,0 +1,73 @@
+import boa
+import pytest
+
+from tests.utils.constants import UNIX_DAY
+from tests.utils.god_mode import god
+
+
+@pytest.fixture(scope="module")
+def pool(gm_pool):
+    gm_pool.add_liquidity_balanced(10**6 * 10**18)
+    gm_pool.exchange(0, gm_pool.balances(0) // 10)
+    return gm_pool
+
+
+def _ladder(pool, i):
+    return [pool.balances(i) * k // 100 for k in (1, 2, 5, 10, 20, 40)]
+
+
+@pytest.mark.parametrize("ramp", ["static", "ramping"])
+@pytest.mark.parametrize("i", [0, 1])
+def test_same_as_single_quotes(pool, views_contract, factory_admin, i, ramp):
+    if ramp == "ramping":
+        pool.ramp_A_gamma(
+            pool.A() * 2,
+            pool.gamma(),
+            boa.env.evm.patch.timestamp + UNIX_DAY,
+            sender=factory_admin,
+        )
+        boa.env.time_travel(seconds=UNIX_DAY // 2)
+
+    dx = _ladder(pool, i)
+    assert views_contract.get_dy_many(i, 1 - i, dx, pool.instance) == [
+        views_contract.get_dy(i, 1 - i, amount, pool.instance) for amount in dx
+    ]
+
+    dy = _ladder(pool, 1 - i)
+    assert views_contract.get_dx_many(i, 1 - i, dy, pool.instance) == [
+        views_contract.get_dx(i, 1 - i, amount, pool.instance) for amount in dy
+    ]
+
+
+def test_quotes_are_exact(pool, views_contract):
+    dx = _ladder(pool, 0)
+    dy = views_contract.get_dy_many(0, 1, dx, pool.instance)
+
+    for amount, quote in zip(dx, dy):
+        with boa.env.anchor():
+            boa.deal(pool.coins[0], god, amount)
+            assert pool.instance.exchange(0, 1, amount, 0, sender=god) == quote
+
+
+def test_reads_pool_once(pool, views_contract):
+    dx = _ladder(pool, 0) * 4
+
+    views_contract.get_dy(0, 1, dx[0], pool.instance)
+    single = views_contract._computation.net_gas_used
+    views_contract.get_dy_many(0, 1, dx, pool.instance)
+    many = views_contract._computation.net_gas_used
+
+    # the math of every rung remains, and the pool's slots are warm here
+    assert many < single * len(dx) * 3 // 4
+
+
+def test_reverts(pool, views_contract):
+    dx = _ladder(pool, 0)
+
+    with boa.reverts("do not exchange 0 coins"):
+        views_contract.get_dy_many(0, 1, dx + [0], pool.instance)
+
+    with boa.reverts("coin index out of range"):
+        views_contract.get_dx_many(0, 0, dx, pool.instance)
+
+    assert views_contract.get_dy_many(0, 1, [], pool.instance) == []
@@ -0,0 +1,98 @@
+import boa
+import pytest
+
+from scripts.build_inline_math import INLINE_PATH, inline_source
+from tests.utils.constants import CODE_SIZE_LIMIT, POOL_INLINE_MATH_DEPLOYER, UNIX_DAY
+from tests.utils.god_mode import GodModePool
+
+INLINE_MATH_ID = 1
+
+
+@pytest.fixture(scope="module")
+def inline_pool(factory, owner, deployer, coins, params, inline_math_amm_implementation):
+    factory.set_pool_implementation(inline_math_amm_implementation, INLINE_MATH_ID, sender=owner)
+
+    with boa.env.prank(deployer):
+        pool = factory.deploy_pool(
+            "Curve.fi USD<>WETH",
+            "USD<>WETH",
+            [coin.address for coin in coins],
+            INLINE_MATH_ID,
+            params["A"],
+            params["gamma"],
+            params["mid_fee"],
+            params["out_fee"],
+            params["fee_gamma"],
+            params["allowed_extra_profit"],
+            params["adjustment_step"],
+            params["ma_time"],
+            params["initial_prices"][1],
+        )
+
+    return GodModePool(POOL_INLINE_MATH_DEPLOYER.at(pool), coins)
+
+
+def _state(pool):
+    return (
+        [pool.balances(i) for i in range(2)],
+        pool.D(),
+        pool.price_scale(),
+        pool.price_oracle(),
+        pool.last_prices(),
+        pool.xcp_profit(),
+        pool.virtual_price(),
+        pool.totalSupply(),
+    )
+
+
+def test_inline_math_up_to_date():
+    with open(INLINE_PATH) as f:
+        assert f.read() == inline_source(), "run scripts/build_inline_math.py"
+
+
+def test_exceeds_eip170():
+    # only deployable where the bytecode budget allows it
+    assert len(POOL_INLINE_MATH_DEPLOYER.compiler_data.bytecode_runtime) > CODE_SIZE_LIMIT
+
+
+def test_deployed_by_factory(factory, inline_pool, math_contract):
+    assert factory.pool_implementations(INLINE_MATH_ID) != factory.pool_implementations(0)
+    # the views contract and integrators still call the math implementation
+    assert inline_pool.MATH() == math_contract.address
+
+
+def test_same_results_as_external_math(gm_pool, inline_pool, factory_admin):
+    pools = (gm_pool, inline_pool)
+
+    def all_equal(f):
+        results = [f(pool) for pool in pools]
+        assert results[0] == results[1]
+
+    all_equal(lambda pool: pool.add_liquidity_balanced(10**6 * 10**18))
+
+    for step in range(10):
+        i = step % 2
+        all_equal(lambda pool: pool.exchange(i, pool.balances(i) // (10 + step)))
+        all_equal(_state)
+        boa.env.time_travel(seconds=600)
+
+    all_equal(lambda pool: pool.add_liquidity([pool.balances(0) // 10, 0]))
+    all_equal(_state)
+
+    for pool in pools:
+        pool.ramp_A_gamma(
+            pool.A() // 2,
+            pool.gamma() // 2,
+            boa.env.evm.patch.timestamp + UNIX_DAY,
+            sender=factory_admin,
+        )
+    boa.env.time_travel(seconds=UNIX_DAY // 2)
+
+    all_equal(lambda pool: pool.exchange(1, pool.balances(1) // 10))
+    all_equal(lambda pool: pool.remove_liquidity_one_coin(pool.balanceOf(boa.env.eoa) // 10, 0, 0))
+    all_equal(
+        lambda pool: pool.remove_liquidity_fixed_out(
+            pool.balanceOf(boa.env.eoa) // 10, 1, pool.balances(1) // 100, 0
+        )
+    )
+    all_equal(_state)
@@ -0,0 +1,109 @@
+import boa
+import pytest
+
+from tests.utils.constants import ERC20_DEPLOYER, ERC20_FEE_ON_TRANSFER_DEPLOYER, POOL_DEPLOYER
+from tests.utils.god_mode import GodModePool, god
+
+
+@pytest.fixture(scope="module")
+def standard_coins(factory, owner):
+    coins = [ERC20_DEPLOYER.deploy("USD", "USD", 18), ERC20_DEPLOYER.deploy("BTC", "BTC", 18)]
+    for coin in coins:
+        factory.set_standard_token(coin, True, sender=owner)
+    return coins
+
+
+@pytest.fixture(scope="module")
+def fee_coin():
+    return ERC20_FEE_ON_TRANSFER_DEPLOYER.deploy("FEE", "FEE", 18)
+
+
+def _deploy(factory, coins, params):
+    pool = factory.deploy_pool(
+        "Curve.fi USD<>WETH",
+        "USD<>WETH",
+        [coin.address for coin in coins],
+        0,
+        params["A"],
+        params["gamma"],
+        params["mid_fee"],
+        params["out_fee"],
+        params["fee_gamma"],
+        params["allowed_extra_profit"],
+        params["adjustment_step"],
+        params["ma_time"],
+        params["initial_prices"][1],
+    )
+    gm_pool = GodModePool(POOL_DEPLOYER.at(pool), coins)
+    gm_pool.add_liquidity_balanced(10**6 * 10**18)
+    return gm_pool
+
+
+def _exchange_gas(pool):
+    dx = pool.balances(0) // 100
+    boa.deal(pool.coins[0], god, dx)
+    pool.instance.exchange(0, 1, dx, 0, sender=god)
+    return pool.instance._computation.net_gas_used
+
+
+def test_set_standard_token(factory, owner):
+    token = boa.env.generate_address()
+    assert not factory.standard_tokens(token)
+
+    factory.set_standard_token(token, True, sender=owner)
+    log = factory.get_logs()[-1]
+    assert (log.token, log.is_standard) == (token, True)
+    assert factory.standard_tokens(token)
+
+    factory.set_standard_token(token, False, sender=owner)
+    assert not factory.standard_tokens(token)
+
+
+def test_flag_recorded_on_deployment(factory, owner, coins, standard_coins, fee_coin, params):
+    assert factory.get_standard_erc20(_deploy(factory, standard_coins, params).address)
+    # both coins must be standard
+    assert not factory.get_standard_erc20(_deploy(factory, coins, params).address)
+    mixed = [standard_coins[0], fee_coin]
+    assert not factory.get_standard_erc20(_deploy(factory, mixed, params).address)
+
+    # later changes do not affect pools already deployed
+    with boa.env.anchor():
+        pool = _deploy(factory, standard_coins, params)
+        factory.set_standard_token(standard_coins[0], False, sender=owner)
+        assert factory.get_standard_erc20(pool.address)
+        assert not factory.get_standard_erc20(_deploy(factory, standard_coins, params).address)
+
+
+def test_standard_pool_is_cheaper(factory, coins, standard_coins, params):
+    standard_pool = _deploy(factory, standard_coins, params)
+    pool = _deploy(factory, coins, params)
+
+    with boa.env.anchor():
+        standard_gas = _exchange_gas(standard_pool)
+        gas = _exchange_gas(pool)
+
+    # two balanceOf calls less (warm here, as the pools were just seeded)
+    assert gas - standard_gas > 1000
+
+    # same result
+    for gm_pool in (standard_pool, pool):
+        gm_pool.exchange(0, gm_pool.balances(0) // 100)
+        gm_pool.add_liquidity([10**20, 10**20])
+    assert [standard_pool.balances(i) for i in range(2)] == [pool.balances(i) for i in range(2)]
+    assert standard_pool.totalSupply() == pool.totalSupply()
+
+
+def test_fee_on_transfer_coin(factory, standard_coins, fee_coin, params):
+    pool = _deploy(factory, [standard_coins[0], fee_coin], params)
+    balances = [pool.balances(i) for i in range(2)]
+    assert balances == [coin.balanceOf(pool.instance) for coin in pool.coins]
+
+    dx = balances[1] // 100
+    boa.deal(fee_coin, god, dx)
+    dy = pool.instance.exchange(1, 0, dx, 0, sender=god)
+    log = pool.instance.get_logs()[-1]
+
+    # only what the pool received is credited
+    assert log.tokens_sold == dx - dx // 100
+    assert pool.balances(1) == balances[1] + log.tokens_sold == fee_coin.balanceOf(pool.instance)
+    assert pool.balances(0) == balances[0] - dy == standard_coins[0].balanceOf(pool.instance)
@@ -0,0 +1,20 @@
+import pytest
+
+from tests.utils.constants import POOL_DEPLOYER, POOL_INLINE_MATH_DEPLOYER
+
+
+@pytest.mark.parametrize("deployer", [POOL_DEPLOYER, POOL_INLINE_MATH_DEPLOYER])
+def test_lock_in_transient_storage(deployer):
+    layout = deployer.compiler_data.storage_layout
+    # the reentrancy lock is the only transient state, and never hits storage
+    assert list(layout["transient_storage_layout"]) == ["$.nonreentrant_key"]
+    assert "$.nonreentrant_key" not in layout["storage_layout"]
+
+
+def test_nonreentrant_view_does_not_touch_storage(gm_pool):
+    # `price_scale` takes the lock and reads one cold slot, `precisions`
+    # only reads immutables. A lock in storage would be a second cold slot.
+    gm_pool.price_scale()
+    gas = gm_pool._computation.net_gas_used
+    gm_pool.precisions()
+    assert gas - gm_pool._computation.net_gas_used < 2100 + 2100
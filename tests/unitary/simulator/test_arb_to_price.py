@@ -0,0 +1,50 @@
+import pytest
+
+from tests.utils.simulator import Trader
+
+P0 = 2000 * 10**18
+
+
+@pytest.fixture(params=["int", "float"])
+def trader(request):
+    return Trader(400000, 145000000000000, 10**24, [10**18, P0], mode=request.param)
+
+
+def _spot(trader):
+    # price of coin 1 in coin 0
+    return trader.curve.get_p() * trader.curve.p[1] // 10**18
+
+
+@pytest.mark.parametrize("move", [1.005, 1.02, 1.2, 1 / 1.005, 1 / 1.02, 1 / 1.2])
+def test_stops_at_p_ext(trader, move):
+    p_ext = int(P0 * move)
+    i, j = (0, 1) if p_ext > P0 else (1, 0)
+
+    dy = trader.arb_to_price(p_ext, i, j)
+    assert dy > 0
+
+    # the marginal price, fee included, is that of the market: what the
+    # last coin j bought costs when buying it, and earns when selling i
+    fee = trader.fee()
+    p = _spot(trader)
+    if i == 0:
+        p_marginal = p * 10**10 // (10**10 - fee)
+    else:
+        p_marginal = p * (10**10 - fee) // 10**10
+    assert p_marginal == pytest.approx(p_ext, rel=1e-9)
+
+    # nothing left to take in either direction, but rounding dust
+    assert trader.arb_to_price(p_ext, i, j) <= dy // 10**9
+    assert trader.arb_to_price(p_ext, j, i) == 0
+
+
+def test_no_trade_inside_fee_band(trader):
+    fee = trader.fee()
+    x = trader.curve.x[:]
+    low = P0 * (10**10 - fee) // 10**10
+    high = P0 * 10**10 // (10**10 - fee)
+
+    for p_ext in (low + 1, P0, high - 1):
+        assert trader.arb_to_price(p_ext, 0, 1) == 0
+        assert trader.arb_to_price(p_ext, 1, 0) == 0
+    assert trader.curve.x == x
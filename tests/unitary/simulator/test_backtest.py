@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+
+from tests.utils.backtest import (
+    METRICS_DTYPE,
+    MetricsWriter,
+    backtest,
+    load_metrics,
+    read_csv,
+    read_npy,
+    ticks_from_ohlc,
+)
+from tests.utils.simulator import Trader
+
+T0 = 1700000000
+
+
+def _candles(n=40, seed=0):
+    # a random walk around 2000, one candle a minute
+    rng = np.random.default_rng(seed)
+    closes = 2000 * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    candles = []
+    o = 2000.0
+    for k, c in enumerate(closes):
+        h, lo = max(o, c) * 1.001, min(o, c) * 0.999
+        candles.append((T0 + 60 * k, o, h, lo, float(c)))
+        o = float(c)
+    return candles
+
+
+def _trader(t0=T0):
+    return Trader(400000, 145000000000000, 10**24, [10**18, 2000 * 10**18], t=t0)
+
+
+class _Records:
+    def __init__(self):
+        self.records = []
+
+    def append(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "candles.csv"
+    with open(path, "w") as f:
+        f.write("t,open,high,low,close\n")
+        for candle in _candles():
+            f.write(",".join(str(v) for v in candle) + "\n")
+    return str(path)
+
+
+def test_read_csv_and_npy(csv_path, tmp_path):
+    rows = list(read_csv(csv_path))
+    assert rows == _candles()
+    assert all(type(t) is int for t, *_ in rows)
+
+    path = str(tmp_path / "candles.npy")
+    np.save(path, np.array(rows, dtype=np.float64))
+    # streamed a few rows at a time, across a partial last chunk
+    assert list(read_npy(path, chunk=7)) == rows
+
+
+def test_ticks_from_ohlc():
+    candles = [(1, 10.0, 12.0, 9.0, 11.0), (2, 11.0, 13.0, 8.0, 10.0)]
+    assert list(ticks_from_ohlc(candles)) == [
+        (1, 10.0),
+        (1, 9.0),
+        (1, 12.0),
+        (1, 11.0),
+        (2, 11.0),
+        (2, 13.0),
+        (2, 8.0),
+        (2, 10.0),
+    ]
+
+
+def test_metrics_writer_buffers_whole_chunks(tmp_path):
+    path = str(tmp_path / "metrics.bin")
+    records = [tuple(float(k + f) for f in range(len(METRICS_DTYPE))) for k in range(10)]
+
+    with MetricsWriter(path, chunk=4) as out:
+        for record in records[:6]:
+            out.append(record)
+        # only the first chunk is out, the rest waits in the buffer
+        assert len(load_metrics(path)) == 4
+
+    # resumes appending after what is on disk
+    with MetricsWriter(path, chunk=4) as out:
+        assert out.count == 6
+        for record in records[6:]:
+            out.append(record)
+
+    expected = np.array(records, dtype=METRICS_DTYPE)
+    assert np.array_equal(load_metrics(path), expected)
+
+
+def test_backtest_round_trip(csv_path, tmp_path):
+    path = str(tmp_path / "metrics.bin")
+    ticks = list(ticks_from_ohlc(read_csv(csv_path)))
+
+    trader = _trader()
+    with MetricsWriter(path, chunk=16) as out:
+        steps = backtest(trader, iter(ticks), out)
+    assert steps == len(ticks)
+
+    # the same run, kept in memory
+    reference = _Records()
+    backtest(_trader(), iter(ticks), reference)
+
+    metrics = load_metrics(path)
+    assert np.array_equal(metrics, np.array(reference.records, dtype=METRICS_DTYPE))
+    assert metrics["t"].tolist() == [t for t, _ in ticks]
+    assert metrics["p_ext"].tolist() == [p for _, p in ticks]
+    assert metrics["price_scale"][-1] == trader.curve.p[1] / 1e18
+    assert metrics["volume"].sum() > 0
+    assert np.all(metrics["fees"] >= 0)
+    assert np.all(np.diff(metrics["xcp_profit"]) >= 0)
+
+
+def test_backtest_starts_at_trader_t(csv_path):
+    ticks = list(ticks_from_ohlc(read_csv(csv_path)))
+
+    # the first tick is in the block of the last trade: no rebalance yet
+    trader = _trader()
+    backtest(trader, iter(ticks[:1]), _Records())
+    assert trader.t == T0
+    assert trader.price_oracle[1] == 2000 * 10**18
@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pytest
+
+from tests.utils.sweep import cell_key, grid, sweep
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    # a few rising and falling candles, one a minute
+    path = tmp_path / "candles.csv"
+    closes = [2000.0, 2010.0, 1995.0, 2030.0, 2005.0, 1980.0, 2001.0, 2020.0]
+    with open(path, "w") as f:
+        f.write("t,open,high,low,close\n")
+        o = 2000.0
+        for k, c in enumerate(closes):
+            f.write(f"{1700000000 + 60 * k},{o},{max(o, c) * 1.001},{min(o, c) * 0.999},{c}\n")
+            o = c
+    return str(path)
+
+
+@pytest.fixture
+def cells():
+    return grid(A=[200000, 400000], gamma=[10**14, 145000000000000], mid_fee=[0.001, 0.0026])
+
+
+def _assert_same_columns(columns, expected):
+    assert list(columns) == list(expected)
+    for k, v in expected.items():
+        # fee_gamma=None is stored as nan
+        assert np.array_equal(columns[k], v, equal_nan=v.dtype.kind == "f")
+
+
+def _checkpoints(checkpoint_dir):
+    return {
+        f: os.path.getmtime(os.path.join(checkpoint_dir, f)) for f in os.listdir(checkpoint_dir)
+    }
+
+
+@pytest.mark.parametrize("interrupted_after", ["first", "last"])
+def test_resume_same_as_uninterrupted(csv_path, cells, tmp_path, interrupted_after):
+    expected = sweep(
+        cells, csv_path, str(tmp_path / "full.npz"), str(tmp_path / "full"), chunk_size=3
+    )
+
+    # a run that stopped once one chunk was checkpointed, either the first
+    # one of `cells` or the last one (chunks finish in any order)
+    checkpoint_dir = str(tmp_path / "resumed")
+    done = cells[:3] if interrupted_after == "first" else cells[6:]
+    sweep(done, csv_path, str(tmp_path / "partial.npz"), checkpoint_dir, chunk_size=3)
+    before = _checkpoints(checkpoint_dir)
+    assert len(before) == 1
+
+    out_path = str(tmp_path / "resumed.npz")
+    columns = sweep(cells, csv_path, out_path, checkpoint_dir, chunk_size=3)
+
+    # the checkpointed chunk was not run again
+    after = _checkpoints(checkpoint_dir)
+    assert len(after) > 1
+    assert {f: after[f] for f in before} == before
+
+    assert columns["key"].tolist() == [cell_key(c, csv_path, 10**24, "int") for c in cells]
+    _assert_same_columns(columns, expected)
+    with np.load(out_path) as saved:
+        _assert_same_columns(dict(saved), expected)
+
+
+def test_rows_in_order_of_cells(csv_path, cells, tmp_path):
+    checkpoint_dir = str(tmp_path / "checkpoints")
+    sweep(cells, csv_path, str(tmp_path / "a.npz"), checkpoint_dir, chunk_size=2)
+
+    # everything is checkpointed: only the merge runs, in the new order
+    columns = sweep(cells[::-1], csv_path, str(tmp_path / "b.npz"), checkpoint_dir, chunk_size=2)
+    assert columns["key"].tolist() == [cell_key(c, csv_path, 10**24, "int") for c in cells[::-1]]
+    assert columns["A"].tolist() == [c["A"] for c in cells[::-1]]
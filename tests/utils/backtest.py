@@ -0,0 +1,196 @@
+"""
+Streaming backtests of the simulator's `Trader` against market data.
+
+Prices are streamed from disk by generators, so multi-year files never
+have to fit in memory, and per-step metrics are appended to a result
+file that is memory-mapped back with `load_metrics` (also while the
+backtest is still running, up to the last flushed chunk):
+
+    trader = Trader(A, gamma, D, [10**18, p0], t=t0, ...)
+    with MetricsWriter("out.bin") as out:
+        backtest(trader, ticks_from_ohlc(read_csv("ethusd.csv")), out)
+    metrics = load_metrics("out.bin")
+
+Prices are floats of coin 1 quoted in coin 0, as in the data files.
+"""
+
+import csv
+import os
+
+import numpy as np
+
+from tests.utils.simulator import Trader
+
+METRICS_DTYPE = np.dtype(
+    [
+        ("t", np.int64),
+        ("p_ext", np.float64),
+        ("price_scale", np.float64),
+        ("price_oracle", np.float64),
+        ("last_price", np.float64),
+        ("xcp_profit", np.float64),
+        ("virtual_price", np.float64),
+        ("volume", np.float64),  # in coin 0
+        ("fees", np.float64),  # in coin 0
+    ]
+)
+
+# rows mapped at once when appending to the result file
+CHUNK = 2**16
+
+
+# ---------------- market data ----------------
+
+
+def read_csv(path, columns=("t", "open", "high", "low", "close")):
+    """
+    Stream rows of `columns` from a csv file with a header, converting
+    the first column to int and the others to float.
+    """
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield (int(float(row[columns[0]])),) + tuple(float(row[c]) for c in columns[1:])
+
+
+def read_npy(path, chunk=CHUNK):
+    """
+    Stream rows of a 2d .npy file (same column order as `read_csv`)
+    without loading it: the file is memory-mapped and copied a chunk
+    at a time.
+    """
+    data = np.load(path, mmap_mode="r")
+    for start in range(0, len(data), chunk):
+        for row in np.array(data[start : start + chunk]):
+            yield (int(row[0]),) + tuple(float(v) for v in row[1:])
+
+
+def ticks_from_ohlc(candles):
+    """
+    Turn (t, open, high, low, close) candles into (t, price) ticks
+    following the usual open -> low -> high -> close path for rising
+    candles and open -> high -> low -> close for falling ones.
+    """
+    for t, o, h, lo, c in candles:
+        yield from (
+            ((t, o), (t, lo), (t, h), (t, c)) if c >= o else ((t, o), (t, h), (t, lo), (t, c))
+        )
+
+
+# ---------------- arbitrage ----------------
+
+
+def _spot(trader):
+    # price of coin 1 in coin 0
+    return trader.curve.get_p() * trader.curve.p[1] // 10**18
+
+
+def arbitrage(trader, p_ext):
+    """
+    Trade the pool towards `p_ext` (coin 1 in coin 0, 1e18 based) as a
+    profit-maximizing arbitrageur would, see `Trader.arb_to_price`.
+
+    Returns the amount traded in and the fee paid, both in coin 0.
+    """
+    p = _spot(trader)
+    if p == p_ext:
+        return 0, 0
+    # coin 1 is cheaper in the pool: buy it with coin 0, and vice versa
+    i, j = (0, 1) if p < p_ext else (1, 0)
+
+    x_old = trader.curve.x[i]
+    dy = trader.arb_to_price(p_ext, i, j)
+    if not dy:
+        return 0, 0
+    dx = trader.curve.x[i] - x_old
+
+    fee = trader.fee()
+    fee_j = dy * fee // (10**10 - fee)
+    if i == 0:
+        return dx, fee_j * p_ext // 10**18
+    return dx * p_ext // 10**18, fee_j
+
+
+# ---------------- results ----------------
+
+
+class MetricsWriter:
+    """
+    Append-only result file of METRICS_DTYPE records. Records are
+    buffered a chunk at a time and only written out whole, so the file
+    never holds more than the records flushed so far.
+    """
+
+    def __init__(self, path, dtype=METRICS_DTYPE, chunk=CHUNK):
+        self.path = path
+        self.dtype = dtype
+        # resume appending to an existing file
+        self.count = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+        self._buffer = np.zeros(chunk, dtype=dtype)
+        self._buffered = 0
+
+    def append(self, record):
+        if self._buffered == len(self._buffer):
+            self.flush()
+        self._buffer[self._buffered] = record
+        self._buffered += 1
+        self.count += 1
+
+    def flush(self):
+        with open(self.path, "ab") as f:
+            # drops a half-written record left by an interrupted run
+            f.truncate((self.count - self._buffered) * self.dtype.itemsize)
+            f.write(self._buffer[: self._buffered].tobytes())
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_metrics(path, dtype=METRICS_DTYPE):
+    # a record may be half written while the backtest is running
+    count = os.path.getsize(path) // dtype.itemsize
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+# ---------------- engine ----------------
+
+
+def backtest(trader: Trader, ticks, out: MetricsWriter):
+    """
+    Drive `trader` with (t, price) ticks: arbitrage the pool to every
+    tick, let it adjust with `tweak_price(t)` and append the metrics of
+    the step to `out`. Returns the number of steps.
+
+    The trader last traded at `trader.t`: create it with the time of
+    the first tick, or that tick already counts as a new block.
+    """
+    steps = 0
+    for t, price in ticks:
+        p_ext = int(price * 10**18)
+
+        volume, fees = arbitrage(trader, p_ext)
+        trader.tweak_price(t)
+
+        out.append(
+            (
+                t,
+                price,
+                trader.curve.p[1] / 1e18,
+                trader.price_oracle[1] / 1e18,
+                trader.last_price[1] / 1e18,
+                trader.xcp_profit / 1e18,
+                trader.get_virtual_price() / 1e18,
+                volume / 1e18,
+                fees / 1e18,
+            )
+        )
+        steps += 1
+
+    return steps
@@ -0,0 +1,116 @@
+"""
+Microbenchmark of the simulator kernels on the workloads of the
+hypothesis suites in `tests/utils/fuzz_curve.py` (same input ranges,
+drawn with `random` so that hypothesis' own overhead is left out).
+
+    python -m tests.utils.bench_simulator
+
+Other versions of the simulator can be given as module names or file
+paths to compare against, e.g. the one of another revision:
+
+    git show HEAD~1:tests/utils/simulator.py > /tmp/simulator_old.py
+    python -m tests.utils.bench_simulator tests.utils.simulator /tmp/simulator_old.py
+"""
+
+import importlib
+import importlib.util
+import random
+import sys
+import time
+
+from tests.utils.fuzz_curve import MAX_A, MAX_GAMMA, MAX_XD, MIN_A, MIN_GAMMA, MIN_XD
+
+N_SAMPLES = 2000
+
+
+def _load(name):
+    if not name.endswith(".py"):
+        return importlib.import_module(name)
+    spec = importlib.util.spec_from_file_location(f"bench_{abs(hash(name))}", name)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _workloads(sim, rng):
+    p = [10**18, 10**18]
+
+    def geometric_mean():
+        x, y = rng.randint(10**9, 10**33), rng.randint(10**9, 10**33)
+        return lambda: sim.geometric_mean([x, y])
+
+    def reduction_coefficient():
+        x, y = rng.randint(10**9, 10**33), rng.randint(10**9, 10**33)
+        gamma = rng.randint(10**10, 10**18)
+        return lambda: sim.reduction_coefficient([x, y], gamma)
+
+    def D_convergence():
+        A, gamma = rng.randint(MIN_A, MAX_A), rng.randint(MIN_GAMMA, MAX_GAMMA)
+        x = rng.randint(10**18, 10**33)
+        curve = sim.Curve(A, gamma, 10**18, p)
+
+        def run():
+            curve.x = [x, x * rng.randint(10**14, 10**18) // 10**18]
+            return curve.D()
+
+        return run
+
+    def y_convergence():
+        A, gamma = rng.randint(MIN_A, MAX_A), rng.randint(MIN_GAMMA, MAX_GAMMA)
+        x = rng.randint(10**17, 10**33)
+        curve = sim.Curve(A, gamma, 10**18, p)
+        curve.x = [x, x * rng.randint(10**15, 10**21) // 10**18]
+        i = rng.randint(0, 1)
+        in_amount = x * rng.randint(10**15, 10**21) // 10**18
+        return lambda: curve.y(in_amount, i, 1 - i)
+
+    def y_from_D():
+        A, gamma = rng.randint(MIN_A, MAX_A), rng.randint(MIN_GAMMA, MAX_GAMMA)
+        D = rng.randint(10**18, 10**33)
+        xp = [D * rng.randint(MIN_XD, MAX_XD) // 10**18, D * rng.randint(MIN_XD, MAX_XD) // 10**18]
+        j = rng.randint(0, 1)
+
+        def run():
+            _xp = xp[:]
+            _xp[j] = sim.solve_x(A, gamma, _xp, D, j)
+            return sim.solve_D(A, gamma, _xp)
+
+        return run
+
+    return {
+        f.__name__: f
+        for f in (geometric_mean, reduction_coefficient, D_convergence, y_convergence, y_from_D)
+    }
+
+
+def bench(sim, n=N_SAMPLES, repeat=5, seed=0):
+    """
+    Mean time per call in microseconds of every workload, best of
+    `repeat` runs over the same `n` inputs.
+    """
+    results = {}
+    for name in _workloads(sim, None):
+        best = float("inf")
+        for _ in range(repeat):
+            make = _workloads(sim, random.Random(seed))[name]
+            calls = [make() for _ in range(n)]
+            elapsed = 0.0
+            for call in calls:
+                start = time.perf_counter()
+                try:
+                    call()
+                except Exception:
+                    pass  # fuzz_curve deliberately tries unsafe values too
+                elapsed += time.perf_counter() - start
+            best = min(best, elapsed)
+        results[name] = best / n * 1e6
+    return results
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or ["tests.utils.simulator"]
+    runs = {name: bench(_load(name)) for name in names}
+    print(f"{'us/call':<24}" + "".join(f"{name[-28:]:>30}" for name in names))
+    for workload in runs[names[0]]:
+        row = "".join(f"{runs[name][workload]:>30.1f}" for name in names)
+        print(f"{workload:<24}{row}")
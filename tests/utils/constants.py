@@ -16,8 +16,11 @@ MATH_DEPLOYER = boa.load_partial("contracts/main/TwocryptoMath.vy")
 VIEW_DEPLOYER = boa.load_partial("contracts/main/TwocryptoView.vy")
 FACTORY_DEPLOYER = boa.load_partial("contracts/main/TwocryptoFactory.vy")
 POOL_DEPLOYER = boa.load_partial("contracts/main/Twocrypto.vy")
+POOL_INLINE_MATH_DEPLOYER = boa.load_partial("contracts/main/TwocryptoInlineMath.vy")
 GAUGE_DEPLOYER = boa.load_partial("contracts/main/LiquidityGauge.vy")
 ERC20_DEPLOYER = boa.load_partial("tests/mocks/ERC20Mock.vy")
+ERC20_FEE_ON_TRANSFER_DEPLOYER = boa.load_partial("tests/mocks/ERC20FeeOnTransferMock.vy")
+CALLBACK_ROUTER_DEPLOYER = boa.load_partial("tests/mocks/CallbackRouterMock.vy")
 
 # Set venom flag based on CI environment variable, default to False for local development
 venom_enabled = os.getenv("VENOM", False) == "true"
@@ -45,3 +48,5 @@ UNIX_DAY = 86400
 MIN_FEE = c._constants.MIN_FEE
 MAX_FEE = c._constants.MAX_FEE
 MIN_RAMP_TIME = c._constants.MIN_RAMP_TIME
+# EIP-170, which the inline math variant of the pool does not fit in
+CODE_SIZE_LIMIT = 24576
@@ -3,6 +3,8 @@ GodMode™ is a bespoke thin wrapper around twocrypto that reduces
 the amount of boilerplate code needed to write meaningful tests.
 """
 
+from contextlib import contextmanager
+
 import boa
 from tests.utils.constants import N_COINS
 
@@ -60,6 +62,37 @@ class GodModePool:
         ], "pool coins balances are not consistent"
         return snapshot
 
+    def state_snapshot(self, *holders):
+        """Whatever an entry point can change: the pool's state, with the
+        coins and LP tokens of `holders`."""
+        return {
+            "pool_coins": [self.instance.balances(i) for i in range(N_COINS)],
+            "pool_token_balances": [c.balanceOf(self.instance) for c in self.coins],
+            "holders": [
+                [c.balanceOf(holder) for c in self.coins] + [self.instance.balanceOf(holder)]
+                for holder in holders
+            ],
+            "lp_supply": self.instance.totalSupply(),
+            "D": self.instance.D(),
+            "virtual_price": self.instance.virtual_price(),
+            "xcp_profit": self.instance.xcp_profit(),
+            "last_prices": self.instance.last_prices(),
+            "price_scale": self.instance.price_scale(),
+            "price_oracle": self.instance.price_oracle(),
+        }
+
+    @contextmanager
+    def same_state_as(self, reference, *holders):
+        """Run `reference`, then the with block from the same state: it must
+        leave the same `state_snapshot`. Yields what `reference` returned."""
+        with boa.env.anchor():
+            expected = reference()
+            expected_state = self.state_snapshot(*holders)
+
+        with boa.env.anchor():
+            yield expected
+            assert self.state_snapshot(*holders) == expected_state
+
     def __premint_amounts(self, amounts):
         for c, amount in zip(self.coins, amounts):
             boa.deal(c, god, amount)
@@ -0,0 +1,154 @@
+"""
+Iteration counts of the Newton solvers, for the checklist of
+tests/fuzzing/README.md ("the number of iterations required to converge
+should not increase significantly").
+
+- `tests.utils.simulator.profile_newton()` records every solve of the
+  simulator, with its call site.
+- `math_harness()` deploys a variant of `TwocryptoMath.vy`, generated
+  from the source, whose `_newton_D` and `_newton_y` also record how many
+  iterations they took. `_cbrt` is unrolled to a fixed 7 iterations and
+  has nothing to count.
+- `report()` breaks both down by A, gamma and imbalance.
+
+    python -m tests.utils.newton_profile [n_samples]
+"""
+
+import random
+import re
+import sys
+from math import floor, log10
+
+import boa
+import pandas as pd
+
+import tests.utils.simulator as sim
+from tests.utils.constants import MAX_A, MAX_GAMMA, MIN_A, MIN_GAMMA
+
+MATH_PATH = "contracts/main/TwocryptoMath.vy"
+
+# (function, loop variable, returned variable, counter)
+_COUNTED = (
+    ("_newton_D", "i", "D", "newton_D_iterations"),
+    ("_newton_y", "j", "y", "newton_y_iterations"),
+)
+
+
+def harness_source(path=MATH_PATH):
+    """
+    Source of the math contract with iteration counters: the counters are
+    storage variables, so every function loses its @pure/@view decorator
+    (and the contract its `implements`). Nothing else changes.
+    """
+    with open(path) as f:
+        src = f.read()
+
+    src = src.replace("implements: ITwocryptoMath\n", "")
+    src = re.sub(r"^@(pure|view)\n", "", src, flags=re.M)
+
+    counters = "".join(f"{counter}: public(uint256)\n" for *_, counter in _COUNTED)
+    resets = "".join(f"    self.{counter} = 0\n" for *_, counter in _COUNTED)
+    src = src.replace(
+        "# ------------------------ AMM math functions",
+        f"{counters}\n\n@external\ndef reset_iterations():\n{resets}\n\n"
+        "# ------------------------ AMM math functions",
+    )
+
+    for fn, var, ret, counter in _COUNTED:
+        start = src.index(f"\ndef {fn}(")
+        end = src.find("\ndef ", start + 1)
+        end = len(src) if end == -1 else end
+        # the converged returns are the ones inside the loop
+        body = re.sub(
+            rf"^(\s+)return {ret}\n",
+            rf"\1self.{counter} = {var} + 1\n\1return {ret}\n",
+            src[start:end],
+            flags=re.M,
+        )
+        src = src[:start] + body + src[end:]
+
+    return src
+
+
+def math_harness():
+    deployer = boa.loads_partial(
+        harness_source(), name="TwocryptoMathIterations", filename=MATH_PATH
+    )
+    return deployer.deploy()
+
+
+def harness_call(harness, fn, *args):
+    """Call `fn` of the harness, returning its result and iteration counts."""
+    harness.reset_iterations()
+    result = getattr(harness, fn)(*args)
+    return result, {counter: getattr(harness, counter)() for *_, counter in _COUNTED}
+
+
+# ---------------- report ----------------
+
+IMBALANCE_BUCKETS = (0.0, 0.01, 0.1, 0.5, 1.0)
+
+
+def _decade(v):
+    return "-" if pd.isna(v) else f"1e{floor(log10(v))}"
+
+
+def report(records):
+    """
+    Iterations per solver, call site and A/gamma/imbalance bucket (the
+    ratio of the smaller balance to the larger one). `records` are
+    (solver, call site, A, gamma, x, iterations), as recorded by
+    `sim.profile_newton()`.
+    """
+    df = pd.DataFrame(records, columns=["solver", "site", "A", "gamma", "x", "iterations"])
+    df["A"] = df["A"].map(_decade)
+    df["gamma"] = df["gamma"].map(_decade)
+    df["imbalance"] = pd.cut(
+        df["x"].map(lambda x: min(x) / max(x)), IMBALANCE_BUCKETS, include_lowest=True
+    )
+    grouped = df.groupby(["solver", "site", "A", "gamma", "imbalance"], observed=True)["iterations"]
+    return grouped.describe(percentiles=[0.5, 0.99])[["count", "mean", "50%", "99%", "max"]]
+
+
+def _sample(rng):
+    A = rng.randint(MIN_A, MAX_A)
+    gamma = int(10 ** rng.uniform(log10(MIN_GAMMA), log10(MAX_GAMMA)))
+    D = int(10 ** rng.uniform(18, 32))
+    # same ranges as tests/fuzzing/test_newton_D.py
+    x = [D * rng.randint(10**17, 10**19) // 10**18 for _ in range(2)]
+    return A, gamma, D, x
+
+
+def profile(n, seed=0):
+    """
+    Solve `n` random cases with the harness and with the simulator and
+    return the records of both.
+    """
+    rng = random.Random(seed)
+    harness = math_harness()
+    contract = []
+    with sim.profile_newton() as prof:
+        for _ in range(n):
+            A, gamma, D, x = _sample(rng)
+            j = rng.randint(0, 1)
+            try:
+                _, counts = harness_call(harness, "newton_D", A, gamma, x, 0)
+                contract.append(
+                    ("newton_D", "contract", A, gamma, x, counts["newton_D_iterations"])
+                )
+                sim.solve_D(A, gamma, x)
+                _, counts = harness_call(harness, "newton_y", A, gamma, x, D, j)
+                contract.append(
+                    ("_newton_y", "contract", A, gamma, x, counts["newton_y_iterations"])
+                )
+                sim.newton_y(A, gamma, x, D, j)
+            except Exception:
+                continue  # unsafe values, convergence is fuzzed elsewhere
+    return contract, prof.records
+
+
+if __name__ == "__main__":
+    contract, simulator = profile(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print("TwocryptoMath.vy\n", report(contract), "\n")
+        print("simulator\n", report(simulator))
@@ -1,9 +1,26 @@
 #!/usr/bin/env python3
 # flake8: noqa
+import sys
+from collections import Counter
+from contextlib import contextmanager
 from decimal import Decimal
-from math import exp
+from math import exp, isfinite, isqrt
+
+import numpy as np
 
 A_MULTIPLIER = 10000
+N_COINS = 2
+
+# Bounds enforced by TwocryptoMath.vy (see contracts/main/constants.vy)
+MIN_GAMMA = 10**10
+MAX_GAMMA_SMALL = 2 * 10**16
+MAX_GAMMA = 199 * 10**15
+MIN_A = 2**2 * A_MULTIPLIER // 10
+MAX_A = 2**2 * A_MULTIPLIER * 1000
+
+MAX_UINT256 = 2**256 - 1
+MIN_INT256 = -(2**255)
+MAX_INT256 = 2**255 - 1
 
 
 def get_y_n2_dec(ANN, gamma, x, D, i):
@@ -48,30 +65,82 @@ def get_y_n2_dec(ANN, gamma, x, D, i):
     return [root, (a, b, c, d)]
 
 
+# Opt-in profiling of the Newton solvers: inside `with profile_newton() as
+# prof:` every solve is recorded with its inputs and iteration count, see
+# tests/utils/newton_profile.py for reports. Outside of it a solve only
+# pays for one global lookup.
+
+_profile = None
+
+# solvers and thin wrappers around them, skipped when looking for the call site
+_SOLVERS = {
+    "geometric_mean",
+    "newton_D",
+    "newton_y",
+    "_newton_y",
+    "get_y",
+    "initial_D",
+    "solve_D",
+    "solve_x",
+    "solve_y",
+}
+
+
+class NewtonProfile:
+    def __init__(self):
+        # (solver, call site, A, gamma, x, iterations)
+        self.records = []
+
+    def record(self, solver, A, gamma, x, iterations):
+        frame = sys._getframe(2)
+        while frame is not None and frame.f_code.co_name in _SOLVERS:
+            frame = frame.f_back
+        site = frame.f_code.co_qualname if frame is not None else "?"
+        self.records.append((solver, site, A, gamma, tuple(x), iterations))
+
+    def histograms(self):
+        """Iteration count histogram per (solver, call site)."""
+        hist = {}
+        for solver, site, _, _, _, iterations in self.records:
+            hist.setdefault((solver, site), Counter())[iterations] += 1
+        return hist
+
+
+@contextmanager
+def profile_newton():
+    global _profile
+    previous, _profile = _profile, NewtonProfile()
+    try:
+        yield _profile
+    finally:
+        _profile = previous
+
+
+# The pool has N_COINS == 2, so the solvers below are written for 2 coins
+# on scalar locals: no sorting, list building or generators in the loops.
+
+
 def geometric_mean(x):
-    N = len(x)
-    x = sorted(x, reverse=True)  # Presort - good for convergence
-    D = x[0]
+    x0, x1 = x
+    if x0 < x1:
+        x0, x1 = x1, x0  # Presort - good for convergence
+    D = x0
     for i in range(255):
         D_prev = D
-        tmp = 10**18
-        for _x in x:
-            tmp = tmp * _x // D
-        D = D * ((N - 1) * 10**18 + tmp) // (N * 10**18)
-        diff = abs(D - D_prev)
+        tmp = 10**18 * x0 // D * x1 // D
+        D = D * (10**18 + tmp) // (2 * 10**18)
+        diff = D - D_prev if D > D_prev else D_prev - D
         if diff <= 1 or diff * 10**18 < D:
+            if _profile is not None:
+                _profile.record("geometric_mean", None, None, x, i + 1)
             return D
     raise ValueError("Did not converge")
 
 
 def reduction_coefficient(x, gamma):
-    N = len(x)
-    x_prod = 10**18
-    K = 10**18
-    S = sum(x)
-    for x_i in x:
-        x_prod = x_prod * x_i // 10**18
-        K = K * N * x_i // S
+    x0, x1 = x
+    S = x0 + x1
+    K = 10**18 * 2 * x0 // S * 2 * x1 // S
     if gamma > 0:
         K = gamma * 10**18 // (gamma + 10**18 - K)
     return K
@@ -85,66 +154,64 @@ def get_fee(x, fee_gamma, mid_fee, out_fee):
 def newton_D(A, gamma, x, D0):
     D = D0
 
-    S = sum(x)
-    x = sorted(x, reverse=True)
-    N = len(x)
-
-    assert N == 2
+    x0, x1 = x
+    if x0 < x1:
+        x0, x1 = x1, x0
+    S = x0 + x1
+    g1 = gamma + 10**18
 
     for i in range(255):
         D_prev = D
 
-        K0 = 10**18
-        for _x in x:
-            K0 = K0 * _x * N // D
+        K0 = 10**18 * x0 * 2 // D * x1 * 2 // D
 
-        _g1k0 = abs(gamma + 10**18 - K0)
+        _g1k0 = g1 - K0
+        if _g1k0 < 0:
+            _g1k0 = -_g1k0
 
         # D / (A * N**N) * _g1k0**2 / gamma**2
         mul1 = 10**18 * D // gamma * _g1k0 // gamma * _g1k0 * A_MULTIPLIER // A
 
         # 2*N*K0 / _g1k0
-        mul2 = (2 * 10**18) * N * K0 // _g1k0
+        mul2 = (4 * 10**18) * K0 // _g1k0
 
-        neg_fprime = (S + S * mul2 // 10**18) + mul1 * N // K0 - mul2 * D // 10**18
+        neg_fprime = (S + S * mul2 // 10**18) + mul1 * 2 // K0 - mul2 * D // 10**18
         assert neg_fprime > 0  # Python only: -f' > 0
 
         # D -= f / fprime
-        D = (D * neg_fprime + D * S - D**2) // neg_fprime - D * (mul1 // neg_fprime) // 10**18 * (
+        D = (D * neg_fprime + D * S - D * D) // neg_fprime - D * (mul1 // neg_fprime) // 10**18 * (
             10**18 - K0
         ) // K0
 
         if D < 0:
             D = -D // 2
-        if abs(D - D_prev) <= max(100, D // 10**14):
+        diff = D - D_prev if D > D_prev else D_prev - D
+        if diff <= 100 or diff <= D // 10**14:
+            if _profile is not None:
+                _profile.record("newton_D", A, gamma, x, i + 1)
             return D
 
     raise ValueError("Did not converge")
 
 
 def newton_y(A, gamma, x, D, i):
-    N = len(x)
-
-    assert N == 2
+    _x = x[1 - i]
+    g1 = gamma + 10**18
 
-    y = D // N
-    K0_i = 10**18
-    S_i = 0
-    x_sorted = sorted(_x for j, _x in enumerate(x) if j != i)
-    convergence_limit = max(max(x_sorted) // 10**14, D // 10**14, 100)
-    for _x in x_sorted:
-        y = y * D // (_x * N)  # Small _x first
-        S_i += _x
-    for _x in x_sorted[::-1]:
-        K0_i = K0_i * _x * N // D  # Large _x first
+    y = D // 2 * D // (_x * 2)
+    S_i = _x
+    K0_i = 10**18 * _x * 2 // D
+    convergence_limit = max(_x // 10**14, D // 10**14, 100)
 
     for j in range(255):
         y_prev = y
 
-        K0 = K0_i * y * N // D
+        K0 = K0_i * y * 2 // D
         S = S_i + y
 
-        _g1k0 = abs(gamma + 10**18 - K0)
+        _g1k0 = g1 - K0
+        if _g1k0 < 0:
+            _g1k0 = -_g1k0
 
         # D / (A * N**N) * _g1k0**2 / gamma**2
         mul1 = 10**18 * D // gamma * _g1k0 // gamma * _g1k0 * A_MULTIPLIER // A
@@ -163,10 +230,372 @@ def newton_y(A, gamma, x, D, i):
             print(j, y, D, x)
         if y < 0 or fprime < 0:
             y = y_prev // 2
-        if abs(y - y_prev) <= max(convergence_limit, y // 10**14):
+        diff = y - y_prev if y > y_prev else y_prev - y
+        if diff <= convergence_limit or diff <= y // 10**14:
+            if _profile is not None:
+                _profile.record("newton_y", A, gamma, x, j + 1)
             return y
 
-    raise Exception("Did not converge")
+    raise ValueError("Did not converge")
+
+
+# What the integer solvers raise outside of their domain: a failed Python
+# only check, no convergence, or a division by a value that reached zero.
+SOLVER_ERRORS = (AssertionError, ValueError, ZeroDivisionError)
+
+
+# The functions below are bit-exact ports of `TwocryptoMath.vy`. Vyper's
+# checked arithmetic reverts on int256/uint256 overflow and its signed
+# division truncates towards zero, while `unsafe_*` operations wrap. The
+# helpers emulate both so that the ports return exactly what the contract
+# returns, and raise `ValueError` exactly when the contract reverts.
+
+
+def _int256(x):
+    # checked int256 arithmetic
+    if x < MIN_INT256 or x > MAX_INT256:
+        raise ValueError("int256 overflow")
+    return x
+
+
+def _uint256(x):
+    # checked uint256 arithmetic
+    if x < 0 or x > MAX_UINT256:
+        raise ValueError("uint256 overflow")
+    return x
+
+
+def _wrap_int256(x):
+    # unsafe_add/unsafe_sub/unsafe_mul on int256
+    return ((x + 2**255) & MAX_UINT256) - 2**255
+
+
+def _div(a, b):
+    # `//` on uint256
+    if b == 0:
+        raise ValueError("safediv")
+    return a // b
+
+
+def _sdiv(a, b):
+    # unsafe_div on int256 (EVM SDIV): rounds towards zero, 0 if b == 0
+    if b == 0:
+        return 0
+    q = abs(a) // abs(b)
+    return _wrap_int256(q if (a < 0) == (b < 0) else -q)
+
+
+def _safe_sdiv(a, b):
+    # `//` on int256: rounds towards zero
+    if b == 0:
+        raise ValueError("safediv")
+    q = abs(a) // abs(b)
+    return _int256(q if (a < 0) == (b < 0) else -q)
+
+
+def _snekmate_log_2(x, roundup):
+    result = x.bit_length() - 1 if x > 0 else 0
+    if roundup and (1 << result) < x:
+        result += 1
+    return result
+
+
+def _cbrt(x):
+    if x >= 115792089237316195423570985008687907853269 * 10**18:
+        xx = x
+    elif x >= 115792089237316195423570985008687907853269:
+        xx = (x * 10**18) & MAX_UINT256
+    else:
+        xx = (x * 10**36) & MAX_UINT256
+
+    log2x = _snekmate_log_2(xx, False)
+
+    # initial_guess = 2 ** pow * 1260 ** remainder // 1000 ** remainder
+    remainder = log2x % 3
+    a = ((pow(2, log2x // 3, 2**256) * pow(1260, remainder, 2**256)) & MAX_UINT256) // pow(
+        1000, remainder, 2**256
+    )
+
+    # 7 newton raphson iterations (unrolled in the contract)
+    for _ in range(7):
+        aa = (a * a) & MAX_UINT256
+        a = (((2 * a) & MAX_UINT256) + (xx // aa if aa > 0 else 0)) & MAX_UINT256
+        a //= 3
+
+    if x >= 115792089237316195423570985008687907853269 * 10**18:
+        a = (a * 10**12) & MAX_UINT256
+    elif x >= 115792089237316195423570985008687907853269:
+        a = (a * 10**6) & MAX_UINT256
+
+    return a
+
+
+def _newton_y(ANN, gamma, x, D, i, lim_mul):
+    x_j = x[1 - i]
+    y = _div(_uint256(D**2), _uint256(x_j * N_COINS**2))
+    K0_i = _div(_uint256((10**18 * N_COINS) * x_j), D)
+
+    if not (K0_i >= 10**36 // lim_mul and K0_i <= lim_mul):
+        raise ValueError("unsafe values x[i]")
+
+    convergence_limit = max(x_j // 10**14, D // 10**14, 100)
+
+    for j in range(255):
+        y_prev = y
+
+        K0 = _div(_uint256(_uint256(K0_i * y) * N_COINS), D)
+        S = _uint256(x_j + y)
+
+        _g1k0 = _uint256(gamma + 10**18)
+        if _g1k0 > K0:
+            _g1k0 = _uint256(_g1k0 - K0 + 1)
+        else:
+            _g1k0 = _uint256(K0 - _g1k0 + 1)
+
+        # D / (A * N**N) * _g1k0**2 / gamma**2
+        mul1 = _uint256(_uint256(10**18 * D) // gamma * _g1k0) // gamma
+        mul1 = _uint256(_uint256(mul1 * _g1k0) * A_MULTIPLIER) // ANN
+
+        # 2*K0 / _g1k0
+        mul2 = _uint256(10**18 + _uint256((2 * 10**18) * K0) // _g1k0)
+
+        yfprime = _uint256(_uint256(10**18 * y) + _uint256(S * mul2) + mul1)
+        _dyfprime = _uint256(D * mul2)
+        if yfprime < _dyfprime:
+            y = y_prev // 2
+            continue
+        yfprime -= _dyfprime
+        fprime = _div(yfprime, y)
+
+        # y -= f / f_prime;  y = (y * fprime - f) / fprime
+        y_minus = _div(mul1, fprime)
+        y_plus = _div(_uint256(yfprime + _uint256(10**18 * D)), fprime)
+        y_plus = _uint256(y_plus + _div(_uint256(y_minus * 10**18), K0))
+        y_minus = _uint256(y_minus + _uint256(10**18 * S) // fprime)
+
+        if y_plus < y_minus:
+            y = y_prev // 2
+        else:
+            y = y_plus - y_minus
+
+        if abs(y - y_prev) < max(convergence_limit, y // 10**14):
+            if _profile is not None:
+                _profile.record("_newton_y", ANN, gamma, x, j + 1)
+            return y
+
+    raise ValueError("Did not converge")
+
+
+def get_y(_ANN, _gamma, _x, _D, i):
+    """
+    Bit-exact port of `TwocryptoMath.get_y`.
+
+    Returns `[y, K0_prev]` like the contract does. When the analytical
+    (Cardano) solution is not available it falls back to `_newton_y`
+    and returns `K0_prev = 0`. Raises `ValueError` whenever the
+    contract would revert.
+    """
+
+    # Safety checks
+    if i not in (0, 1):
+        raise ValueError("coin index out of range")
+    if not (MIN_A <= _ANN <= MAX_A):
+        raise ValueError("unsafe values A")
+    if not (MIN_GAMMA <= _gamma <= MAX_GAMMA):
+        raise ValueError("unsafe values gamma")
+    if not (10**17 <= _D <= 10**15 * 10**18):
+        raise ValueError("unsafe values D")
+    lim_mul = 100 * 10**18  # 100.0
+    if _gamma > MAX_GAMMA_SMALL:
+        lim_mul = lim_mul * MAX_GAMMA_SMALL // _gamma  # smaller than 100.0
+
+    ANN = _ANN
+    gamma = _gamma
+    D = _D
+    x_j = _int256(_x[1 - i])
+    gamma2 = _wrap_int256(gamma * gamma)
+
+    # savediv by x_j done here:
+    _safe_sdiv(_int256(D**2), _int256(x_j * N_COINS**2))
+
+    K0_i = _sdiv(_int256(10**18 * N_COINS * x_j), D)
+    if not (K0_i >= 10**36 // lim_mul and K0_i <= lim_mul):
+        raise ValueError("unsafe values x[i]")
+
+    ann_gamma2 = _int256(ANN * gamma2)
+
+    # a = 10**36 / N_COINS**2
+    a = 10**32
+
+    # b = ANN*D*gamma2/4/10000/x_j/10**4 - 10**32*3 - 2*gamma*10**14
+    b = _safe_sdiv(_safe_sdiv(_int256(D * ann_gamma2), 400000000), x_j)
+    b = _int256(_int256(b - 3 * 10**32) - 2 * gamma * 10**14)
+
+    # c = 10**32*3 + 4*gamma*10**14 + gamma2/10**4 + 4*ANN*gamma2*x_j/D/10000/4/10**4 - 4*ANN*gamma2/10000/4/10**4
+    _c = _int256(3 * 10**32 + 4 * gamma * 10**14)
+    _c = _int256(_c + _sdiv(gamma2, 10**4))
+    _c = _int256(_c + _sdiv(_int256(_sdiv(_wrap_int256(4 * ann_gamma2), 400000000) * x_j), D))
+    _c = _int256(_c - _sdiv(_wrap_int256(4 * ann_gamma2), 400000000))
+
+    # d = -(10**18+gamma)**2 / 10**4
+    d = -_sdiv(_int256((10**18 + gamma) ** 2), 10**4)
+
+    # delta0: int256 = 3*a*c/b - b
+    delta0 = _int256(_safe_sdiv(_int256(3 * a * _c), b) - b)
+
+    # delta1: int256 = 9*a*c/b - 2*b - 27*a**2/b*d/b
+    delta1 = _safe_sdiv(_int256(_safe_sdiv(27 * a**2, b) * d), b)
+    delta1 = _int256(_int256(_int256(3 * delta0) + b) - delta1)
+
+    # the whole ladder of the contract before its unreachable steps were
+    # dropped (threshold <= a = 10**32), see test_get_y_divider
+    divider = 1
+    threshold = min(abs(delta0), abs(delta1), a)
+    if threshold > 10**48:
+        divider = 10**30
+    elif threshold > 10**46:
+        divider = 10**28
+    elif threshold > 10**44:
+        divider = 10**26
+    elif threshold > 10**42:
+        divider = 10**24
+    elif threshold > 10**40:
+        divider = 10**22
+    elif threshold > 10**38:
+        divider = 10**20
+    elif threshold > 10**36:
+        divider = 10**18
+    elif threshold > 10**34:
+        divider = 10**16
+    elif threshold > 10**32:
+        divider = 10**14
+    elif threshold > 10**30:
+        divider = 10**12
+    elif threshold > 10**28:
+        divider = 10**10
+    elif threshold > 10**26:
+        divider = 10**8
+    elif threshold > 10**24:
+        divider = 10**6
+    elif threshold > 10**20:
+        divider = 10**2
+
+    a = _sdiv(a, divider)
+    b = _sdiv(b, divider)
+    _c = _sdiv(_c, divider)
+    d = _sdiv(d, divider)
+
+    # delta0 = 3*a*c/b - b: here we can do more unsafe ops now:
+    delta0 = _int256(_sdiv(_wrap_int256(_wrap_int256(3 * a) * _c), b) - b)
+
+    # delta1 = 9*a*c/b - 2*b - 27*a**2/b*d/b
+    delta1 = _sdiv(_wrap_int256(_sdiv(_wrap_int256(27 * _int256(a**2)), b) * d), b)
+    delta1 = _int256(_int256(_int256(3 * delta0) + b) - delta1)
+
+    # sqrt_arg: int256 = delta1**2 + 4*delta0**2/b*delta0
+    sqrt_arg = _sdiv(_int256(4 * _int256(delta0**2)), b)
+    sqrt_arg = _int256(_int256(delta1**2) + _wrap_int256(sqrt_arg * delta0))
+    if sqrt_arg > 0:
+        sqrt_val = isqrt(sqrt_arg)
+    else:
+        return [_newton_y(_ANN, _gamma, _x, _D, i, lim_mul), 0]
+
+    if b > 0:
+        b_cbrt = _cbrt(b)
+    else:
+        b_cbrt = -_cbrt(-b)
+
+    if delta1 > 0:
+        second_cbrt = _cbrt(_uint256(_wrap_int256(delta1 + sqrt_val)) // 2)
+    else:
+        second_cbrt = -_cbrt(_uint256(_wrap_int256(sqrt_val - delta1)) // 2)
+
+    # C1: int256 = b_cbrt**2/10**18*second_cbrt/10**18
+    C1 = _sdiv(_wrap_int256(_sdiv(_int256(b_cbrt**2), 10**18) * second_cbrt), 10**18)
+
+    # root: int256 = (10**18*C1 - 10**18*b - 10**18*b*delta0/C1)/(3*a), keep 2 safe ops here.
+    root = _int256(_wrap_int256(10**18 * C1) - _wrap_int256(10**18 * b))
+    root = _int256(root - _int256(_safe_sdiv(_wrap_int256(10**18 * b), C1) * delta0))
+    root = _safe_sdiv(root, _wrap_int256(3 * a))
+
+    # y_out: uint256[2] =  [
+    #     convert(D**2/x_j*root/4/10**18, uint256),   # <--- y
+    #     convert(root, uint256)  # <----------------------- K0Prev
+    # ]
+    y_out = [
+        _uint256(_sdiv(_sdiv(_wrap_int256(_sdiv(_int256(D**2), x_j) * root), 4), 10**18)),
+        _uint256(root),
+    ]
+
+    frac = _uint256(y_out[0] * 10**18) // _D
+    if not (frac >= 10**36 // N_COINS // lim_mul and frac <= lim_mul // N_COINS):
+        raise ValueError("unsafe value for y")
+
+    return y_out
+
+
+def get_K0(ANN, gamma, x):
+    """
+    Bit-exact port of `TwocryptoMath._get_K0`: the analytic estimate of
+    K0 at the invariant that `get_D` starts `newton_D` from. `x` must be
+    sorted (x[0] >= x[1]). Returns 0 when there is no estimate.
+    """
+    x0, x1 = x
+    if (
+        ANN < MIN_A
+        or ANN > MAX_A
+        or gamma < MIN_GAMMA
+        or gamma > MAX_GAMMA
+        or x0 > 10**15 * 10**18
+        or (x1 * 10**18 // x0 if x0 else 0) < 10**14
+    ):
+        return 0
+
+    sqrt_r = 2 * 10**18 * isqrt(x0 * x1) // (x0 + x1)
+    inv_sqrt_r = _safe_sdiv(10**36, sqrt_r)
+    k = ANN * gamma**2 // A_MULTIPLIER // 10**18
+
+    b = 2 * gamma - _safe_sdiv(k * inv_sqrt_r, 2 * 10**18)
+    c = gamma**2 // 10**18 + _safe_sdiv(k * (3 * inv_sqrt_r // 2 - 10**18), 10**18)
+    e = _safe_sdiv(k * (inv_sqrt_r - 10**18), 10**18)
+
+    p3 = _safe_sdiv(c - _safe_sdiv(b * b, 3 * 10**18), 3)
+    q2 = _safe_sdiv(
+        _safe_sdiv(_safe_sdiv(2 * b * b, 27 * 10**18) * b, 10**18)
+        - _safe_sdiv(b * c, 3 * 10**18)
+        - e,
+        2,
+    )
+    delta = _int256(q2**2 + _safe_sdiv(p3 * p3, 10**18) * p3)
+
+    u = 0
+    if delta >= 0:
+        sqrt_delta = isqrt(delta)
+        w = _cbrt(sqrt_delta - q2) if sqrt_delta > q2 else -_cbrt(q2 - sqrt_delta)
+        w += _cbrt(-sqrt_delta - q2) if -sqrt_delta > q2 else -_cbrt(q2 + sqrt_delta)
+        u = w - _safe_sdiv(b, 3)
+    else:
+        for _ in range(4):
+            f = _safe_sdiv((_safe_sdiv((u + b) * u, 10**18) + c) * u, 10**18) - e
+            fprime = _safe_sdiv((3 * u + 2 * b) * u, 10**18) + c
+            if fprime <= 0:
+                return 0
+            u -= _safe_sdiv(f * 10**18, fprime)
+
+    if u < 0:
+        u = 0
+    if u >= 10**18:
+        return 0
+    return 10**18 - u
+
+
+def get_D(A, gamma, x):
+    """
+    `TwocryptoMath.get_D`: `newton_D` started from the analytic estimate
+    of `get_K0`.
+    """
+    K0 = get_K0(A, gamma, sorted(x, reverse=True))
+    return newton_D(A, gamma, x, initial_D(x, K0))
 
 
 def solve_x(A, gamma, x, D, i):
@@ -180,42 +609,463 @@ def solve_x(A, gamma, x, D, i):
     return newton_y(A, gamma, x, D, i)
 
 
-def solve_D(A, gamma, x):
-    D0 = len(x) * geometric_mean(x)  # <- fuzz to make sure it's ok XXX
+def initial_D(x, K0_prev=0):
+    """
+    Starting point of `TwocryptoMath.newton_D`: the constant-product
+    invariant, or the one implied by the K0 that `get_y` returned.
+    """
+    if K0_prev == 0:
+        return len(x) * geometric_mean(x)  # <- fuzz to make sure it's ok XXX
+    return min(isqrt(4 * x[0] * x[1] // K0_prev * 10**18), sum(x))
+
+
+def solve_D(A, gamma, x, D0=None):
+    if D0 is None:
+        D0 = initial_D(x)
     return newton_D(A, gamma, x, D0)
 
 
-N_COINS = 2
+# Batch versions of geometric_mean, newton_D and newton_y for 2 coins. A
+# Newton step runs across the whole batch at once on object-dtype arrays.
+# Python ints keep the 1e18 fixed point exact, and each lane does the same
+# integer operations as the scalar solver, so the results are identical.
+# Lanes are masked out as they converge. A lane where the scalar solver
+# would raise gets a result of 0 and an iteration count of -1.
+
+
+def _lanes(v, n):
+    out = np.empty(n, dtype=object)
+    out[:] = [int(_v) for _v in np.broadcast_to(np.asarray(v, dtype=object), (n,))]
+    return out
+
+
+def _divisor(d, active, failed):
+    # the scalar solver raises ZeroDivisionError on these lanes
+    zero = d == 0
+    failed[active[zero]] = True
+    return np.where(zero, 1, d)
+
+
+def _sorted_lanes(X):
+    X = np.asarray(X, dtype=object)
+    assert X.ndim == 2 and X.shape[1] == 2
+    x0 = _lanes(X[:, 0], len(X))
+    x1 = _lanes(X[:, 1], len(X))
+    return np.where(x0 < x1, x1, x0), np.where(x0 < x1, x0, x1)
+
+
+def geometric_mean_batch(X):
+    x0, x1 = _sorted_lanes(X)
+    n = len(x0)
+    D = x0.copy()
+    failed = np.zeros(n, dtype=bool)
+    done = np.zeros(n, dtype=bool)
+    active = np.arange(n)
+    for _ in range(255):
+        _D = _divisor(D[active], active, failed)
+        tmp = 10**18 * x0[active] // _D * x1[active] // _D
+        D_prev = D[active]
+        D[active] = D_prev * (10**18 + tmp) // (2 * 10**18)
+        diff = abs(D[active] - D_prev)
+        done[active] = (diff <= 1) | (diff * 10**18 < D[active])
+        active = active[~(done[active] | failed[active])]
+        if len(active) == 0:
+            break
+    failed[active] = True  # Did not converge
+    D[failed] = 0
+    return D
+
+
+def newton_D_batch(A, gamma, X, D0):
+    """
+    Lockstep `newton_D` over a batch. A, gamma and D0 are scalars or
+    arrays broadcastable to len(X); X has shape (len(X), 2).
+    Returns D and the number of iterations of every lane.
+    """
+    x0, x1 = _sorted_lanes(X)
+    n = len(x0)
+    A = _lanes(A, n)
+    gamma = _lanes(gamma, n)
+    D = _lanes(D0, n)
+    S = x0 + x1
+
+    iterations = np.zeros(n, dtype=np.int64)
+    failed = np.zeros(n, dtype=bool)
+    done = np.zeros(n, dtype=bool)
+    active = np.arange(n)
+    A = _divisor(A, active, failed)
+    gamma = _divisor(gamma, active, failed)
+    active = active[~failed]
+    for i in range(255):
+        _A = A[active]
+        _gamma = gamma[active]
+        _S = S[active]
+        D_prev = D[active]
+        _D = _divisor(D_prev, active, failed)
+
+        K0 = 10**18 * x0[active] * 2 // _D * x1[active] * 2 // _D
+        _g1k0 = _divisor(abs(_gamma + 10**18 - K0), active, failed)
+        _K0 = _divisor(K0, active, failed)
+
+        # D / (A * N**N) * _g1k0**2 / gamma**2
+        mul1 = 10**18 * D_prev // _gamma * _g1k0 // _gamma * _g1k0 * A_MULTIPLIER // _A
+
+        # 2*N*K0 / _g1k0
+        mul2 = (2 * 10**18) * 2 * K0 // _g1k0
+
+        neg_fprime = (_S + _S * mul2 // 10**18) + mul1 * 2 // _K0 - mul2 * D_prev // 10**18
+        failed[active[neg_fprime <= 0]] = True  # Python only: -f' > 0
+        neg_fprime = np.where(neg_fprime <= 0, 1, neg_fprime)
+
+        # D -= f / fprime
+        D_new = (D_prev * neg_fprime + D_prev * _S - D_prev**2) // neg_fprime - D_prev * (
+            mul1 // neg_fprime
+        ) // 10**18 * (10**18 - K0) // _K0
+        D_new = np.where(D_new < 0, -D_new // 2, D_new)
+        D[active] = D_new
+
+        iterations[active] = i + 1
+        done[active] = abs(D_new - D_prev) <= np.maximum(100, D_new // 10**14)
+        active = active[~(done[active] | failed[active])]
+        if len(active) == 0:
+            break
+
+    failed[active] = True  # Did not converge
+    D[failed] = 0
+    iterations[failed] = -1
+    return D, iterations
+
+
+def newton_y_batch(A, gamma, X, D, i):
+    """
+    Lockstep `newton_y` over a batch, solving for coin `i` of every lane.
+    Returns y and the number of iterations of every lane.
+    """
+    X = np.asarray(X, dtype=object)
+    n = len(X)
+    A = _lanes(A, n)
+    gamma = _lanes(gamma, n)
+    D = _lanes(D, n)
+    x = _lanes(X[:, 1 - i], n)
+
+    iterations = np.zeros(n, dtype=np.int64)
+    failed = np.zeros(n, dtype=bool)
+    done = np.zeros(n, dtype=bool)
+    active = np.arange(n)
+
+    A = _divisor(A, active, failed)
+    gamma = _divisor(gamma, active, failed)
+    D = _divisor(D, active, failed)
+    y = D // 2 * D // (_divisor(x, active, failed) * 2)
+    S_i = x
+    K0_i = 10**18 * x * 2 // D
+    convergence_limit = np.maximum(np.maximum(x // 10**14, D // 10**14), 100)
+    active = active[~failed]
+
+    for j in range(255):
+        _A = A[active]
+        _gamma = gamma[active]
+        _D = D[active]
+        y_prev = y[active]
+        _y = _divisor(y_prev, active, failed)
+
+        K0 = K0_i[active] * y_prev * 2 // _D
+        S = S_i[active] + y_prev
+
+        _g1k0 = _divisor(abs(_gamma + 10**18 - K0), active, failed)
+        _K0 = _divisor(K0, active, failed)
+
+        # D / (A * N**N) * _g1k0**2 / gamma**2
+        mul1 = 10**18 * _D // _gamma * _g1k0 // _gamma * _g1k0 * A_MULTIPLIER // _A
+
+        # 2*K0 / _g1k0
+        mul2 = 10**18 + (2 * 10**18) * K0 // _g1k0
+
+        yfprime = 10**18 * y_prev + S * mul2 + mul1 - _D * mul2
+        fprime = yfprime // _y
+        failed[active[fprime <= 0]] = True  # Python only: f' > 0
+        fprime = np.where(fprime <= 0, 1, fprime)
+
+        # y -= f / f_prime;  y = (y * fprime - f) / fprime
+        y_new = (yfprime + 10**18 * _D - 10**18 * S) // fprime + mul1 // fprime * (
+            10**18 - K0
+        ) // _K0
+        y_new = np.where(y_new < 0, y_prev // 2, y_new)
+        y[active] = y_new
+
+        iterations[active] = j + 1
+        done[active] = abs(y_new - y_prev) <= np.maximum(convergence_limit[active], y_new // 10**14)
+        active = active[~(done[active] | failed[active])]
+        if len(active) == 0:
+            break
+
+    failed[active] = True  # Did not converge
+    y[failed] = 0
+    iterations[failed] = -1
+    return y, iterations
+
+
+def solve_D_batch(A, gamma, X):
+    """
+    Batch `solve_D`: `newton_D_batch` started from the constant-product
+    invariant of every lane.
+    """
+    D0 = 2 * geometric_mean_batch(X)
+    D, iterations = newton_D_batch(A, gamma, X, np.where(D0 == 0, 1, D0))
+    failed = D0 == 0
+    D[failed] = 0
+    iterations[failed] = -1
+    return D, iterations
+
+
+# float64 twins of the solvers above for coarse, exploratory sweeps. They
+# take and return the same fixed-point integers as their exact versions,
+# but iterate in float64 (about 1e-16 relative precision). Near the unsafe
+# regions of the invariant the float iteration loses too much precision,
+# so `Curve(mode="float")` only uses them inside [FLOAT_MIN_XD,
+# FLOAT_MAX_XD] and falls back to integers elsewhere.
+
+# Unsafe bounds of x[i] * 1e18 / D as fuzzed in tests/fuzzing/test_newton_D.py,
+# with a margin of 2
+FLOAT_MIN_XD = 2 * 10**17
+FLOAT_MAX_XD = 10**19 // 2
+# Every FLOAT_CHECK_EVERY-th float solve is checked against the exact one,
+# and float mode is turned off for good once it is off by FLOAT_MAX_ERROR.
+FLOAT_CHECK_EVERY = 100
+FLOAT_MAX_ERROR = 1e-10
+
+
+def reduction_coefficient_float(x, gamma):
+    N = len(x)
+    K = 1.0
+    S = float(sum(x))
+    for x_i in x:
+        K *= N * x_i / S
+    if gamma > 0:
+        g = gamma / 1e18
+        K = g / (g + 1 - K)
+    return int(K * 1e18)
+
+
+def get_fee_float(x, fee_gamma, mid_fee, out_fee):
+    f = reduction_coefficient_float(x, fee_gamma) / 1e18
+    return int(mid_fee * f + out_fee * (1 - f))
+
+
+def _one_minus_K0(x0, x1, D):
+    # 1 - K0 = (D**2 - 4*x0*x1) / D**2. Taking the difference in integers
+    # avoids the cancellation that makes gamma + 1 - K0 useless in float64
+    # for small gamma.
+    D2 = D * D
+    return (D2 - 4 * x0 * x1) / D2
+
+
+def newton_D_float(A, gamma, x, D0):
+    ANN = A / A_MULTIPLIER
+    g = gamma / 1e18
+    x0, x1 = x
+    S = float(x0 + x1)
+    D = float(D0)
+
+    for i in range(255):
+        D_prev = D
+
+        u = _one_minus_K0(x0, x1, int(D))
+        K0 = 1 - u
+        _g1k0 = abs(g + u)
+
+        # D / (A * N**N) * _g1k0**2 / gamma**2
+        mul1 = D * _g1k0 * _g1k0 / (g * g * ANN)
+
+        # 2*N*K0 / _g1k0
+        mul2 = 4 * K0 / _g1k0
+
+        neg_fprime = (S + S * mul2) + mul1 * 2 / K0 - mul2 * D
+        if not neg_fprime > 0:
+            raise ValueError("Did not converge")
+
+        # D -= f / fprime
+        D = (D * neg_fprime + D * S - D * D) / neg_fprime - D * mul1 / neg_fprime * u / K0
+
+        if D < 0:
+            D = -D / 2
+        if abs(D - D_prev) <= max(100, D / 1e14):
+            return int(D)
+
+    raise ValueError("Did not converge")
+
+
+def newton_y_float(A, gamma, x, D, i):
+    ANN = A / A_MULTIPLIER
+    g = gamma / 1e18
+    _x = x[1 - i]
+    convergence_limit = max(_x / 1e14, D / 1e14, 100)
+
+    y = D * D / (4 * _x)
+
+    for j in range(255):
+        y_prev = y
+
+        u = _one_minus_K0(_x, int(y), D)
+        K0 = 1 - u
+        S = _x + y
+
+        _g1k0 = abs(g + u)
+
+        # D / (A * N**N) * _g1k0**2 / gamma**2
+        mul1 = D * _g1k0 * _g1k0 / (g * g * ANN)
+
+        # 2*K0 / _g1k0
+        mul2 = 1 + 2 * K0 / _g1k0
+
+        fprime = (y + S * mul2 + mul1 - D * mul2) / y
+        if not fprime > 0:
+            raise ValueError("Did not converge")
+
+        # y -= f / f_prime;  y = (y * fprime - f) / fprime
+        y = (y * fprime + D - S) / fprime + mul1 / fprime * u / K0
+
+        if y < 0:
+            y = y_prev / 2
+        if abs(y - y_prev) <= max(convergence_limit, y / 1e14):
+            return int(y)
+
+    raise ValueError("Did not converge")
+
+
+def get_p_float(A, gamma, xp, D):
+    ANN = A / A_MULTIPLIER
+    g = gamma / 1e18
+    u = _one_minus_K0(xp[0], xp[1], D)
+    K0 = 1 - u
+    x0, x1 = float(xp[0]), float(xp[1])
+
+    # 2*K0**3 + (gamma + 1)**2 - K0**2 * (2*gamma + 3), factored in 1 - K0
+    gK0 = (g + u) * (g + 3 * u - 2 * u * u)
+    NNAG2 = ANN * g * g
+    numerator = x0 * (gK0 + NNAG2 * x1 / D * K0) / x1
+    denominator = gK0 + NNAG2 * x0 / D * K0
+    if not (numerator > 0 and denominator > 0):
+        raise ValueError("Lost precision")
+
+    p = numerator / denominator * 1e18
+    if not isfinite(p):
+        raise ValueError("Lost precision")
+    return int(p)
 
 
 class Curve:
-    def __init__(self, A, gamma, D, p):
+    def __init__(self, A, gamma, D, p, mode="int"):
+        assert mode in ("int", "float")
         self.A = A
         self.gamma = gamma
         self.p = p
         self.x = [D // N_COINS * 10**18 // self.p[i] for i in range(N_COINS)]
+        # D is cached for the (x, p) it was solved for. Both are mutated in
+        # place by Trader, so the key is a snapshot rather than a dirty flag.
+        self._D = None
+        self._D_key = None
+        self._D_xp = None
+        # "float" solves with the float64 twins where it is safe to do so
+        self.mode = mode
+        self.float_solves = 0
+        self.float_error = 0.0  # largest relative error seen when checking
 
     def xp(self):
-        return [x * p // 10**18 for x, p in zip(self.x, self.p)]
+        x, p = self.x, self.p
+        return [x[0] * p[0] // 10**18, x[1] * p[1] // 10**18]
+
+    def _float_safe(self, xp, D):
+        return self.mode == "float" and all(
+            FLOAT_MIN_XD <= x * 10**18 // D <= FLOAT_MAX_XD for x in xp
+        )
+
+    def _checked(self, result, exact):
+        self.float_solves += 1
+        if self.float_solves % FLOAT_CHECK_EVERY == 0:
+            expected = exact()
+            self.float_error = max(self.float_error, abs(result - expected) / expected)
+            if self.float_error > FLOAT_MAX_ERROR:
+                self.mode = "int"
+            return expected
+        return result
 
     def D(self):
+        x, p = self.x, self.p
+        key = (x[0], x[1], p[0], p[1])
+        if key == self._D_key:
+            return self._D
         xp = self.xp()
-        if any(x <= 0 for x in xp):
+        if xp[0] <= 0 or xp[1] <= 0:
             raise ValueError
-        return solve_D(self.A, self.gamma, xp)
+        if self._D is not None:
+            # Same starting point as `_exchange` passing K0_prev from get_y:
+            # the previous D, moved by how much the constant product moved.
+            # Starting from D_prev as is can stall early when A is small.
+            old_xp = self._D_xp
+            D0 = min(isqrt(self._D**2 * xp[0] * xp[1] // (old_xp[0] * old_xp[1])), sum(xp))
+        else:
+            D0 = initial_D(xp)
+        D = None
+        if self._float_safe(xp, D0):
+            try:
+                D = self._checked(
+                    newton_D_float(self.A, self.gamma, xp, D0),
+                    lambda: solve_D(self.A, self.gamma, xp, D0),
+                )
+            except ValueError:
+                pass
+        if D is None:
+            D = solve_D(self.A, self.gamma, xp, D0)
+        self._D = D
+        self._D_key = key
+        self._D_xp = xp
+        return self._D
 
     def y(self, x, i, j):
         xp = self.xp()
         xp[i] = x * self.p[i] // 10**18
-        yp = solve_x(self.A, self.gamma, xp, self.D(), j)
+        yp = self.solve_y(xp, self.D(), j)
         return yp * 10**18 // self.p[j]
 
-    def get_p(self):
+    def solve_y(self, xp, D, j):
+        yp = None
+        if self._float_safe(xp, D):
+            try:
+                yp = self._checked(
+                    newton_y_float(self.A, self.gamma, xp, D, j),
+                    lambda: solve_x(self.A, self.gamma, xp, D, j),
+                )
+            except ValueError:
+                pass
+            if yp is not None and not FLOAT_MIN_XD <= yp * 10**18 // D <= FLOAT_MAX_XD:
+                yp = None
+        if yp is None:
+            yp = solve_x(self.A, self.gamma, xp, D, j)
+        return yp
+
+    def get_p(self, xp=None, D=None):
+        """
+        Spot price dx0/dx1 at balances `xp` on invariant `D`, by default
+        at the current state.
+        """
+        if xp is None:
+            xp = self.xp()
+            D = self.D()
+
+        if self._float_safe(xp, D):
+            try:
+                return self._checked(
+                    get_p_float(self.A, self.gamma, xp, D),
+                    lambda: self._get_p_int(xp, D),
+                )
+            except ValueError:
+                pass
+        return self._get_p_int(xp, D)
+
+    def _get_p_int(self, xp, D):
         A = self.A
         gamma = self.gamma
-        xp = self.xp()
-        D = self.D()
-
         K0 = xp[0] * xp[1] * 4 // D * 10**36 // D
         gK0 = (
             2 * K0 * K0 // 10**36 * K0 // 10**36
@@ -228,6 +1078,33 @@ class Curve:
 
         return numerator * 10**18 // denominator
 
+    def dp_dx(self, xp, D, i):
+        """
+        Derivative of `get_p` with respect to xp[i] when moving along the
+        curve of invariant D, as a float.
+
+        The partial derivatives of the closed form of `get_p` are taken
+        with a complex step, which is exact to float precision.
+        """
+        ANN = self.A / A_MULTIPLIER
+        g = self.gamma / 1e18
+        a, b = xp[0] / D, xp[1] / D
+        h = 1e-30
+
+        def p(a, b):
+            u = 1 - 4 * a * b  # 1 - K0
+            gK0 = (g + u) * (g + 3 * u - 2 * u * u)
+            NNAG2K0 = ANN * g * g * (1 - u)
+            return a * (gK0 + NNAG2K0 * b) / (b * (gK0 + NNAG2K0 * a))
+
+        p0 = p(a, b).real
+        dp_da = p(a + h * 1j, b).imag / h
+        dp_db = p(a, b + h * 1j).imag / h
+        # along the curve dx0 = -p * dx1
+        if i == 0:
+            return (dp_da - dp_db / p0) * 1e18 / D
+        return (dp_db - dp_da * p0) * 1e18 / D
+
 
 class Trader:
     def __init__(
@@ -241,21 +1118,30 @@ class Trader:
         fee_gamma=None,
         adjustment_step=0.003,
         ma_time=866,
+        mode="int",
+        t=0,
     ):
         self.price_oracle = p0[:]
         self.last_price = p0[:]
-        self.curve = Curve(A, gamma, D, p=p0[:])
+        self.curve = Curve(A, gamma, D, p=p0[:], mode=mode)
         self.mid_fee = int(mid_fee * 1e10)
         self.out_fee = int(out_fee * 1e10)
         self.xcp_profit = 10**18
         self.xcp_profit_real = 10**18
         self.xcp = self.get_xcp()
+        self.xcp_0 = self.xcp
         self.adjustment_step = int(10**18 * adjustment_step)
         self.fee_gamma = fee_gamma or gamma  # why can gamma be used as fee_gamma?
         self.ma_time = ma_time
-
-    def fee(self):
-        f = reduction_coefficient(self.curve.xp(), self.fee_gamma)
+        self.t = t  # time of the last trade, as the pool's last_timestamp
+
+    def fee(self, xp=None):
+        if xp is None:
+            xp = self.curve.xp()
+        if self.curve.mode == "float":
+            f = reduction_coefficient_float(xp, self.fee_gamma)
+        else:
+            f = reduction_coefficient(xp, self.fee_gamma)
         return (self.mid_fee * f + self.out_fee * (10**18 - f)) // 10**18
 
     def get_xcp(self):
@@ -265,6 +1151,8 @@ class Trader:
         N = len(self.curve.x)
         X = [D * 10**18 // (N * p) for p in self.curve.p]
 
+        if self.curve.mode == "float":
+            return isqrt(X[0] * X[1])
         return geometric_mean(X)
 
     def update_xcp(self, only_real=False):
@@ -274,6 +1162,10 @@ class Trader:
             self.xcp_profit = self.xcp_profit * xcp // self.xcp
         self.xcp = xcp
 
+    def get_virtual_price(self):
+        # no liquidity is added or removed, so the LP supply stays at xcp_0
+        return 10**18 * self.xcp // self.xcp_0
+
     def buy(self, dx, i, j, max_price=1e100):
         """
         Buy y for x
@@ -318,6 +1210,83 @@ class Trader:
         except ValueError:
             return False
 
+    def arb_to_price(self, p_ext, i, j, max_steps=64):
+        """
+        Buy coin j for coin i up to the size at which the marginal pool
+        price, fee included, reaches `p_ext` (price of coin 1 in coin 0,
+        1e18 based). This is the profit-maximizing size for an arbitrageur.
+
+        The size is found with Newton steps on the pool price along the
+        invariant (using `Curve.dp_dx`), kept inside a bracket of the
+        root: a step that leaves it, or a point the solvers cannot
+        handle, falls back to bisection. The price is that of the state
+        `buy` leaves, with the fee kept in the pool.
+
+        Returns like `buy`, and 0 if trading i for j is not profitable.
+        """
+        curve = self.curve
+        D0 = curve.D()
+        xp0 = curve.xp()
+        sign = 1 if i == 0 else -1  # buying coin 1 pushes the price up
+
+        def after(u):
+            # balances and D once xp[i] is u: the fee on the coins j bought
+            # stays in the pool, which raises D and moves the price back
+            xp = xp0[:]
+            xp[i] = u
+            xp[j] = curve.solve_y(xp, D0, j)
+            xp[j] += (xp0[j] - xp[j]) * self.fee(xp) // 10**10
+            return xp, solve_D(curve.A, curve.gamma, xp, D0)
+
+        def gap(xp, D):
+            # pool price minus the price at which the arbitrage stops, in
+            # xp units and signed so that it is > 0 past that price
+            fee = self.fee(xp)
+            if i == 0:
+                target = p_ext * (10**10 - fee) // 10**10
+            else:
+                target = p_ext * 10**10 // (10**10 - fee)
+            return sign * (curve.get_p(xp, D) - target * 10**18 // curve.p[1])
+
+        g = gap(xp0, D0)
+        if g >= 0:
+            return 0
+
+        lo, hi = xp0[i], None
+        u, xp, D = lo, xp0, D0
+        for _ in range(max_steps):
+            # until we first get past the target, grow the bracket geometrically
+            upper = 2 * lo if hi is None else hi
+            u_new = None
+            if xp is not None:
+                dp_dx = curve.dp_dx(xp, D, i)
+                # a flat or lost derivative gives no step: bisect instead
+                if dp_dx != 0 and isfinite(dp_dx):
+                    u_new = u - int(g / (sign * dp_dx))
+            if u_new is None or not lo < u_new < upper:
+                u_new = (lo + upper) // 2
+            step = abs(u_new - u)
+            u = u_new
+
+            try:
+                xp, D = after(u)
+                g = gap(xp, D)
+            except SOLVER_ERRORS:
+                xp = None  # solvers gave up: out of the curve's domain, too far
+            if xp is None or g > 0:
+                hi = u
+            else:
+                lo = u
+            if xp is not None and step <= u // 10**12:
+                break
+        else:
+            u = lo  # did not converge: stay on the safe side
+
+        dx = (u - xp0[i]) * 10**18 // curve.p[i]
+        if dx <= 0:
+            return 0
+        return self.buy(dx, i, j)
+
     def _ma_multiplier(self, t):
         return int(10**18 * exp(-1 * (t - self.t) / self.ma_time))
 
@@ -334,8 +1303,12 @@ class Trader:
             self.t = t
 
     def tweak_price(self, t):
+        new_block = t > self.t
         self.ma_recorder(t, self.last_price)
         self.last_price[1] = self.curve.get_p() * self.curve.p[1] // 10**18
+        if not new_block:
+            # like the pool, only rebalance on the first trade of a block
+            return None
 
         # update price_scale:
         norm = int(
@@ -0,0 +1,239 @@
+"""
+Parameter sweeps of streaming backtests (see `tests/utils/backtest.py`).
+
+Cells (one parameter set each) are split into chunks that run on a
+`ProcessPoolExecutor`. Every finished chunk is checkpointed to its own
+file, so an interrupted sweep that is started again with the same
+checkpoint directory only runs the cells that are missing. At the end
+all checkpoints are merged into one columnar `.npz` file with a column
+per parameter and per result:
+
+    cells = grid(A=[2e5, 4e5], gamma=[1e14, 1.45e14], mid_fee=[0.0026])
+    results = sweep(cells, "ethusd.csv", "sweep.npz", "sweep_checkpoints/")
+"""
+
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from tests.utils.backtest import backtest, read_csv, read_npy, ticks_from_ohlc
+from tests.utils.simulator import Trader
+
+# Trader keyword arguments a cell can set, with their defaults
+PARAMETERS = {
+    "A": 400000,
+    "gamma": 145000000000000,
+    "mid_fee": 1e-3,
+    "out_fee": 3e-3,
+    "fee_gamma": None,
+    "adjustment_step": 0.003,
+    "ma_time": 866,
+}
+INT_PARAMETERS = ("A", "gamma", "fee_gamma", "ma_time")
+
+RESULTS = (
+    "steps",
+    "xcp_profit",
+    "virtual_price",
+    "price_scale",
+    "volume",
+    "fees",
+)
+
+
+# ---------------- cells ----------------
+
+
+def _cell(**params):
+    assert set(params) <= set(PARAMETERS), f"unknown parameters {set(params) - set(PARAMETERS)}"
+    cell = {**PARAMETERS, **params}
+    for k in INT_PARAMETERS:
+        if cell[k] is not None:
+            cell[k] = int(cell[k])
+    return cell
+
+
+def grid(**axes):
+    """Every combination of the values given for each parameter."""
+    names = list(axes)
+    return [_cell(**dict(zip(names, values))) for values in itertools.product(*axes.values())]
+
+
+def random_cells(n, seed=0, **bounds):
+    """
+    `n` cells with every parameter in `bounds` drawn log-uniformly from
+    its (low, high) range, as parameters span orders of magnitude.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {
+        k: np.exp(rng.uniform(np.log(lo), np.log(hi), n)).tolist() for k, (lo, hi) in bounds.items()
+    }
+    return [_cell(**{k: v[i] for k, v in columns.items()}) for i in range(n)]
+
+
+def preset_cells():
+    """The pool presets of `pool_presets.csv` as cells."""
+    # unlike `tests.utils.pool_presets.all_presets`, every row of the csv
+    presets = pd.read_csv("tests/utils/pool_presets.csv").to_dict(orient="records")
+    return [
+        _cell(
+            A=p["A"],
+            gamma=p["gamma"],
+            mid_fee=p["mid_fee"] / 1e10,
+            out_fee=p["out_fee"] / 1e10,
+            fee_gamma=p["fee_gamma"],
+            adjustment_step=p["adjustment_step"] / 1e18,
+            ma_time=p["ma_exp_time"],
+        )
+        for p in presets
+    ]
+
+
+def cell_key(cell, data_path, D, mode):
+    """Identifies the backtest of `cell` on `data_path` from `D` in `mode`."""
+    run = {"cell": cell, "data_path": os.path.abspath(data_path), "D": D, "mode": mode}
+    return hashlib.sha1(json.dumps(run, sort_keys=True).encode()).hexdigest()
+
+
+# ---------------- work units ----------------
+
+
+def _ticks(data_path):
+    reader = read_npy if data_path.endswith(".npy") else read_csv
+    return ticks_from_ohlc(reader(data_path))
+
+
+class _Summary:
+    # stands in for a MetricsWriter, keeping only what a sweep reports
+    def __init__(self):
+        self.steps = 0
+        self.volume = 0.0
+        self.fees = 0.0
+        self.last = None
+
+    def append(self, record):
+        self.steps += 1
+        self.volume += record[7]
+        self.fees += record[8]
+        self.last = record
+
+
+def run_cell(cell, data_path, D, mode="int"):
+    first = next(_ticks(data_path), None)
+    if first is None:
+        return {k: 0 if k == "steps" else np.nan for k in RESULTS}
+    t0, p0 = first
+    trader = Trader(D=D, p0=[10**18, int(p0 * 10**18)], mode=mode, t=t0, **cell)
+    summary = _Summary()
+    backtest(trader, _ticks(data_path), summary)
+    return {
+        "steps": summary.steps,
+        "xcp_profit": summary.last[5],
+        "virtual_price": summary.last[6],
+        "price_scale": summary.last[2],
+        "volume": summary.volume,
+        "fees": summary.fees,
+    }
+
+
+def _columns(keys, cells, results):
+    columns = {"key": np.array(keys)}
+    for k in PARAMETERS:
+        # fee_gamma=None means fee_gamma=gamma, stored as nan
+        columns[k] = np.array([np.nan if c[k] is None else c[k] for c in cells], dtype=float)
+    for k in RESULTS:
+        columns[k] = np.array([r[k] for r in results], dtype=float)
+    return columns
+
+
+def _run_chunk(cells, data_path, D, mode, path):
+    keys = [cell_key(cell, data_path, D, mode) for cell in cells]
+    results = [run_cell(cell, data_path, D, mode) for cell in cells]
+    # write then rename, so a checkpoint is either complete or absent
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **_columns(keys, cells, results))
+    os.replace(tmp, path)
+    return len(cells)
+
+
+# ---------------- sweep ----------------
+
+
+def _checkpoints(checkpoint_dir):
+    return sorted(
+        os.path.join(checkpoint_dir, f)
+        for f in os.listdir(checkpoint_dir)
+        if f.startswith("chunk-") and f.endswith(".npz") and ".tmp" not in f
+    )
+
+
+def sweep(
+    cells,
+    data_path,
+    out_path,
+    checkpoint_dir,
+    D=10**24,
+    mode="int",
+    chunk_size=16,
+    workers=None,
+):
+    """
+    Backtest every cell against `data_path` and write one row per cell
+    to `out_path`, in the order of `cells`. Cells already checkpointed
+    in `checkpoint_dir` are not run again. `mode="float"` runs the
+    backtests on the float64 solvers, for coarse sweeps. Returns the
+    merged columns.
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+
+    done = set()
+    for path in _checkpoints(checkpoint_dir):
+        with np.load(path) as chunk:
+            done.update(chunk["key"].tolist())
+    keys = {cell_key(c, data_path, D, mode): c for c in cells}
+    todo = [c for k, c in keys.items() if k not in done]
+
+    chunks = [todo[i : i + chunk_size] for i in range(0, len(todo), chunk_size)]
+    if chunks:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    _run_chunk,
+                    chunk,
+                    data_path,
+                    D,
+                    mode,
+                    os.path.join(
+                        checkpoint_dir,
+                        f"chunk-{cell_key(chunk, data_path, D, mode)}.npz",
+                    ),
+                )
+                for chunk in chunks
+            ]
+            for future in as_completed(futures):
+                future.result()
+
+    merged = {}
+    for path in _checkpoints(checkpoint_dir):
+        with np.load(path) as chunk:
+            keep = np.isin(chunk["key"], list(keys))
+            for k in chunk.files:
+                merged.setdefault(k, []).append(chunk[k][keep])
+    if not merged:
+        return {}
+    columns = {k: np.concatenate(v) for k, v in merged.items()}
+    # a cell can be in several checkpoints if cells were given twice
+    _, first = np.unique(columns["key"], return_index=True)
+    # one row per cell in the order of `cells`, whichever order the chunks
+    # were run and checkpointed in
+    index = {k: n for n, k in enumerate(keys)}
+    rows = sorted(first, key=lambda row: index[columns["key"][row]])
+    columns = {k: v[rows] for k, v in columns.items()}
+
+    np.savez(out_path, **columns)
+    return columns